@@ -1,7 +1,21 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List
-from app.faiss_search import recommend_recipes
+from typing import List, Optional
+from app.faiss_search import (
+    recommend_recipes,
+    recommend_recipes_async,
+    recommend_recipes_stream,
+    embedding_cache,
+    result_cache,
+    search_batcher,
+    inference_executor,
+)
+from app.inference import OverloadedError
+from app.cook_api import step_cache
+from app.resources import registry
+from app.sse import sse_response, token_events
+from app.prompts import COOK_CHAT_SYSTEM_MESSAGE, RECIPE_GUIDE_PREAMBLE
 import time
 import httpx
 import os
@@ -9,21 +23,133 @@ import uuid
 import logging
 import asyncio
 import json
+import gzip
+import orjson
 
 # 라우터 생성 및 CORS 설정
 router = APIRouter()
 
+# 과부하로 거절할 때의 상태 코드 (503 또는 429)
+RECOMMEND_OVERLOAD_STATUS = int(os.getenv("RECOMMEND_OVERLOAD_STATUS", "503"))
+
+# 응답 압축 기준 (이 크기 이상이고 클라이언트가 gzip을 받으면 압축)
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
+# /recommend 결과 항목의 필드 (fields 파라미터로 선택)
+RESULT_FIELDS = ("title", "ingredients", "content", "match_score", "matched_ingredients")
+
 # 추천 요청 모델
 class RecommendRequest(BaseModel):
     ingredients: List[str]
 
+def _parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """쉼표로 구분된 필드 목록 검증 (없으면 전체 필드)"""
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in RESULT_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"지원하지 않는 필드: {', '.join(unknown)} (사용 가능: {', '.join(RESULT_FIELDS)})",
+        )
+    return names
+
+def _project(results: list, fields: Optional[tuple]) -> list:
+    if fields is None:
+        return results
+    return [{name: r[name] for name in fields} for r in results]
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            if not q.startswith("q="):
+                return True
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+async def _json_response(request: Request, payload) -> Response:
+    """orjson 직렬화 + 큰 응답은 gzip 압축 (Accept-Encoding 협상)"""
+    body = orjson.dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= GZIP_MIN_BYTES and _accepts_gzip(request.headers.get("accept-encoding", "")):
+        body = await asyncio.to_thread(gzip.compress, body, GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # /recommend 엔드포인트 (최적화된 버전)
-@router.post("/recommend", response_model=List[dict])
-def recommend(req: RecommendRequest):
-    results = recommend_recipes(req.ingredients)
+@router.post("/recommend")
+async def recommend(
+    req: RecommendRequest,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="최대 결과 수"),
+    fields: Optional[str] = Query(None, description="반환할 필드 (쉼표 구분, 예: title,matched_ingredients)"),
+):
+    field_names = _parse_fields(fields)
+    # 동시 요청은 배처에서 한 번의 encode + 한 번의 FAISS 검색으로 묶임
+    # limit이 있으면 작은 k부터 검색하고 상위 limit개가 확정되면 멈춤
+    try:
+        results = await recommend_recipes_async(req.ingredients, limit=limit)
+    except OverloadedError as e:
+        raise _overloaded(e)
     if not results:
         raise HTTPException(status_code=404, detail="조건에 맞는 레시피가 없습니다.")
-    return results
+    return await _json_response(request, _project(results, field_names))
+
+def _overloaded(e: OverloadedError) -> HTTPException:
+    """과부하 시 대기열에 쌓지 않고 바로 거절 (클라이언트는 Retry-After 후 재시도)"""
+    return HTTPException(
+        status_code=RECOMMEND_OVERLOAD_STATUS,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def _ndjson(results: list) -> bytes:
+    return b"".join(orjson.dumps(r) + b"\n" for r in results)
+
+# /recommend/stream 엔드포인트 (NDJSON 스트리밍)
+@router.post("/recommend/stream")
+async def recommend_stream(
+    req: RecommendRequest,
+    limit: Optional[int] = Query(None, ge=1, description="최대 결과 수"),
+    fields: Optional[str] = Query(None, description="반환할 필드 (쉼표 구분, 예: title,matched_ingredients)"),
+):
+    """/recommend와 같은 결과를 순위대로 한 줄에 레시피 하나씩(NDJSON) 스트리밍"""
+    field_names = _parse_fields(fields)
+    chunks = recommend_recipes_stream(req.ingredients)
+    # 첫 청크까지는 응답 시작 전에 계산 (과부하/결과 없음은 상태 코드로 응답)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=404, detail="조건에 맞는 레시피가 없습니다.")
+    except OverloadedError as e:
+        raise _overloaded(e)
+
+    async def body():
+        # limit에 도달하면 남은 청크는 조회하지 않고 종료
+        remaining = limit
+        try:
+            chunk = first
+            while True:
+                if remaining is not None:
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                yield _ndjson(_project(chunk, field_names))
+                if remaining == 0:
+                    break
+                chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            pass
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
 
 # /recommend/legacy 엔드포인트 (기존 버전) - 제거됨
 
@@ -68,9 +194,21 @@ def system_status():
     
     return {
         "gpu": gpu_info,
+        "embedding_cache": embedding_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "cook_step_cache": step_cache.stats(),
+        "search_batcher": search_batcher.stats(),
+        "inference_executor": inference_executor.stats(),
+        "resources": registry.report(),
         "timestamp": time.time()
     }
 
+# /system/resources 엔드포인트 (공유 리소스 및 메모리 사용량)
+@router.get("/system/resources")
+def system_resources():
+    """전역 레지스트리가 보유한 모델/인덱스/메타데이터와 리소스별 메모리"""
+    return registry.report()
+
 # WebSocket 채팅 엔드포인트
 @router.websocket("/ws/chat")
 async def websocket_chat_endpoint(websocket: WebSocket):
@@ -206,6 +344,30 @@ def recommend_with_rag(req: RecommendRequest):
         logger.error(f"RAG 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"RAG 추천 중 오류 발생: {str(e)}")
 
+def _chat_messages(request: dict) -> list:
+    """요청에서 채팅 메시지 추출 (단일 message면 요리 도우미 시스템 메시지와 함께 리스트로 변환)"""
+    messages = request.get("messages", [])
+    user_message = request.get("message", "")
+    
+    if user_message and not messages:
+        messages = [
+            {"role": "system", "content": COOK_CHAT_SYSTEM_MESSAGE},
+            {"role": "user", "content": user_message}
+        ]
+    return messages
+
+def _recipe_guide_prompt(recipe_data: dict) -> str:
+    """레시피 가이드 프롬프트"""
+    recipe_title = recipe_data.get("title", "레시피")
+    recipe_ingredients = recipe_data.get("ingredients", "")
+    recipe_content = recipe_data.get("content", "")
+    
+    return f"""{RECIPE_GUIDE_PREAMBLE}{recipe_title}
+재료: {recipe_ingredients}
+조리법: {recipe_content[:500]}
+
+이 레시피에 대한 친절하고 단계별 요리 가이드를 제공해주세요. 첫 번째 단계부터 시작해서 차근차근 설명해주세요."""
+
 # LLM 챗봇 연동 엔드포인트 (Hugging Face 모델 사용)
 @router.post("/llama/chat")
 def llama_chat(request: dict):
@@ -213,16 +375,7 @@ def llama_chat(request: dict):
     try:
         from .llm_service import get_llm_service
         
-        # 메시지 추출
-        messages = request.get("messages", [])
-        user_message = request.get("message", "")
-        
-        # 단일 메시지인 경우 리스트로 변환
-        if user_message and not messages:
-            messages = [
-                {"role": "system", "content": "너는 친절한 한국 요리 도우미 셰프야. 사용자의 요리 관련 질문에 도움을 줘."},
-                {"role": "user", "content": user_message}
-            ]
+        messages = _chat_messages(request)
         
         # LLM 서비스 호출
         llm_service = get_llm_service()
@@ -250,19 +403,8 @@ def llama_recipe_guide(recipe_data: dict):
     try:
         from .llm_service import get_llm_service
         
-        # 레시피 정보 추출
         recipe_title = recipe_data.get("title", "레시피")
-        recipe_ingredients = recipe_data.get("ingredients", "")
-        recipe_content = recipe_data.get("content", "")
-        
-        # 프롬프트 생성
-        prompt = f"""다음 레시피에 대한 요리 가이드를 시작합니다.
-
-레시피 이름: {recipe_title}
-재료: {recipe_ingredients}
-조리법: {recipe_content[:500]}
-
-이 레시피에 대한 친절하고 단계별 요리 가이드를 제공해주세요. 첫 번째 단계부터 시작해서 차근차근 설명해주세요."""
+        prompt = _recipe_guide_prompt(recipe_data)
         
         # LLM 서비스 호출
         llm_service = get_llm_service()
@@ -285,6 +427,57 @@ def llama_recipe_guide(recipe_data: dict):
         logger.error(f"레시피 가이드 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"레시피 가이드 오류: {str(e)}")
 
+# LLM 토큰 스트리밍 엔드포인트 (SSE: token 이벤트로 생성 중인 텍스트, 마지막에 done 이벤트)
+@router.post("/llama/chat/stream")
+def llama_chat_stream(request: dict):
+    """/llama/chat의 스트리밍 버전 (text/event-stream)"""
+    try:
+        from .llm_service import get_llm_service
+        
+        llm_service = get_llm_service()
+        tokens = llm_service.chat_stream(
+            messages=_chat_messages(request),
+            max_length=256,
+            temperature=0.7
+        )
+    except Exception as e:
+        logger = logging.getLogger(__name__)
+        logger.error(f"LLM 챗봇 스트리밍 오류: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"LLM 챗봇 오류: {str(e)}")
+    
+    return sse_response(token_events(
+        tokens,
+        done=lambda text: {"response": text, "model": llm_service.model_name, "status": "success"},
+    ))
+
+@router.post("/llama/recipe-guide/stream")
+def llama_recipe_guide_stream(recipe_data: dict):
+    """/llama/recipe-guide의 스트리밍 버전 (text/event-stream)"""
+    try:
+        from .llm_service import get_llm_service
+        
+        llm_service = get_llm_service()
+        tokens = llm_service.generate_stream(
+            prompt=_recipe_guide_prompt(recipe_data),
+            max_length=512,
+            temperature=0.7
+        )
+    except Exception as e:
+        logger = logging.getLogger(__name__)
+        logger.error(f"레시피 가이드 스트리밍 오류: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"레시피 가이드 오류: {str(e)}")
+    
+    recipe_title = recipe_data.get("title", "레시피")
+    return sse_response(token_events(
+        tokens,
+        done=lambda text: {
+            "guide": text,
+            "recipe_title": recipe_title,
+            "model": llm_service.model_name,
+            "status": "success"
+        },
+    ))
+
 # 예시 헬로우 엔드포인트(유지)
 @router.get("/hello")
 def hello():
@@ -327,21 +520,14 @@ def test_llm(request: dict):
 
 @router.get("/llm/status")
 def get_llm_status():
-    """LLM 모델 상태 확인"""
-    try:
-        from .llm_service import get_llm_service
-        
-        llm_service = get_llm_service()
-        
-        return {
-            "model_name": llm_service.model_name,
-            "device": llm_service.device,
-            "is_loaded": llm_service.is_loaded(),
-            "status": "ready" if llm_service.is_loaded() else "not_loaded"
-        }
-        
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e)
-        }
+    """LLM 모델 상태 확인 (not_loaded / loading / ready / failed)
+
+    모델을 로드하지 않고 상태만 조회한다. readiness probe용 엔드포인트로,
+    트래픽을 받을 수 없으면(ready=false) 503을 반환한다.
+    - LLM_WARMUP=1: 워밍업이 끝날 때까지 503
+    - LLM_WARMUP=0: 첫 요청 때 로드하므로 not_loaded도 200, 로드 실패 시에만 503
+    """
+    from .llm_service import get_llm_status as llm_status
+    
+    status = llm_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
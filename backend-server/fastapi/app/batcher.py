@@ -0,0 +1,113 @@
+"""
+비동기 마이크로 배칭
+짧은 시간 창(수 ms) 안에 들어온 요청들을 모아 한 번의 배치 호출로 처리하고
+각 요청자에게 자기 행의 결과를 돌려준다.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence
+
+from .inference import OverloadedError, WaitStats
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """요청을 모아 process_batch(items) -> results 를 한 번에 실행"""
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+        queue_timeout_ms: float = 0.0,
+    ):
+        self.process_batch = process_batch
+        self.executor = executor  # None이면 기본 스레드풀
+        self.queue_timeout = max(0.0, queue_timeout_ms) / 1000.0  # 0이면 무제한
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self.queue_wait = WaitStats()  # 제출 ~ 배치 실행 시작까지 (항목별)
+        self.timed_out = 0
+
+    async def submit(self, item: Any) -> Any:
+        """항목 하나를 제출하고 배치 처리 결과 중 자기 몫을 기다림"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # 배치가 다 차지 않았으면 대기 시간만큼 더 모은다
+            if self.max_wait and self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # 대기 중 취소된 요청은 제외하고, 대기 시간을 넘긴 요청은 실행하지 않고 바로 실패 처리
+            live = [(item, future, enqueued) for item, future, enqueued in batch if not future.cancelled()]
+            if self.queue_timeout:
+                now = time.perf_counter()
+                expired = [entry for entry in live if now - entry[2] > self.queue_timeout]
+                for _, future, _ in expired:
+                    future.set_exception(OverloadedError("요청 대기 시간이 초과되었습니다"))
+                self.timed_out += len(expired)
+                live = [entry for entry in live if now - entry[2] <= self.queue_timeout]
+            if not live:
+                continue
+
+            self.batches += 1
+            self.items += len(live)
+            self.max_seen_batch = max(self.max_seen_batch, len(live))
+
+            try:
+                results = await self._loop.run_in_executor(self.executor, self._process, live)
+            except Exception as e:
+                logger.error(f"배치 처리 오류: {str(e)}")
+                for _, future, _ in live:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(live, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _process(self, live: list) -> Sequence[Any]:
+        started = time.perf_counter()
+        for _, _, enqueued in live:
+            self.queue_wait.record(started - enqueued)
+        return self.process_batch([item for item, _, _ in live])
+
+    def stats(self) -> dict:
+        """배칭 상태 (배치 수, 평균/최대 배치 크기)"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_seen_batch": self.max_seen_batch,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_wait": self.queue_wait.stats(),
+            "timed_out": self.timed_out,
+        }
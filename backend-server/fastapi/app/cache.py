@@ -0,0 +1,120 @@
+"""
+프로세스 내 캐시
+항목 수/메모리 상한(및 선택적 TTL)이 있는 LRU 캐시와 적중/실패 카운터
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+
+def _sizeof(value: Any) -> int:
+    """캐시 값의 대략적인 메모리 크기 (numpy 배열은 nbytes 사용)"""
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return sys.getsizeof(value)
+
+
+def file_version(paths: Iterable[str], *extra: Any) -> str:
+    """파일 크기/수정 시각(+ 추가 값) 해시 (인덱스/메타데이터 버전 식별용, 파일 내용은 읽지 않음)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        if not os.path.exists(path):
+            digest.update(b"<missing>")
+            continue
+        stat = os.stat(path)
+        digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    for value in extra:
+        digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """항목 수와 바이트 상한(선택적으로 TTL)을 가진 스레드 안전 LRU 캐시"""
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sizeof: Callable[[Any], int] = _sizeof,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                del self._data[key]  # 만료
+                self._bytes -= entry[1]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # 상한보다 큰 값은 저장하지 않음
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """캐시 상태 (항목 수, 메모리, 적중률)"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
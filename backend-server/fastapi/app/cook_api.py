@@ -4,12 +4,17 @@
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+import asyncio
 import logging
 import httpx
 import os
 
+from .cache import LRUCache
+from .prompts import STEP_PROMPT_PREAMBLE
+from .sse import sse_event, sse_response, token_events
 from .cook_session import (
     session_manager, 
     constraint_parser, 
@@ -23,6 +28,17 @@ logger = logging.getLogger(__name__)
 # 라우터 생성
 router = APIRouter(prefix="/cook", tags=["Cook"])
 
+# 수정된 조리 단계 캐시 ((레시피 ID, 단계 번호, 원문 단계, 정규화된 제약사항 집합) -> 수정된 단계)
+# 인기 레시피는 여러 사용자가 같은 제약사항으로 요리하므로 LLM 생성 결과를 세션 간에 재사용
+step_cache = LRUCache(
+    max_entries=int(os.getenv("COOK_STEP_CACHE_SIZE", "5000")),
+    max_bytes=int(float(os.getenv("COOK_STEP_CACHE_MAX_MB", "32")) * 1024 * 1024),
+    ttl=float(os.getenv("COOK_STEP_CACHE_TTL", "86400")),
+)
+# 1이면 수정된 단계를 greedy로 생성 → 같은 입력에 항상 같은 결과라 캐시된 결과가 새로 생성한 것과 같음
+COOK_STEP_DETERMINISTIC = os.getenv("COOK_STEP_DETERMINISTIC", "0") == "1"
+STEP_TEMPERATURE = 0.0 if COOK_STEP_DETERMINISTIC else 0.7
+
 # 요청 모델들
 class SelectRecipeRequest(BaseModel):
     user_id: str
@@ -128,7 +144,8 @@ async def next_step(req: NextStepRequest):
             session.recipe_data.get('title', ''),
             session.current_step,
             original_step,
-            session.constraints
+            session.constraints,
+            recipe_id=session.recipe_id
         )
         
         # 다음 단계로 이동
@@ -145,6 +162,71 @@ async def next_step(req: NextStepRequest):
         logger.error(f"다음 단계 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"다음 단계 실패: {str(e)}")
 
+@router.post("/next/stream")
+def next_step_stream(req: NextStepRequest):
+    """/cook/next의 스트리밍 버전 (text/event-stream)
+
+    step 이벤트(원문 단계) → token 이벤트(수정된 단계 생성 중) → done 이벤트(수정된 단계 전체)
+    """
+    session = session_manager.get_session(req.user_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다")
+    
+    if not session.recipe_data:
+        raise HTTPException(status_code=400, detail="레시피 데이터가 없습니다")
+    
+    steps = session.recipe_data.get('instructions', [])
+    if session.current_step >= len(steps):
+        raise HTTPException(status_code=400, detail="모든 단계를 완료했습니다")
+    
+    step_index = session.current_step
+    original_step = steps[step_index]
+    constraints = _canonical_constraints(session.constraints)
+    recipe_title = session.recipe_data.get('title', '')
+    cache_key = _step_cache_key(session.recipe_id, step_index, original_step, constraints)
+    
+    # 다음 단계로 이동 (스트림 시작 시점에 확정)
+    session.current_step += 1
+    
+    step_info = {
+        "success": True,
+        "step_index": step_index,
+        "original_step": original_step,
+        "applied_constraints": jsonable_encoder(session.constraints),
+    }
+    
+    def events():
+        # 원문 단계는 생성을 기다리지 않고 바로 전송
+        yield sse_event("step", step_info)
+        cached = step_cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            # 이미 생성된 단계는 한 번에 전송
+            yield sse_event("token", {"text": cached})
+            yield sse_event("done", {**step_info, "modified_step": cached})
+            return
+        
+        def done(text):
+            if text and cache_key is not None:
+                step_cache.put(cache_key, text)
+            return {**step_info, "modified_step": text or original_step}
+        
+        fallback = lambda e, partial: {**step_info, "modified_step": _fallback_step(original_step, constraints)}
+        try:
+            from .llm_service import get_llm_service
+            
+            tokens = get_llm_service().generate_stream(
+                prompt=_step_prompt(recipe_title, step_index, original_step, constraints),
+                max_length=256,
+                temperature=STEP_TEMPERATURE
+            )
+        except Exception as e:
+            logger.error(f"LLM 요청 오류: {str(e)}")
+            yield sse_event("done", fallback(e, ""))
+            return
+        yield from token_events(tokens, done=done, on_error=fallback)
+    
+    return sse_response(events())
+
 @router.get("/current", response_model=StepResponse)
 async def get_current_step(req: GetCurrentStepRequest):
     """현재 단계 조회"""
@@ -167,7 +249,8 @@ async def get_current_step(req: GetCurrentStepRequest):
             session.recipe_data.get('title', ''),
             session.current_step,
             original_step,
-            session.constraints
+            session.constraints,
+            recipe_id=session.recipe_id
         )
         
         return StepResponse(
@@ -198,42 +281,25 @@ async def clear_session(user_id: str):
 async def load_recipe_data(recipe_id: int) -> Dict:
     """레시피 데이터 로드 (FAISS 벡터DB에서)"""
     try:
-        from .rag_chain import chain
+        from .recipe_store import recipe_lists
+        from .resources import get_metadata, get_recipe_id_index
         
-        # FAISS에서 레시피 ID로 검색
-        all_recipes = chain.all_recipes
+        # FAISS 메타데이터(전역 레지스트리 공유 객체)에서 레시피 ID로 조회
+        all_recipes = get_metadata()
         if not all_recipes:
             raise Exception("레시피 데이터가 로드되지 않았습니다")
         
-        # 레시피 ID로 검색
-        target_recipe = None
-        for recipe in all_recipes:
-            if recipe.get('id') == recipe_id:
-                target_recipe = recipe
-                break
-        
-        if not target_recipe:
+        # id -> 행 번호 인덱스로 바로 조회 (로딩 시 한 번 구축)
+        row = get_recipe_id_index().row(recipe_id)
+        if row is None:
             raise Exception(f"레시피 ID {recipe_id}를 찾을 수 없습니다")
+        target_recipe = all_recipes[row]
         
-        # 조리법을 단계별로 분리
+        # 조리 단계/재료 목록은 저장소 구축 시 미리 분리해 둔 것을 사용
+        lists = recipe_lists(all_recipes, row)
+        instructions = lists["steps"]
+        ingredients = lists["ingredient_list"]
         content = target_recipe.get('content', '')
-        instructions = []
-        
-        if content:
-            # 줄바꿈으로 분리하고 번호가 있는 단계들만 추출
-            lines = content.split('\n')
-            step_num = 1
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('#'):  # 빈 줄과 주석 제외
-                    instructions.append(f"{step_num}. {line}")
-                    step_num += 1
-        
-        # 재료 리스트 파싱
-        ingredients_str = target_recipe.get('ingredients', '')
-        ingredients = []
-        if ingredients_str:
-            ingredients = [ing.strip() for ing in ingredients_str.split(',') if ing.strip()]
         
         return {
             "id": recipe_id,
@@ -263,39 +329,88 @@ async def generate_modified_step_with_llm(
     recipe_title: str,
     step_index: int,
     original_step: str,
-    constraints: List[Constraint]
+    constraints: List[Constraint],
+    recipe_id: Optional[int] = None
 ) -> str:
-    """LLM을 사용하여 수정된 단계 생성 (Hugging Face 모델 사용)"""
+    """LLM을 사용하여 수정된 단계 생성 (Hugging Face 모델 사용)
+
+    recipe_id가 있으면 같은 레시피/단계/제약사항 집합의 이전 생성 결과를 재사용한다.
+    """
+    constraints = _canonical_constraints(constraints)
+    cache_key = _step_cache_key(recipe_id, step_index, original_step, constraints)
+    if cache_key is not None:
+        cached = step_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
     try:
         from .llm_service import get_llm_service
         
-        # 제약사항을 텍스트로 변환
-        constraints_text = ", ".join([
-            f"{c.type}: {c.action}" + (f" ({c.degree})" if c.degree else "")
-            for c in constraints
-        ])
-        
-        prompt = f"""너는 한국 요리 도우미 셰프야. 사용자의 즉석 요구를 반영해 현재 단계만 안전하게 수정하되, 재료/비율/불 세기/타이밍을 구체적으로 제시해.
-
-레시피 제목: {recipe_title}
-현재 단계 번호: {step_index}
-원문 단계: {original_step}
-
-사용자 요구(누적): {constraints_text}
-
-주어진 요구를 반영하여, "수정된 단계"만 2~3문장으로 출력하고, 가능하면 대체재 1가지와 주의사항 1가지를 덧붙여줘."""
+        prompt = _step_prompt(recipe_title, step_index, original_step, constraints)
         
-        # LLM 서비스 호출
-        llm_service = get_llm_service()
-        modified_step = llm_service.generate(
-            prompt=prompt,
-            max_length=256,
-            temperature=0.7
+        # LLM 서비스 호출 (스레드에서 대기 → 모델 로딩/워밍업이나 다른 세션 요청과의 배치 생성 동안 이벤트 루프를 막지 않음)
+        modified_step = await asyncio.to_thread(
+            lambda: get_llm_service().generate(
+                prompt=prompt,
+                max_length=256,
+                temperature=STEP_TEMPERATURE
+            )
         )
         
+        if modified_step and cache_key is not None:
+            step_cache.put(cache_key, modified_step)
         return modified_step if modified_step else original_step
                 
     except Exception as e:
         logger.error(f"LLM 요청 오류: {str(e)}")
         # LLM 실패 시 룰 기반 결과 반환
-        return f"{original_step} (사용자 요구사항이 반영되었습니다: {', '.join([c.type for c in constraints])})"
+        return _fallback_step(original_step, constraints)
+
+def _canonical_constraints(constraints: List[Constraint]) -> List[Constraint]:
+    """제약사항 정규화 (중복 제거 + 정렬 → 추가 순서가 달라도 같은 프롬프트/캐시 키)"""
+    unique = {(c.type, c.action, c.degree or "", c.value or ""): c for c in constraints}
+    return [unique[key] for key in sorted(unique)]
+
+def _step_cache_key(
+    recipe_id: Optional[int],
+    step_index: int,
+    original_step: str,
+    constraints: List[Constraint]
+) -> Optional[tuple]:
+    """수정된 단계 캐시 키 (constraints는 정규화된 목록, 레시피 ID가 없으면 캐시하지 않음)
+
+    레시피 데이터가 바뀌어도 이전 결과를 주지 않도록 원문 단계도 키에 포함한다.
+    """
+    if recipe_id is None:
+        return None
+    return (
+        recipe_id,
+        step_index,
+        original_step,
+        tuple((c.type, c.action, c.degree or "", c.value or "") for c in constraints)
+    )
+
+def _step_prompt(
+    recipe_title: str,
+    step_index: int,
+    original_step: str,
+    constraints: List[Constraint]
+) -> str:
+    """조리 단계 수정 프롬프트"""
+    # 제약사항을 텍스트로 변환
+    constraints_text = ", ".join([
+        f"{c.type}: {c.action}" + (f" ({c.degree})" if c.degree else "")
+        for c in constraints
+    ])
+    
+    return f"""{STEP_PROMPT_PREAMBLE}{recipe_title}
+현재 단계 번호: {step_index}
+원문 단계: {original_step}
+
+사용자 요구(누적): {constraints_text}
+
+주어진 요구를 반영하여, "수정된 단계"만 2~3문장으로 출력하고, 가능하면 대체재 1가지와 주의사항 1가지를 덧붙여줘."""
+
+def _fallback_step(original_step: str, constraints: List[Constraint]) -> str:
+    """LLM을 쓸 수 없을 때의 단계 문구"""
+    return f"{original_step} (사용자 요구사항이 반영되었습니다: {', '.join([c.type for c in constraints])})"
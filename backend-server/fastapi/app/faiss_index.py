@@ -0,0 +1,184 @@
+"""
+FAISS 인덱스 생성/로딩 공통 모듈
+빌더(build_faiss*.py)와 서빙 코드가 같은 인덱스 설정을 공유한다.
+
+- 인덱스 종류: flat(전수 검색) / ivf(IVF-Flat) / hnsw, 압축 저장용 pq / ivf_pq / sq8 / fp16,
+  또는 factory 문자열 직접 지정 (압축 인덱스는 원본 벡터 재정렬(refine) 선택 가능)
+- 검색 파라미터(nprobe, efSearch)는 faiss_store/index_params.json에 저장되고
+  서빙 시 load_index()에서 인덱스에 적용된다.
+"""
+
+import json
+import logging
+import math
+import os
+from typing import Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_PARAMS_FILENAME = "index_params.json"
+EMBEDDINGS_FILENAME = "embeddings.f32"  # 평가용 원본 벡터 (FAISS_SAVE_EMBEDDINGS=1)
+
+# 인덱스 종류별 factory 문자열 템플릿
+INDEX_FACTORIES = {
+    "flat": "Flat",
+    "ivf": "IVF{nlist},Flat",
+    "hnsw": "HNSW{hnsw_m},Flat",
+    "pq": "PQ{pq_m}",
+    "ivf_pq": "IVF{nlist},PQ{pq_m}",
+    "sq8": "SQ8",
+    "fp16": "SQfp16",
+}
+
+# 압축 인덱스 결과를 재정렬할 벡터 저장 방식 (FAISS_REFINE)
+REFINE_SUFFIXES = {
+    "": "",
+    "flat": ",RFlat",
+    "fp16": ",Refine(SQfp16)",
+}
+
+
+def index_params_path(index_path: str) -> str:
+    """인덱스 파일 옆에 저장되는 검색 파라미터 파일 경로"""
+    return os.path.join(os.path.dirname(index_path), INDEX_PARAMS_FILENAME)
+
+
+def embeddings_path(index_path: str) -> str:
+    """빌드 시 함께 저장하는 원본 임베딩 파일 경로"""
+    return os.path.join(os.path.dirname(index_path), EMBEDDINGS_FILENAME)
+
+
+def default_nlist(n_vectors: int) -> int:
+    """IVF 리스트 수 기본값 (≈ 4·√N)"""
+    return max(1, int(4 * math.sqrt(max(n_vectors, 1))))
+
+
+def build_config_from_env(n_vectors: int) -> dict:
+    """빌드 설정 (환경 변수 FAISS_INDEX_TYPE / FAISS_INDEX_FACTORY 등)"""
+    index_type = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+    nlist = int(os.getenv("FAISS_NLIST", "0")) or default_nlist(n_vectors)
+    hnsw_m = int(os.getenv("FAISS_HNSW_M", "32"))
+    pq_m = int(os.getenv("FAISS_PQ_M", "64"))
+    refine = os.getenv("FAISS_REFINE", "").lower()
+
+    factory = os.getenv("FAISS_INDEX_FACTORY")
+    if not factory:
+        if index_type not in INDEX_FACTORIES:
+            raise ValueError(f"지원하지 않는 인덱스 종류: {index_type} ({', '.join(INDEX_FACTORIES)})")
+        if refine not in REFINE_SUFFIXES:
+            raise ValueError(f"지원하지 않는 refine 방식: {refine} ({', '.join(r for r in REFINE_SUFFIXES if r)})")
+        factory = INDEX_FACTORIES[index_type].format(nlist=nlist, hnsw_m=hnsw_m, pq_m=pq_m)
+        factory += REFINE_SUFFIXES[refine]
+
+    return {
+        "factory": factory,
+        "nprobe": int(os.getenv("FAISS_NPROBE", str(max(1, nlist // 16)))),
+        "efSearch": int(os.getenv("FAISS_EF_SEARCH", "128")),
+        "k_factor": float(os.getenv("FAISS_REFINE_K_FACTOR", "4")),
+        "train_size": int(os.getenv("FAISS_TRAIN_SIZE", "100000")),
+        "nlist": nlist,
+    }
+
+
+def create_index(dimension: int, factory: str) -> faiss.Index:
+    """factory 문자열로 L2 인덱스 생성"""
+    return faiss.index_factory(dimension, factory, faiss.METRIC_L2)
+
+
+def supports_gpu(factory: str) -> bool:
+    """GPU로 옮겨서 구축할 수 있는 인덱스인지 (Flat / IVF 계열만, refine 제외)"""
+    if "HNSW" in factory or "Refine" in factory or "RFlat" in factory:
+        return False
+    return factory == "Flat" or factory.startswith("IVF")
+
+
+def train_sample_size(config: dict, n_vectors: int) -> int:
+    """학습에 사용할 벡터 수 (IVF는 리스트당 약 39개 이상 권장)"""
+    return min(n_vectors, max(39 * config["nlist"], 10000), config["train_size"])
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray) -> None:
+    """학습이 필요한 인덱스(IVF/PQ 등)만 학습"""
+    if index.is_trained:
+        return
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    logger.info(f"🎯 인덱스 학습 중: {len(vectors)}개 벡터")
+    index.train(vectors)
+
+
+def apply_search_params(index: faiss.Index, params: dict) -> None:
+    """nprobe / efSearch / k_factor 등 검색 파라미터 적용 (해당 없는 파라미터는 무시)"""
+    space = faiss.ParameterSpace()
+    # 저장 이름 -> ParameterSpace 파라미터 이름 (IndexRefine의 k_factor는 k_factor_rf)
+    for name, space_name in (("nprobe", "nprobe"), ("efSearch", "efSearch"), ("k_factor", "k_factor_rf")):
+        value = params.get(name)
+        if value is None:
+            continue
+        try:
+            space.set_index_parameter(index, space_name, value)
+        except RuntimeError:
+            pass  # 해당 인덱스 종류에 없는 파라미터
+
+
+def save_index_params(index_path: str, config: dict, ntotal: int) -> None:
+    """검색 파라미터를 인덱스 옆에 저장"""
+    params = {
+        "factory": config["factory"],
+        "nprobe": config.get("nprobe"),
+        "efSearch": config.get("efSearch"),
+        "k_factor": config.get("k_factor"),
+        "ntotal": int(ntotal),
+    }
+    with open(index_params_path(index_path), "w", encoding="utf-8") as f:
+        json.dump(params, f, ensure_ascii=False, indent=2)
+
+
+def load_index_params(index_path: str) -> dict:
+    """저장된 검색 파라미터 (+ 환경 변수 FAISS_NPROBE / FAISS_EF_SEARCH 우선)"""
+    params = {}
+    path = index_params_path(index_path)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            params = json.load(f)
+    if os.getenv("FAISS_NPROBE"):
+        params["nprobe"] = int(os.getenv("FAISS_NPROBE"))
+    if os.getenv("FAISS_EF_SEARCH"):
+        params["efSearch"] = int(os.getenv("FAISS_EF_SEARCH"))
+    return params
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """인덱스가 차지하는 메모리 (직렬화 크기 기준)"""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray, k: int) -> float:
+    """기준(전수 검색) top-k 대비 근사 결과 top-k의 평균 재현율"""
+    hits = 0
+    for approx, exact in zip(approx_ids[:, :k], exact_ids[:, :k]):
+        hits += len(set(approx.tolist()) & set(exact.tolist()))
+    return hits / float(len(exact_ids) * k) if len(exact_ids) else 0.0
+
+
+def read_index(index_path: str, mmap: Optional[bool] = None) -> faiss.Index:
+    """인덱스 파일 읽기 (FAISS_MMAP=1 이면 IO_FLAG_MMAP으로 페이지 캐시를 공유, 미지원 인덱스는 일반 로딩)"""
+    if mmap is None:
+        mmap = os.getenv("FAISS_MMAP", "0") == "1"
+    if mmap:
+        try:
+            return faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logger.warning(f"mmap 로딩 실패, 일반 로딩으로 전환: {str(e)}")
+    return faiss.read_index(index_path)
+
+
+def load_index(index_path: str, params: Optional[dict] = None) -> faiss.Index:
+    """인덱스를 읽고 저장된 검색 파라미터를 적용"""
+    index = read_index(index_path)
+    params = load_index_params(index_path) if params is None else params
+    apply_search_params(index, params)
+    logger.info(f"📁 FAISS 인덱스 로딩: {params.get('factory', type(index).__name__)} (ntotal={index.ntotal}, nprobe={params.get('nprobe')}, efSearch={params.get('efSearch')})")
+    return index
@@ -1,191 +1,416 @@
-import faiss, pickle, numpy as np, math
-from sentence_transformers import SentenceTransformer
-from sqlalchemy import text
-from app.db import SessionLocal
-import re
-
-INDEX_SAVE_PATH = "faiss_store/index.faiss"
-META_SAVE_PATH  = "faiss_store/metadata.pkl"
-
-model = SentenceTransformer("snunlp/KR-SBERT-V40K-klueNLI-augSTS")
-index = faiss.read_index(INDEX_SAVE_PATH)
-with open(META_SAVE_PATH, "rb") as f:
-    metadata = pickle.load(f)
-
-# 동의어/유의어 사전
-SYNONYM_MAP = {
-    # 계란 관련
-    "계란": "달걀",
-    "달걀": "달걀",
-    "노른자": "달걀",
-    "흰자": "달걀",
-    
-    # 간장 관련
-    "진간장": "간장",
-    "양조간장": "간장",
-    "간장": "간장",
-    "국간장": "간장",
-    
-    # 설탕 관련
-    "설탕": "설탕",
-    "흑설탕": "설탕",
-    "백설탕": "설탕",
-    "황설탕": "설탕",
-    
-    # 식용유 관련
-    "식용유": "식용유",
-    "카놀라유": "식용유",
-    "포도씨유": "식용유",
-    "올리브유": "식용유",
-    
-    # 파 관련
-    "대파": "파",
-    "쪽파": "파",
-    "파": "파",
-    "실파": "파",
-    "청파": "파",
-    
-    # 양파 관련
-    "양파": "양파",
-    "적양파": "양파",
-    "흰양파": "양파",
-    
-    # 감자 관련
-    "감자": "감자",
-    "새감자": "감자",
-    "조리감자": "감자",
-    
-    # 당근 관련
-    "당근": "당근",
-    "홍당근": "당근",
-    
-    # 소금 관련
-    "소금": "소금",
-    "천일염": "소금",
-    "굵은소금": "소금",
-    
-    # 후추 관련
-    "후추": "후추",
-    "흑후추": "후추",
-    "백후추": "후추",
-    
-    # 마늘 관련
-    "마늘": "마늘",
-    "다진마늘": "마늘",
-    "편마늘": "마늘",
-    
-    # 고추장 관련
-    "고추장": "고추장",
-    "참고추장": "고추장",
-    
-    # 고춧가루 관련
-    "고춧가루": "고춧가루",
-    "매운고춧가루": "고춧가루",
-    "순한고춧가루": "고춧가루",
-    
-    # 참기름 관련
-    "참기름": "참기름",
-    "들기름": "참기름",
-    
-    # 버터 관련
-    "버터": "버터",
-    "무염버터": "버터",
-    "유산지": "버터",
-    
-    # 물 관련
-    "물": "물",
-    "차가운": "물",
-    "따뜻한": "물",
-    "미지근한": "물",
-}
-
-def extract_name(ingredient):
-    # 한글, 영문만 남기고 나머지(숫자, 특수문자, 단위 등) 제거
-    cleaned = re.sub(r'[^가-힣a-zA-Z]', '', ingredient)
-    
-    # 접두어 제거 (진, 생, 말린, 건, 등)
-    prefixes = ['진', '생', '말린', '건', '다진', '채썬', '썰은', '썬', '새', '조리', '참', '매운', '순한', '흰', '적', '홍']
-    for prefix in prefixes:
-        if cleaned.startswith(prefix):
-            cleaned = cleaned[len(prefix):]
-    
-    # 동의어 통일
-    return SYNONYM_MAP.get(cleaned, cleaned) if cleaned else ingredient
-
-def recommend_recipes(user_ingredients: list, top_k: int = 500):
-    print(f"\n=== 검색 시작: {user_ingredients} ===")
-    
-    query = f"이 요리의 재료는 {', '.join(user_ingredients)}입니다."
-    emb = model.encode([query]).astype("float32")
-    D, I = index.search(emb, top_k)
-    
-    print(f"\nFAISS 검색 결과: {len(I[0])}개")
-    print(f"첫 5개 거리값: {D[0][:5]}")
+import numpy as np, os, sys, logging
+from app.batcher import MicroBatcher
+from app.cache import LRUCache
+from app.db import SessionLocal, fetch_recipe_titles_by_ids, fetch_recipes_by_ids
+from app.inference import InferenceExecutor
+from app.ingredient_index import canonicalize_ingredients
+from app.metrics import SEARCH_ROUNDS, stage_timer
+from app.resources import (
+    get_index,
+    get_index_version,
+    get_ingredient_index,
+    get_metadata,
+    get_model,
+    get_sparse_index,
+)
+from app.sparse_index import rrf_fuse
+
+logger = logging.getLogger(__name__)
+
+# 모델/인덱스/메타데이터는 프로세스 전역 레지스트리에서 공유 (다른 라우터와 같은 객체)
+model = get_model()
+index = get_index()  # 저장된 nprobe/efSearch 적용
+# 컬럼형 저장소(faiss_store/recipes)가 있으면 mmap, 없으면 metadata.pkl
+metadata = get_metadata()
+
+# 로딩된 인덱스/메타데이터 쌍의 버전 (결과 캐시 키에 포함, 프로세스당 한 번 계산)
+INDEX_VERSION = get_index_version()
+
+# 재료 어휘/CSR 인덱스는 metadata 로딩 시 한 번만 구축
+ingredient_index = get_ingredient_index()
+
+# 하이브리드 검색: FAISS 상위 HYBRID_DENSE_K개와 재료 BM25 상위 HYBRID_SPARSE_K개를 RRF로 결합
+# (밀집 검색이 놓치는 정확한 재료 일치를 보완 → top_k를 크게 잡지 않아도 됨). RECOMMEND_HYBRID=0이면 밀집 검색만
+HYBRID_ENABLED = os.getenv("RECOMMEND_HYBRID", "1") == "1"
+HYBRID_DENSE_K = int(os.getenv("RECOMMEND_HYBRID_DENSE_K", "100"))
+HYBRID_SPARSE_K = int(os.getenv("RECOMMEND_HYBRID_SPARSE_K", "100"))
+RRF_K = int(os.getenv("RECOMMEND_RRF_K", "60"))
+sparse_index = get_sparse_index() if HYBRID_ENABLED else None
+
+# 쿼리 임베딩 캐시 (정규화된 재료 집합 -> 임베딩 벡터)
+embedding_cache = LRUCache(
+    max_entries=int(os.getenv("EMBED_CACHE_SIZE", "20000")),
+    max_bytes=int(float(os.getenv("EMBED_CACHE_MAX_MB", "128")) * 1024 * 1024),
+)
+
+def _results_nbytes(results: list) -> int:
+    """추천 결과 리스트의 대략적인 메모리 크기"""
+    return sys.getsizeof(results) + sum(
+        sys.getsizeof(r["title"]) + sys.getsizeof(r["ingredients"]) + sys.getsizeof(r["content"])
+        for r in results
+    )
+
+# 추천 결과 캐시 ((인덱스 버전, 정규화된 재료 집합, top_k, limit) -> 결과 리스트, limit=None이면 전체)
+result_cache = LRUCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", "2000")),
+    max_bytes=int(float(os.getenv("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "600")),
+    sizeof=_results_nbytes,
+)
+
+def encode_queries(canonicals: list) -> np.ndarray:
+    """정규화된 재료 집합들의 쿼리 임베딩 (캐시에 없는 것만 한 번에 encode)"""
+    embs = [embedding_cache.get(c) for c in canonicals]
+    missing = list(dict.fromkeys(c for c, e in zip(canonicals, embs) if e is None))
+    if missing:
+        queries = [f"이 요리의 재료는 {', '.join(c)}입니다." for c in missing]
+        with stage_timer("encode"):
+            vectors = model.encode(queries).astype("float32")
+        encoded = {c: np.array(e) for c, e in zip(missing, vectors)}
+        for c, emb in encoded.items():
+            emb.setflags(write=False)
+            embedding_cache.put(c, emb)
+        embs = [e if e is not None else encoded[c] for c, e in zip(canonicals, embs)]
+    return np.stack(embs)
+
+def encode_query(canonical: tuple) -> np.ndarray:
+    """정규화된 재료 집합의 쿼리 임베딩 (캐시 우선)"""
+    return encode_queries([canonical])[0]
+
+def search_batch(requests: list) -> list:
+    """(정규화된 재료 집합, k, top_k) 목록을 한 번의 encode + 한 번의 FAISS 검색으로 처리
+
+    k는 밀집 검색 깊이(적응형 검색에서 단계적으로 넓힘), top_k는 최종 후보 수.
+    하이브리드 모드에서는 FAISS는 HYBRID_DENSE_K개까지만 검색하고 요청별로 BM25 후보와 합친다.
+    반환하는 D는 후보 순서(작을수록 앞)로, 하이브리드 모드에서는 -RRF 점수.
+    floor는 더 깊게 검색했을 때 새로 생기거나 점수가 바뀔 수 있는 후보의 D 하한 (이보다 작은 D의 후보는
+    순서가 확정, 밀집 검색만 하거나 이미 최종 깊이면 None).
+    """
+    embs = encode_queries([canonical for canonical, _, _ in requests])
+    dense_ks = [min(k, HYBRID_DENSE_K) if sparse_index is not None else k for _, k, _ in requests]
+    with stage_timer("faiss_search"):
+        D, I = index.search(embs, max(dense_ks))
+    if sparse_index is None:
+        return [(D[i:i + 1, :k], I[i:i + 1, :k], None) for i, k in enumerate(dense_ks)]
+    return [
+        _fuse(canonical, I[i, :dense_ks[i]], top_k, final=dense_ks[i] >= _dense_depth(top_k))
+        for i, (canonical, _, top_k) in enumerate(requests)
+    ]
+
+def _dense_depth(top_k: int) -> int:
+    """하이브리드 모드에서 밀집 검색의 최종 깊이"""
+    depth = min(top_k, HYBRID_DENSE_K)
+    return min(depth, index.ntotal) if index.ntotal else depth
+
+def _fuse(canonical: tuple, dense_rows: np.ndarray, top_k: int, final: bool = True):
+    """FAISS 순위와 BM25 순위를 RRF(1 / (RRF_K + 순위))로 합쳐 상위 top_k개 (D=-점수, I=행, floor)
+
+    final이 아니면(밀집 검색을 더 깊게 할 수 있으면) 밀집 순위 len(dense_rows) 이후의 행이 얻을 수 있는
+    점수는 1 / (RRF_K + 1 + len(dense_rows)) 이하이므로, 밀집 후보에 없는 행의 최종 점수 상한
+    (BM25 점수 + 그 값)을 floor(-상한)로 함께 반환한다.
+    """
+    with stage_timer("sparse_search"):
+        masks = [ingredient_index.term_mask(u) for u in canonical]
+        sparse_rows, _ = sparse_index.search(masks, min(top_k, HYBRID_SPARSE_K))
+
+    rows, scores = rrf_fuse(dense_rows, sparse_rows, top_k, RRF_K)
+
+    floor = None
+    if not final:
+        outside = np.flatnonzero(~np.isin(sparse_rows, dense_rows[dense_rows >= 0]))
+        # 밀집 후보에 없는 BM25 행 중 가장 높은 순위의 기여분 (순위 목록이므로 첫 번째가 최대)
+        sparse_best = 1.0 / (RRF_K + 1 + outside[0]) if len(outside) else 0.0
+        floor = -(1.0 / (RRF_K + 1 + len(dense_rows)) + sparse_best)
+    return (-scores).astype("float32")[None, :], rows.astype("int64")[None, :], floor
+
+# /recommend 전용 실행기 (encode/search/매칭·DB 조회) + 처리 중 요청 수 상한
+inference_executor = InferenceExecutor(
+    max_workers=int(os.getenv("RECOMMEND_EXECUTOR_WORKERS", "2")),
+    max_pending=int(os.getenv("RECOMMEND_MAX_PENDING", "64")),
+    name="recommend",
+)
+# 동시 요청을 모아 한 번에 encode/search 하는 배처
+search_batcher = MicroBatcher(
+    search_batch,
+    max_batch_size=int(os.getenv("RECOMMEND_BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("RECOMMEND_BATCH_WAIT_MS", "5")),
+    executor=inference_executor.executor,
+    # 대기열에서 이 시간 안에 encode/search가 시작되지 않으면 실행하지 않고 거절 (0이면 무제한)
+    queue_timeout_ms=float(os.getenv("RECOMMEND_QUEUE_TIMEOUT_MS", "2000")),
+)
+
+# 스트리밍 응답의 첫 청크 / 이후 청크 크기 (첫 결과를 빨리 내보내기 위해 첫 청크는 작게)
+STREAM_FIRST_CHUNK = int(os.getenv("RECOMMEND_STREAM_FIRST_CHUNK", "5"))
+STREAM_CHUNK = int(os.getenv("RECOMMEND_STREAM_CHUNK", "50"))
+
+# limit이 주어지면 작은 k부터 검색하고 상위 limit개가 확정되지 않을 때만 k를 넓힘 (0이면 항상 top_k)
+ADAPTIVE_INITIAL_K = int(os.getenv("RECOMMEND_INITIAL_K", "50"))
+ADAPTIVE_K_GROWTH = max(2, int(os.getenv("RECOMMEND_K_GROWTH", "10")))
+
+def _search_depths(top_k: int, limit) -> list:
+    """검색할 밀집 검색 깊이 k 목록 (마지막은 항상 최종 깊이: top_k 또는 인덱스 전체 크기, 하이브리드는 HYBRID_DENSE_K까지)"""
+    if sparse_index is not None:
+        final_k = _dense_depth(top_k)
+    else:
+        final_k = min(top_k, index.ntotal) if index.ntotal else top_k
+    if limit is None or ADAPTIVE_INITIAL_K <= 0:
+        return [final_k]
+    depths = []
+    k = max(ADAPTIVE_INITIAL_K, limit)
+    while k < final_k:
+        depths.append(k)
+        k *= ADAPTIVE_K_GROWTH
+    depths.append(final_k)
+    return depths
+
+def _cached_results(canonical: tuple, top_k: int, limit):
+    """전체 결과가 캐시에 있으면 잘라서, 없으면 같은 limit의 결과를 반환"""
+    cached = result_cache.get((INDEX_VERSION, canonical, top_k, None))
+    if cached is None and limit is not None:
+        cached = result_cache.get((INDEX_VERSION, canonical, top_k, limit))
+    if cached is None:
+        return None
+    return list(cached[:limit])
+
+def recommend_recipes(user_ingredients: list, top_k: int = 500, limit: int = None):
+    """재료 기반 레시피 추천 (같은 재료 조합은 결과 캐시에서 반환)
+
+    limit이 주어지면 top_k개 이웃 전체로 만든 결과의 상위 limit개와 같은 결과를 반환하되,
+    작은 k에서 확정되면 더 넓게 검색하지 않는다.
+    """
+    canonical = canonicalize_ingredients(user_ingredients)
+    cached = _cached_results(canonical, top_k, limit)
+    if cached is not None:
+        return cached
+
+    depths = _search_depths(top_k, limit)
+    for rounds, k in enumerate(depths, 1):
+        D, I, floor = search_batch([(canonical, k, top_k)])[0]
+        results = _select(canonical, D, I, limit, final=k == depths[-1], floor=floor)
+        if results is not None:
+            break
+    SEARCH_ROUNDS.observe(rounds)
+    result_cache.put((INDEX_VERSION, canonical, top_k, limit), results)
+    return list(results)
+
+async def recommend_recipes_async(user_ingredients: list, top_k: int = 500, limit: int = None):
+    """recommend_recipes의 비동기 버전: encode/search는 동시 요청과 묶어서 배치 처리
+
+    캐시에 없는 요청만 전용 실행기의 상한에 포함되며, 상한 초과나 대기 시간 초과 시 OverloadedError.
+    """
+    canonical = canonicalize_ingredients(user_ingredients)
+    cached = _cached_results(canonical, top_k, limit)
+    if cached is not None:
+        return cached
+
+    depths = _search_depths(top_k, limit)
+    async with inference_executor.admit():
+        for rounds, k in enumerate(depths, 1):
+            D, I, floor = await search_batcher.submit((canonical, k, top_k))
+            results = await inference_executor.run(_select, canonical, D, I, limit, k == depths[-1], floor)
+            if results is not None:
+                break
+    SEARCH_ROUNDS.observe(rounds)
+    result_cache.put((INDEX_VERSION, canonical, top_k, limit), results)
+    return list(results)
+
+async def recommend_recipes_stream(user_ingredients: list, top_k: int = 500):
+    """recommend_recipes_async의 스트리밍 버전: 순위대로 결과 청크(list)를 생성
+
+    실행기 상한 슬롯은 검색과 순위 결정(후보 필터링, 제목 중복 제거), 첫 청크 조회까지만 사용하고
+    클라이언트에 보내기 전에 반환한다 (느리게 읽는 클라이언트가 슬롯을 잡고 있지 않도록).
+    이후 청크는 본문 조회만 하므로 상한 없이 실행기에서 처리한다. DB 세션은 실행기 스레드 안에서
+    조회마다 열고 닫으므로 이벤트 루프에서 DB를 건드리거나 스트림이 커넥션을 잡고 있지 않는다.
+    끝까지 소비된 경우에만 전체 결과를 결과 캐시에 저장한다.
+    """
+    canonical = canonicalize_ingredients(user_ingredients)
+    cache_key = (INDEX_VERSION, canonical, top_k, None)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        if cached:
+            yield list(cached)
+        return
+
+    async with inference_executor.admit():
+        D, I, _ = await search_batcher.submit((canonical, top_k, top_k))
+        candidates, ordered = await inference_executor.run(_stream_order, canonical, D, I)
+        bounds = _stream_chunks(len(ordered))
+        chunk = await inference_executor.run(_fetch_next_chunk, candidates, ordered, bounds)
+    results = []
+    while chunk is not None:
+        results.extend(chunk)
+        yield chunk
+        chunk = await inference_executor.run(_fetch_next_chunk, candidates, ordered, bounds)
+    result_cache.put(cache_key, results)
+
+def _candidates(canonical: tuple, D: np.ndarray, I: np.ndarray):
+    """FAISS 검색 결과(1행)를 재료 매칭으로 필터링 → (거리 순 후보 목록, 매칭 순위)"""
+    logger.debug("검색 시작: %s, FAISS 검색 결과 %d개, 첫 5개 거리값 %s", list(canonical), len(I[0]), D[0][:5])
+
+    # 1) 유효 행만 남기고, 같은 레시피 id는 거리가 가장 작은 행만 유지
+    with stage_timer("dedupe"):
+        rows, dists = I[0], D[0]
+        valid = (rows >= 0) & (rows < len(ingredient_index))
+        rows, dists = rows[valid], dists[valid]
+        rids = ingredient_index.recipe_ids[rows]
+        has_id = rids != 0
+        rows, dists, rids = rows[has_id], dists[has_id], rids[has_id]
+
+        order = np.argsort(dists, kind="stable")
+        rows, dists, rids = rows[order], dists[order], rids[order]
+        _, first = np.unique(rids, return_index=True)
+        first.sort()
+        rows, dists, rids = rows[first], dists[first], rids[first]
+
+    user_clean = list(canonical)
+    logger.debug("중복 제거 후 레시피 수: %d, 정제된 사용자 재료: %s", len(rows), user_clean)
+    if not user_clean:
+        return [], []
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for row in rows[:5]:  # 처음 5개만 로그 출력
+            logger.debug("레시피: %s / 정제된 재료: %s", metadata[row].get("title"), ingredient_index.recipe_terms(row))
+
+    # 2) 후보 블록 전체의 부분 포함 매칭을 한 번에 계산 (u in r or r in u)
+    with stage_timer("scoring"):
+        matched = ingredient_index.match_matrix(rows, user_clean)
+        n_matched = matched.sum(axis=1)
+        match_scores = n_matched / len(user_clean)  # 사용자 재료 중 매칭된 비율
+
+        # 임계값 0.1 (10% 이상 매칭)
+        keep = (n_matched > 0) & (match_scores >= 0.1)
+        rows, rids, matched = rows[keep], rids[keep], matched[keep]
+        n_matched, match_scores = n_matched[keep], match_scores[keep]
+
+        # 매칭된 재료 수 우선 정렬 (동점은 거리 순서 유지)
+        rank = np.argsort(-n_matched, kind="stable")
+
+        candidates = [
+            (int(rids[i]), float(match_scores[i]), [u for u, hit in zip(user_clean, matched[i]) if hit])
+            for i in range(len(rows))
+        ]
+    return candidates, rank
+
+def _ranked_survivors(candidates: list, rank, titles: dict) -> list:
+    """제목 중복 제거는 거리 순서 기준, 반환은 매칭 순위 기준 (후보 인덱스 목록)"""
+    survivors = set()
+    seen = set()
+    for i, (rid, _, _) in enumerate(candidates):
+        title = titles.get(rid)
+        if title is None or title in seen:
+            continue
+        seen.add(title)
+        survivors.add(i)
+    return [i for i in rank if i in survivors]
+
+def _to_result(candidate: tuple, row) -> dict:
+    _, match_score, matched_names = candidate
+    content = row.content if isinstance(row.content, str) else str(row.content)
+    return {
+        "title": row.title,
+        "ingredients": row.ingredients,
+        "content": content.replace("\n", " "),
+        "match_score": match_score,
+        "matched_ingredients": matched_names
+    }
+
+def _rank(canonical: tuple, D: np.ndarray, I: np.ndarray) -> list:
+    """FAISS 검색 결과(1행)를 재료 매칭으로 필터링/정렬하고 DB에서 본문을 채움"""
+    candidates, rank = _candidates(canonical, D, I)
+    if not candidates:
+        return []
+
+    # 3) 살아남은 후보를 IN 쿼리로 한 번에 조회
+    with stage_timer("db_fetch"), SessionLocal() as session:
+        rows_by_id = fetch_recipes_by_ids(session, [rid for rid, _, _ in candidates])
+
+    # 4) 제목 중복 제거 후 매칭 순위대로 결과 구성
+    titles = {rid: row.title for rid, row in rows_by_id.items()}
+    results = [_to_result(candidates[i], rows_by_id[candidates[i][0]]) for i in _ranked_survivors(candidates, rank, titles)]
+
+    logger.debug("최종 추천 결과: %d개", len(results))
+    return results
+
+def _select(canonical: tuple, D: np.ndarray, I: np.ndarray, limit, final: bool, floor=None):
+    """_rank 결과의 상위 limit개 (limit=None이면 _rank와 동일)
+
+    final이 아니면(더 넓게 검색할 수 있으면) 상위 limit개가 확정된 경우에만 결과를 반환하고
+    아니면 None. 정렬 기준이 (매칭 재료 수 내림차순, 거리 오름차순)이므로 검색 범위 밖 후보는
+    매칭 수가 같아도 뒤에 오고, 제목 중복 제거도 거리 순서라 범위 밖 후보의 영향을 받지 않는다.
+    따라서 상위 limit개가 모두 사용자 재료 전부를 매칭했다면 k를 넓혀도 바뀌지 않는다.
+    하이브리드 모드(floor가 있으면)에서는 k를 넓히면 범위 밖 행의 RRF 점수가 floor까지 생기거나 늘 수 있으므로
+    상위 limit개가 D < floor인 후보여야 확정된다.
+    """
+    if limit is None and final:
+        return _rank(canonical, D, I)
+
+    candidates, rank = _candidates(canonical, D, I)
+    if not final:
+        confirmed = _confirmed(canonical, candidates, D, I, floor)
+        # 제목 중복 제거 전에도 확정된 후보가 limit개 미만이면 확정될 수 없으므로 DB 조회 없이 넓힘
+        if sum(confirmed) < limit:
+            return None
+    if not candidates:
+        return []
 
     with SessionLocal() as session:
-        best = {}
-        for idx, dist in zip(I[0], D[0]):
-            if idx < len(metadata):
-                rid = metadata[idx].get("id")
-                if rid and (rid not in best or dist < best[rid][1]):
-                    best[rid] = (idx, dist)
-
-        print(f"\n중복 제거 후 레시피 수: {len(best)}")
-
-        results = []
-        seen = set()
-        user_clean = [extract_name(i) for i in user_ingredients]
-        print(f"\n정제된 사용자 재료: {user_clean}")
-
-        for idx, dist in sorted(best.values(), key=lambda x: x[1]):
-            doc = metadata[idx]
-            raw = doc.get("ingredients", "").replace(" ", "")
-            recipe_clean = [extract_name(i) for i in filter(None, raw.split(","))]
-            
-            if len(results) < 5:  # 처음 5개만 로그 출력
-                print(f"\n레시피: {doc.get('title')}")
-                print(f"원본 재료: {raw}")
-                print(f"정제된 재료: {recipe_clean}")
-
-            # 부분 포함 매칭: 입력 재료가 레시피 재료의 부분 문자열로 포함되어 있으면 매칭 인정
-            matched = []
-            for u in user_clean:
-                for r in recipe_clean:
-                    if u and r and (u in r or r in u):
-                        matched.append(u)
-                        break
-
-            if not matched:
-                continue
-
-            # 매칭 점수 계산 방식 변경
-            match_score = len(matched) / len(user_clean)  # 사용자 재료 중 매칭된 비율
-            dist_score = 1 / (1 + dist)
-            final_score = 0.3 * dist_score + 0.7 * match_score  # 매칭 점수 비중 증가
-
-            if match_score < 0.1:  # 임계값을 0.1로 낮춤 (10% 이상 매칭)
-                continue
-
-            rid = doc.get("id")
-            row = session.execute(
-                text("SELECT id, title, ingredients, content FROM recipe WHERE id=:id"),
-                {"id": rid}
-            ).fetchone()
-            if not row or row.title in seen:
-                continue
-            seen.add(row.title)
-
-            content = row.content if isinstance(row.content, str) else str(row.content)
-            results.append({
-                "title": row.title,
-                "ingredients": row.ingredients,
-                "content": content.replace("\n", " "),
-                "match_score": match_score,
-                "matched_ingredients": matched
-            })
-
-        # 매칭된 재료 수를 우선적으로 고려하여 정렬
-        results.sort(key=lambda x: (len(x["matched_ingredients"]), x["match_score"]), reverse=True)
-        
-        print(f"\n최종 추천 결과: {len(results)}개")
-        return results
\ No newline at end of file
+        # 제목만 먼저 조회해 순위를 정하고, 본문은 반환할 후보만 조회
+        with stage_timer("db_fetch"):
+            titles = fetch_recipe_titles_by_ids(session, [rid for rid, _, _ in candidates])
+        ordered = _ranked_survivors(candidates, rank, titles)[:limit]
+        if not final and sum(confirmed[i] for i in ordered) < limit:
+            return None
+
+        with stage_timer("db_fetch"):
+            rows_by_id = fetch_recipes_by_ids(session, [candidates[i][0] for i in ordered])
+
+    return [
+        _to_result(candidates[i], rows_by_id[candidates[i][0]])
+        for i in ordered if candidates[i][0] in rows_by_id
+    ]
+
+def _confirmed(canonical: tuple, candidates: list, D: np.ndarray, I: np.ndarray, floor) -> list:
+    """후보별로 k를 넓혀도 순위가 바뀌지 않는지 (사용자 재료 전부 매칭 + 하이브리드면 D < floor)"""
+    full = [len(names) == len(canonical) for _, _, names in candidates]
+    if floor is None:
+        return full
+    rows = I[0][(I[0] >= 0) & (I[0] < len(ingredient_index)) & (D[0] < np.float32(floor))]
+    safe = set(ingredient_index.recipe_ids[rows].tolist())
+    return [f and rid in safe for f, (rid, _, _) in zip(full, candidates)]
+
+def _stream_order(canonical: tuple, D: np.ndarray, I: np.ndarray):
+    """스트리밍용 순위 결정: _rank와 같은 순서의 (후보 목록, 후보 인덱스 목록)
+
+    제목 중복 제거에는 제목만 필요하므로 제목만 가볍게 조회하고 세션은 바로 닫는다.
+    """
+    candidates, rank = _candidates(canonical, D, I)
+    if not candidates:
+        return candidates, []
+    with stage_timer("db_fetch"), SessionLocal() as session:
+        titles = fetch_recipe_titles_by_ids(session, [rid for rid, _, _ in candidates])
+    return candidates, _ranked_survivors(candidates, rank, titles)
+
+def _stream_chunks(total: int, first_chunk: int = STREAM_FIRST_CHUNK, chunk_size: int = STREAM_CHUNK):
+    """순위 목록을 나눌 (시작, 끝) 구간 (첫 결과가 빨리 나가도록 첫 청크는 작게)"""
+    start, size = 0, first_chunk
+    while start < total:
+        yield start, min(start + size, total)
+        start, size = start + size, chunk_size
+
+def _fetch_next_chunk(candidates: list, ordered: list, bounds):
+    """다음 구간의 본문을 조회해 결과 청크 반환 (DB에 없는 레시피만 있는 구간은 건너뜀, 끝이면 None)
+
+    실행기 스레드에서 호출하며 구간마다 짧은 세션을 열고 닫는다
+    (세션/커넥션이 스레드 사이를 옮겨 다니거나 응답 전송 동안 커넥션을 잡고 있지 않도록).
+    """
+    for start, end in bounds:
+        chunk = ordered[start:end]
+        with stage_timer("db_fetch"), SessionLocal() as session:
+            rows_by_id = fetch_recipes_by_ids(session, [candidates[i][0] for i in chunk])
+        results = [
+            _to_result(candidates[i], rows_by_id[candidates[i][0]])
+            for i in chunk if candidates[i][0] in rows_by_id
+        ]
+        if results:
+            return results
+    return None
@@ -0,0 +1,102 @@
+"""
+/recommend 전용 추론 실행기와 요청 수 제한(admission control)
+encode / FAISS 검색 / 매칭·DB 조회를 Starlette 공용 스레드풀이 아닌 전용 스레드풀에서 실행하고,
+처리 중인 요청 수가 상한을 넘으면 대기열에 쌓지 않고 즉시 거절한다.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과된 요청 (429/503으로 응답)"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WaitStats:
+    """대기 시간 통계 (최근 window개 표본의 백분위 + 누적 합계)"""
+
+    def __init__(self, window: int = 2048):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self) -> dict:
+        samples = sorted(self._samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000.0, 3)
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000.0, 3) if self.count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max * 1000.0, 3),
+        }
+
+
+class InferenceExecutor:
+    """전용 스레드풀 + 처리 중 요청 수 상한"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 64, name: str = "inference"):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self.pending = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_wait = WaitStats()  # 제출 ~ 스레드에서 실행 시작까지
+
+    @contextlib.asynccontextmanager
+    async def admit(self):
+        """요청 하나를 받아들임 (상한 초과 시 OverloadedError)"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise OverloadedError(f"추천 요청 대기열이 가득 찼습니다 ({self.pending}/{self.max_pending})")
+        self.pending += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """전용 스레드풀에서 fn(*args) 실행"""
+        submitted = time.perf_counter()
+
+        def call():
+            self.queue_wait.record(time.perf_counter() - submitted)
+            return fn(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "executor_queue_wait": self.queue_wait.stats(),
+        }
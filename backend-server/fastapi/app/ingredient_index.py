@@ -0,0 +1,311 @@
+"""
+레시피 재료 어휘/인덱스
+metadata 로딩 시 한 번만 재료 문자열을 정제해 어휘 id 배열(CSR)로 보관하고,
+요청마다 후보 블록 전체의 재료 매칭을 NumPy로 계산한다.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+# 동의어/유의어 사전
+SYNONYM_MAP = {
+    # 계란 관련
+    "계란": "달걀",
+    "달걀": "달걀",
+    "노른자": "달걀",
+    "흰자": "달걀",
+    
+    # 간장 관련
+    "진간장": "간장",
+    "양조간장": "간장",
+    "간장": "간장",
+    "국간장": "간장",
+    
+    # 설탕 관련
+    "설탕": "설탕",
+    "흑설탕": "설탕",
+    "백설탕": "설탕",
+    "황설탕": "설탕",
+    
+    # 식용유 관련
+    "식용유": "식용유",
+    "카놀라유": "식용유",
+    "포도씨유": "식용유",
+    "올리브유": "식용유",
+    
+    # 파 관련
+    "대파": "파",
+    "쪽파": "파",
+    "파": "파",
+    "실파": "파",
+    "청파": "파",
+    
+    # 양파 관련
+    "양파": "양파",
+    "적양파": "양파",
+    "흰양파": "양파",
+    
+    # 감자 관련
+    "감자": "감자",
+    "새감자": "감자",
+    "조리감자": "감자",
+    
+    # 당근 관련
+    "당근": "당근",
+    "홍당근": "당근",
+    
+    # 소금 관련
+    "소금": "소금",
+    "천일염": "소금",
+    "굵은소금": "소금",
+    
+    # 후추 관련
+    "후추": "후추",
+    "흑후추": "후추",
+    "백후추": "후추",
+    
+    # 마늘 관련
+    "마늘": "마늘",
+    "다진마늘": "마늘",
+    "편마늘": "마늘",
+    
+    # 고추장 관련
+    "고추장": "고추장",
+    "참고추장": "고추장",
+    
+    # 고춧가루 관련
+    "고춧가루": "고춧가루",
+    "매운고춧가루": "고춧가루",
+    "순한고춧가루": "고춧가루",
+    
+    # 참기름 관련
+    "참기름": "참기름",
+    "들기름": "참기름",
+    
+    # 버터 관련
+    "버터": "버터",
+    "무염버터": "버터",
+    "유산지": "버터",
+    
+    # 물 관련
+    "물": "물",
+    "차가운": "물",
+    "따뜻한": "물",
+    "미지근한": "물",
+}
+
+def extract_name(ingredient):
+    # 한글, 영문만 남기고 나머지(숫자, 특수문자, 단위 등) 제거
+    cleaned = re.sub(r'[^가-힣a-zA-Z]', '', ingredient)
+    
+    # 접두어 제거 (진, 생, 말린, 건, 등)
+    prefixes = ['진', '생', '말린', '건', '다진', '채썬', '썰은', '썬', '새', '조리', '참', '매운', '순한', '흰', '적', '홍']
+    for prefix in prefixes:
+        if cleaned.startswith(prefix):
+            cleaned = cleaned[len(prefix):]
+    
+    # 동의어 통일
+    return SYNONYM_MAP.get(cleaned, cleaned) if cleaned else ingredient
+
+def canonicalize_ingredients(ingredients: Sequence[str]) -> Tuple[str, ...]:
+    """재료 집합의 정규형: extract_name/SYNONYM_MAP 정제 후 중복 제거 및 정렬
+    ("계란, 간장"과 "간장, 달걀"은 같은 키가 된다)"""
+    return tuple(sorted({name for name in (extract_name(i) for i in ingredients) if name}))
+
+
+class IngredientIndex:
+    """레시피별 정제 재료 id 배열 (CSR: indptr/indices)"""
+
+    def __init__(self, recipes: Sequence[dict], normalize: Callable[[str], str], mask_cache_size: int = 4096):
+        vocab = {}
+        indptr = [0]
+        indices = []
+        recipe_ids = []
+
+        for doc in recipes:
+            raw = (doc.get("ingredients") or "").replace(" ", "")
+            term_ids = set()
+            for token in filter(None, raw.split(",")):
+                term = normalize(token)
+                if term:
+                    term_ids.add(vocab.setdefault(term, len(vocab)))
+            indices.extend(sorted(term_ids))
+            indptr.append(len(indices))
+            recipe_ids.append(doc.get("id") or 0)  # id 없는 레시피는 0 (추천 대상 제외)
+
+        self.vocab = vocab
+        self.terms = np.array(list(vocab), dtype=str)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+
+        self._mask_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._mask_cache_size = mask_cache_size
+        self._mask_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def recipe_terms(self, row: int) -> List[str]:
+        """레시피 한 건의 정제된 재료 목록 (로그용)"""
+        return self.terms[self.indices[self.indptr[row]:self.indptr[row + 1]]].tolist()
+
+    def term_mask(self, user_term: str) -> np.ndarray:
+        """어휘 전체에 대해 `u in r or r in u` 부분 포함 매칭 여부"""
+        with self._mask_lock:
+            mask = self._mask_cache.get(user_term)
+            if mask is not None:
+                self._mask_cache.move_to_end(user_term)
+                return mask
+
+        if not user_term or not len(self.terms):
+            mask = np.zeros(len(self.terms), dtype=bool)
+        else:
+            # u in r: 어휘 배열 전체에 대해 C 루프로 검색
+            mask = np.char.find(self.terms, user_term) >= 0
+            # r in u: 사용자 재료의 부분 문자열 중 어휘에 있는 것
+            n = len(user_term)
+            for i in range(n):
+                for j in range(i + 1, n + 1):
+                    tid = self.vocab.get(user_term[i:j])
+                    if tid is not None:
+                        mask[tid] = True
+
+        with self._mask_lock:
+            self._mask_cache[user_term] = mask
+            if len(self._mask_cache) > self._mask_cache_size:
+                self._mask_cache.popitem(last=False)
+        return mask
+
+    def match_matrix(self, rows: np.ndarray, user_terms: Sequence[str]) -> np.ndarray:
+        """후보 레시피(rows) x 사용자 재료 매칭 행렬 (bool)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        matched = np.zeros((len(rows), len(user_terms)), dtype=bool)
+        if not len(rows) or not len(user_terms):
+            return matched
+
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return matched
+
+        # 후보들의 CSR 구간을 한 번에 모으기
+        seg_starts = np.cumsum(lengths) - lengths
+        flat = np.repeat(starts - seg_starts, lengths) + np.arange(total)
+        term_ids = self.indices[flat]
+
+        masks = np.stack([self.term_mask(u) for u in user_terms], axis=1)
+        hits = masks[term_ids]
+
+        nonempty = lengths > 0
+        matched[nonempty] = np.logical_or.reduceat(hits, seg_starts[nonempty], axis=0)
+        return matched
+
+
+class IngredientPostings:
+    """RAG 검색용 역색인: 재료 문자열 조각(쉼표 구분, 소문자) -> 레시피 행 번호 posting list
+
+    RAG 매칭 규칙은 `사용자 재료.lower() in 레시피 재료 문자열.lower()`이므로 조각을 정제하지 않고
+    그대로 어휘로 둔다. 사용자 재료가 포함된 조각은 어휘 전체를 이어 붙인 문자열에서 한 번에 찾고,
+    해당 조각들의 posting list를 합쳐 레시피 집합을 만든다 (레시피 수가 아니라 어휘/매칭 수에 비례).
+    """
+
+    _SEP = "\x00"
+
+    def __init__(self, recipes: Sequence[dict], rows_cache_size: int = 4096):
+        vocab = {}
+        term_ids = []
+        term_rows = []
+
+        for row, doc in enumerate(recipes):
+            text = (doc.get("ingredients") or "").lower()
+            for piece in set(text.split(",")):
+                term_ids.append(vocab.setdefault(piece, len(vocab)))
+                term_rows.append(row)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        # 안정 정렬이므로 조각별 posting list는 행 번호 오름차순
+        order = np.argsort(term_ids, kind="stable")
+        self.postings = np.asarray(term_rows, dtype=np.int32)[order]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(term_ids, minlength=len(vocab))))).astype(np.int64)
+
+        self._recipes = recipes
+        terms = list(vocab)
+        self.num_terms = len(terms)
+        self.num_rows = len(recipes)
+        # 어휘를 구분자로 이어 붙인 문자열과 조각별 시작 위치 (부분 문자열 검색용)
+        self.blob = self._SEP.join(terms)
+        lengths = np.fromiter((len(t) + 1 for t in terms), dtype=np.int64, count=len(terms))
+        self.term_starts = np.cumsum(lengths) - lengths
+
+        self._rows_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._rows_cache_size = rows_cache_size
+        self._rows_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.postings.nbytes + self.indptr.nbytes + self.term_starts.nbytes + len(self.blob.encode("utf-8"))
+
+    def _matching_terms(self, user_term: str) -> np.ndarray:
+        """user_term을 부분 문자열로 포함하는 조각 id (오름차순)"""
+        positions = [m.start() for m in re.finditer(re.escape(user_term), self.blob)]
+        if not positions:
+            return np.empty(0, dtype=np.int64)
+        tids = np.searchsorted(self.term_starts, positions, side="right") - 1
+        return np.unique(tids)
+
+    def rows_for(self, user_term: str) -> np.ndarray:
+        """재료 문자열에 user_term(소문자)이 포함된 레시피 행 번호 (오름차순, 중복 없음)"""
+        with self._rows_lock:
+            rows = self._rows_cache.get(user_term)
+            if rows is not None:
+                self._rows_cache.move_to_end(user_term)
+                return rows
+
+        if not user_term:
+            # 빈 문자열은 모든 재료 문자열에 포함됨
+            rows = np.arange(self.num_rows, dtype=np.int32)
+        elif self._SEP in user_term or "," in user_term:
+            # 쉼표가 들어간 입력은 조각 경계를 넘어 매칭될 수 있으므로 원래 문자열을 직접 검사 (드문 경우)
+            rows = np.fromiter(
+                (row for row, doc in enumerate(self._recipes) if user_term in (doc.get("ingredients") or "").lower()),
+                dtype=np.int32,
+            )
+        else:
+            tids = self._matching_terms(user_term)
+            if len(tids):
+                starts = self.indptr[tids]
+                lengths = self.indptr[tids + 1] - starts
+                total = int(lengths.sum())
+                seg_starts = np.cumsum(lengths) - lengths
+                flat = np.repeat(starts - seg_starts, lengths) + np.arange(total)
+                rows = np.unique(self.postings[flat])
+            else:
+                rows = np.empty(0, dtype=np.int32)
+
+        with self._rows_lock:
+            self._rows_cache[user_term] = rows
+            if len(self._rows_cache) > self._rows_cache_size:
+                self._rows_cache.popitem(last=False)
+        return rows
+
+    def match_counts(self, user_terms: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+        """posting list 병합으로 레시피별 매칭 재료 수 계산
+
+        반환: (행 번호 오름차순, 행별 매칭 수, 사용자 재료별 매칭 행 배열)
+        """
+        per_term = [self.rows_for(u) for u in user_terms]
+        nonempty = [rows for rows in per_term if len(rows)]
+        if not nonempty:
+            empty = np.empty(0, dtype=np.int32)
+            return empty, np.empty(0, dtype=np.int64), per_term
+        rows, counts = np.unique(np.concatenate(nonempty), return_counts=True)
+        return rows, counts, per_term
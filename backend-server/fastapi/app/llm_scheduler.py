@@ -0,0 +1,410 @@
+"""
+LLM 연속 배칭(continuous batching) 스케줄러
+
+요청마다 pipeline을 따로 돌리면 동시 요청이 배치 크기 1로 하나씩 실행된다.
+스케줄러는 전용 스레드 하나에서 디코딩 루프를 돌리며,
+
+- 대기 중인 프롬프트를 디코딩 단계 사이에 한 번에 prefill해서 실행 중인 배치에 합류시키고
+- 매 단계 실행 중인 모든 시퀀스의 다음 토큰을 한 번의 forward로 계산하고
+- 끝난 시퀀스(EOS, max_length, 취소)는 그 단계에서 바로 배치에서 뺀다.
+
+시퀀스 길이가 다르므로 KV 캐시는 왼쪽 패딩 + attention mask로 맞추고,
+position id는 시퀀스별 실제 토큰 수로 계산한다. 샘플링 설정(max_length, temperature,
+top_p, repetition_penalty)은 요청별로 적용한다.
+
+공통 앞부분(prefix) KV 캐시: 요청이 prefix_len을 주면 input_ids[:prefix_len]의 KV를 LRU에서 찾아
+(없으면 한 번 계산해 저장) 나머지 부분만 prefill한다. 같은 앞부분을 가진 요청끼리 묶어 prefill하며,
+앞부분과 뒷부분 사이의 패딩은 attention mask로 가린다.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationRequest:
+    """스케줄러에 제출된 생성 요청 (결과 대기 / 토큰 스트림 / 취소)"""
+
+    def __init__(self, input_ids: List[int], max_length: int, temperature: float, top_p: float,
+                 repetition_penalty: float, stream: bool, prefix_len: int = 0):
+        self.input_ids = list(input_ids)
+        self.prefix_len = prefix_len
+        self.max_length = max_length
+        self.temperature = temperature
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+        self.generated: List[int] = []
+        # 스트리밍이면 생성된 토큰 id를 차례로 넣고, 끝나면 None
+        self.tokens: Optional[queue.Queue] = queue.Queue() if stream else None
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+        self.enqueued = time.perf_counter()
+        self._done = threading.Event()
+
+    def cancel(self) -> None:
+        """다음 디코딩 단계에서 배치에서 제외"""
+        self.cancelled = True
+
+    def result(self, timeout: Optional[float] = None) -> List[int]:
+        """생성이 끝날 때까지 기다린 뒤 생성된 토큰 id (프롬프트 제외)"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("생성 대기 시간 초과")
+        if self.error is not None:
+            raise self.error
+        return self.generated
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def _emit(self, token_id: int) -> None:
+        self.generated.append(token_id)
+        if self.tokens is not None:
+            self.tokens.put(token_id)
+
+    def _finish(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+        if self.tokens is not None:
+            self.tokens.put(None)
+        self._done.set()
+
+
+def _to_legacy(past_key_values):
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    if hasattr(past_key_values, "layers"):
+        # transformers 5: to_legacy_cache가 없어지고 층별 keys/values만 남음
+        return tuple((layer.keys, layer.values) for layer in past_key_values.layers)
+    return past_key_values
+
+
+def _from_legacy(legacy):
+    try:
+        from transformers import DynamicCache
+    except ImportError:
+        return legacy
+    if hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(legacy)
+    return DynamicCache(legacy)
+
+
+def _left_pad_kv(legacy, target_len: int):
+    """KV 캐시 (층별 (k, v), [B, H, T, D])를 왼쪽으로 0 패딩해서 길이 target_len으로"""
+    def pad(t):
+        extra = target_len - t.shape[2]
+        if extra <= 0:
+            return t
+        return torch.cat([t.new_zeros(t.shape[0], t.shape[1], extra, t.shape[3]), t], dim=2)
+    return tuple((pad(k), pad(v)) for k, v in legacy)
+
+
+def _left_pad_mask(mask: torch.Tensor, target_len: int) -> torch.Tensor:
+    extra = target_len - mask.shape[1]
+    if extra <= 0:
+        return mask
+    return torch.cat([mask.new_zeros(mask.shape[0], extra), mask], dim=1)
+
+
+class ContinuousBatchScheduler:
+    """모델 하나를 독점하는 디코딩 루프 (요청은 submit으로 제출)"""
+
+    def __init__(self, model, eos_token_ids: Iterable[int], max_batch_size: int = 8, prefix_cache_size: int = 8,
+                 name: str = "llm-scheduler"):
+        self.model = model
+        self.eos_token_ids = {int(t) for t in eos_token_ids if t is not None}
+        self.max_batch_size = max(1, max_batch_size)
+        self.prefix_cache_size = prefix_cache_size
+        # 앞부분 토큰 id → 층별 (k, v) [1, H, P, D] (디코딩 스레드에서만 접근)
+        self._prefixes: "OrderedDict[Tuple[int, ...], tuple]" = OrderedDict()
+        self.device = next(model.parameters()).device
+
+        self._waiting: "deque[GenerationRequest]" = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # 실행 중인 배치 상태
+        self._rows: List[GenerationRequest] = []
+        self._kv = None                     # 층별 (k, v) [B, H, T, D]
+        self._mask: Optional[torch.Tensor] = None         # [B, T] (1 = 실제 토큰)
+        self._next_tokens: Optional[torch.Tensor] = None  # [B] 샘플링됐지만 아직 KV에 없는 토큰
+
+        # 통계
+        self.steps = 0
+        self.tokens_generated = 0
+        self.batch_size_total = 0
+        self.completed = 0
+        self.prefill_tokens = 0
+        self.prefix_tokens_reused = 0
+        self.prefix_hits = 0
+        self.prefix_misses = 0
+        self.started_at = time.time()
+
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    # ---- 외부 API ----
+
+    def submit(self, input_ids: List[int], max_length: int = 256, temperature: float = 0.7, top_p: float = 0.9,
+               repetition_penalty: float = 1.1, stream: bool = False, prefix_len: int = 0) -> GenerationRequest:
+        """생성 요청 제출 (prefix_len: KV 캐시를 재사용할 앞부분 토큰 수, 0이면 사용 안 함)"""
+        # 마지막 토큰의 logits가 필요하므로 앞부분은 최소 한 토큰을 남김
+        prefix_len = max(0, min(prefix_len, len(input_ids) - 1)) if self.prefix_cache_size > 0 else 0
+        request = GenerationRequest(input_ids, max_length, temperature, top_p, repetition_penalty, stream, prefix_len)
+        if not request.input_ids or len(request.input_ids) >= max_length:
+            # pipeline과 같이 프롬프트가 max_length 이상이면 생성하지 않음
+            request._finish()
+            return request
+        return self._enqueue(request)
+
+    def warm_prefix(self, prefix_ids: List[int]) -> GenerationRequest:
+        """앞부분 KV 캐시를 미리 계산 (생성 없이, result()로 완료 대기)"""
+        request = GenerationRequest(prefix_ids, len(prefix_ids), 0.0, 1.0, 1.0, False, len(prefix_ids))
+        if not request.input_ids or self.prefix_cache_size <= 0:
+            request._finish()
+            return request
+        return self._enqueue(request)
+
+    def _enqueue(self, request: GenerationRequest) -> GenerationRequest:
+        with self._cond:
+            if self._closed:
+                request._finish(RuntimeError("LLM 스케줄러가 종료되었습니다."))
+                return request
+            self._waiting.append(request)
+            self._cond.notify()
+        return request
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """디코딩 루프 종료 (대기/실행 중인 요청은 오류로 끝냄), 모델과 KV 캐시 참조 해제"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            waiting = len(self._waiting)
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "active": len(self._rows),
+            "waiting": waiting,
+            "completed": self.completed,
+            "decode_steps": self.steps,
+            "tokens_generated": self.tokens_generated,
+            "avg_batch_size": round(self.batch_size_total / self.steps, 2) if self.steps else 0.0,
+            "tokens_per_sec": round(self.tokens_generated / elapsed, 2),
+            "prefix_cache": {
+                "entries": len(self._prefixes),
+                "max_entries": self.prefix_cache_size,
+                "hits": self.prefix_hits,
+                "misses": self.prefix_misses,
+                "prefill_tokens": self.prefill_tokens,
+                "reused_tokens": self.prefix_tokens_reused,
+            },
+        }
+
+    # ---- 디코딩 루프 ----
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._rows and not self._waiting and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    pending = self._rows + list(self._waiting)
+                    self._waiting.clear()
+                    break
+                admitted = []
+                while self._waiting and len(self._rows) + len(admitted) < self.max_batch_size:
+                    admitted.append(self._waiting.popleft())
+            try:
+                with torch.inference_mode():
+                    self._drop_cancelled()
+                    for request in admitted:
+                        if request.prefix_len == len(request.input_ids):
+                            self._prefix_kv(tuple(request.input_ids))  # warm_prefix
+                            request._finish()
+                        elif request.cancelled:
+                            request._finish()
+                    admitted = [r for r in admitted if not r.done]
+                    if admitted:
+                        self._prefill(admitted)
+                    if self._rows:
+                        self._decode_step()
+            except Exception as e:
+                logger.exception(f"LLM 배치 생성 오류: {str(e)}")
+                for request in self._rows + [r for r in admitted if not r.done]:
+                    if not request.done:
+                        request._finish(e)
+                self._reset()
+        error = RuntimeError("LLM 스케줄러가 종료되었습니다.")
+        for request in pending:
+            if not request.done:
+                request._finish(error)
+        self._reset()
+        self._prefixes.clear()
+        self.model = None
+
+    def _reset(self) -> None:
+        self._rows, self._kv, self._mask, self._next_tokens = [], None, None, None
+
+    def _forward(self, input_ids, attention_mask, position_ids, past=None):
+        out = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=_from_legacy(past) if past is not None else None,
+            use_cache=True,
+        )
+        return out.logits[:, -1, :], _to_legacy(out.past_key_values)
+
+    def _prefix_kv(self, prefix: Tuple[int, ...]):
+        """앞부분 KV 캐시 조회 (없으면 계산해서 LRU에 저장)"""
+        kv = self._prefixes.get(prefix)
+        if kv is not None:
+            self._prefixes.move_to_end(prefix)
+            self.prefix_hits += 1
+            return kv
+        self.prefix_misses += 1
+        input_ids = torch.tensor([prefix], dtype=torch.long, device=self.device)
+        position_ids = torch.arange(len(prefix), device=self.device)[None, :]
+        _, kv = self._forward(input_ids, torch.ones_like(input_ids), position_ids)
+        self._prefixes[prefix] = kv
+        while len(self._prefixes) > self.prefix_cache_size:
+            self._prefixes.popitem(last=False)
+        return kv
+
+    def _prefill(self, requests: List[GenerationRequest]) -> None:
+        """새 요청들을 같은 앞부분끼리 묶어 prefill → 첫 토큰 샘플링 후 실행 중인 배치에 합류"""
+        groups: Dict[Tuple[int, ...], List[GenerationRequest]] = {}
+        for r in requests:
+            groups.setdefault(tuple(r.input_ids[:r.prefix_len]), []).append(r)
+        for prefix, group in groups.items():
+            self._prefill_group(prefix, group)
+
+    def _prefill_group(self, prefix: Tuple[int, ...], requests: List[GenerationRequest]) -> None:
+        """앞부분 KV(있으면) 뒤에 나머지 토큰을 왼쪽 패딩으로 묶어 한 번에 prefill"""
+        past = self._prefix_kv(prefix) if prefix else None
+        suffixes = [r.input_ids[len(prefix):] for r in requests]
+        length = max(len(ids) for ids in suffixes)
+        input_ids = torch.zeros(len(requests), length, dtype=torch.long)
+        mask = torch.zeros(len(requests), len(prefix) + length, dtype=torch.long)
+        mask[:, :len(prefix)] = 1
+        for i, ids in enumerate(suffixes):
+            input_ids[i, length - len(ids):] = torch.tensor(ids, dtype=torch.long)
+            mask[i, len(prefix) + length - len(ids):] = 1
+        input_ids, mask = input_ids.to(self.device), mask.to(self.device)
+        position_ids = (mask.cumsum(-1) - 1).clamp(min=0)[:, len(prefix):]
+        if past is not None:
+            past = tuple((k.expand(len(requests), -1, -1, -1), v.expand(len(requests), -1, -1, -1)) for k, v in past)
+            self.prefix_tokens_reused += len(prefix) * len(requests)
+        self.prefill_tokens += sum(len(ids) for ids in suffixes)
+
+        logits, kv = self._forward(input_ids, mask, position_ids, past)
+        next_tokens = self._sample(logits, requests)
+
+        if self._rows:
+            target = max(self._mask.shape[1], mask.shape[1])
+            self._kv = tuple(
+                (torch.cat([k0, k1], dim=0), torch.cat([v0, v1], dim=0))
+                for (k0, v0), (k1, v1) in zip(_left_pad_kv(self._kv, target), _left_pad_kv(kv, target))
+            )
+            self._mask = torch.cat([_left_pad_mask(self._mask, target), _left_pad_mask(mask, target)], dim=0)
+            self._next_tokens = torch.cat([self._next_tokens, next_tokens], dim=0)
+        else:
+            self._kv, self._mask, self._next_tokens = kv, mask, next_tokens
+        self._rows = self._rows + requests
+        self._collect(next_tokens, offset=len(self._rows) - len(requests))
+
+    def _decode_step(self) -> None:
+        """실행 중인 모든 시퀀스의 다음 토큰을 한 번의 forward로 계산"""
+        batch = len(self._rows)
+        mask = torch.cat([self._mask, self._mask.new_ones(batch, 1)], dim=1)
+        position_ids = (mask.sum(-1, keepdim=True) - 1)
+        logits, self._kv = self._forward(self._next_tokens[:, None], mask, position_ids, self._kv)
+        self._mask = mask
+        self._next_tokens = self._sample(logits, self._rows)
+
+        self.steps += 1
+        self.batch_size_total += batch
+        self._collect(self._next_tokens, offset=0)
+
+    def _collect(self, tokens: torch.Tensor, offset: int) -> None:
+        """샘플링된 토큰 반영 후 끝난 시퀀스를 배치에서 제거"""
+        finished = []
+        for i, token in enumerate(tokens.tolist()):
+            row = offset + i
+            request = self._rows[row]
+            if token in self.eos_token_ids:
+                finished.append(row)
+                continue
+            request._emit(token)
+            self.tokens_generated += 1
+            if len(request.input_ids) + len(request.generated) >= request.max_length or request.cancelled:
+                finished.append(row)
+        if finished:
+            self.completed += len(finished)
+            self._remove(finished)
+
+    def _drop_cancelled(self) -> None:
+        cancelled = [row for row, r in enumerate(self._rows) if r.cancelled]
+        if cancelled:
+            self._remove(cancelled)
+
+    def _remove(self, rows: List[int]) -> None:
+        for row in rows:
+            self._rows[row]._finish()
+        removed = set(rows)
+        self._select([row for row in range(len(self._rows)) if row not in removed])
+
+    def _select(self, keep: List[int]) -> None:
+        """배치에서 keep 행만 남기고, 모든 행이 패딩인 앞쪽 열은 잘라냄"""
+        if not keep:
+            self._reset()
+            return
+        index = torch.tensor(keep, dtype=torch.long, device=self.device)
+        self._rows = [self._rows[row] for row in keep]
+        self._mask = self._mask.index_select(0, index)
+        self._next_tokens = self._next_tokens.index_select(0, index)
+        used = self._mask.any(dim=0).nonzero()
+        start = int(used[0]) if len(used) else 0
+        self._mask = self._mask[:, start:]
+        self._kv = tuple(
+            (k.index_select(0, index)[:, :, start:], v.index_select(0, index)[:, :, start:])
+            for k, v in self._kv
+        )
+
+    # ---- 샘플링 (요청별 설정) ----
+
+    def _sample(self, logits: torch.Tensor, requests: List[GenerationRequest]) -> torch.Tensor:
+        """repetition penalty → temperature → top-p 순서로 적용 후 샘플링 (temperature <= 0이면 greedy)"""
+        logits = logits.float()
+        for i, r in enumerate(requests):
+            if r.repetition_penalty != 1.0:
+                seen = torch.tensor(sorted(set(r.input_ids + r.generated)), dtype=torch.long, device=logits.device)
+                scores = logits[i, seen]
+                logits[i, seen] = torch.where(scores < 0, scores * r.repetition_penalty, scores / r.repetition_penalty)
+
+        greedy = logits.argmax(dim=-1)
+        temperature = torch.tensor([r.temperature for r in requests], dtype=logits.dtype, device=logits.device)
+        if bool((temperature <= 0).all()):
+            return greedy
+
+        logits = logits / temperature.clamp(min=1e-5)[:, None]
+        top_p = torch.tensor([r.top_p for r in requests], dtype=logits.dtype, device=logits.device)
+        sorted_logits, sorted_index = logits.sort(dim=-1, descending=True)
+        probs = sorted_logits.softmax(dim=-1)
+        # 누적 확률이 top_p를 넘기 전까지의 토큰만 남김 (최소 1개)
+        remove = (probs.cumsum(dim=-1) - probs) > top_p[:, None]
+        sorted_logits = sorted_logits.masked_fill(remove, float("-inf"))
+        logits = torch.full_like(logits, float("-inf")).scatter(-1, sorted_index, sorted_logits)
+        sampled = torch.multinomial(logits.softmax(dim=-1), num_samples=1).squeeze(-1)
+        return torch.where(temperature <= 0, greedy, sampled)
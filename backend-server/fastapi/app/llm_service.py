@@ -3,30 +3,110 @@ Hugging Face LLM 서비스
 Hugging Face에서 모델을 로드하여 텍스트 생성 제공
 """
 
+import gc
 import os
 import logging
-from typing import Optional, List, Dict
+import queue
+import threading
+import time
+from typing import Optional, List, Dict, Iterator
 from transformers import (
     AutoTokenizer, 
     AutoModelForCausalLM,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
     pipeline
 )
 import torch
 
+from .llm_scheduler import ContinuousBatchScheduler, GenerationRequest
+from .prompts import DEFAULT_SYSTEM_MESSAGE, SHARED_PROMPT_PREFIXES
+
 logger = logging.getLogger(__name__)
 
+# 기본 모델: Instruct 모델 (HF_MODEL_NAME으로 변경)
+DEFAULT_MODEL_NAME = "00PJH/Llama-3.2-Korean-GGACHI-1B-Instruct-v1-koToEn"
+
+# 스트리밍 생성에서 다음 토큰을 기다리는 최대 시간 (초)
+STREAM_TOKEN_TIMEOUT = float(os.getenv("LLM_STREAM_TOKEN_TIMEOUT", "60"))
+
+# 연속 배칭: 동시 요청을 디코딩 단계마다 한 배치로 묶어 생성 (0이면 요청마다 pipeline/generate 실행)
+LLM_BATCHING = os.getenv("LLM_BATCHING", "1") == "1"
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "8"))
+# 공통 프롬프트 앞부분(시스템 메시지 등) KV 캐시 항목 수 (0이면 재사용 안 함, 연속 배칭에서만 사용)
+LLM_PREFIX_CACHE_SIZE = int(os.getenv("LLM_PREFIX_CACHE_SIZE", "8"))
+
+# CPU 추론 정밀도: fp32(기본) / bf16 / int8(Linear 층 동적 양자화). GPU에서는 항상 fp16
+CPU_DTYPES = ("fp32", "bf16", "int8")
+HF_CPU_DTYPE = os.getenv("HF_CPU_DTYPE", "fp32").lower()
+
+# 앱 시작 시 백그라운드 스레드에서 모델 로드 + 더미 생성으로 워밍업 (0이면 첫 요청 때 로드)
+LLM_WARMUP = os.getenv("LLM_WARMUP", "1") == "1"
+
+# 프롬프트 템플릿에서 가변 부분이 시작하는 위치를 찾기 위한 표식
+_PREFIX_SENTINEL = "<<PROMPT_SUFFIX>>"
+
+
+def _sampling_kwargs(temperature: float, top_p: float) -> dict:
+    """generate 샘플링 인자 (temperature <= 0이면 greedy)"""
+    if temperature <= 0:
+        return {"do_sample": False, "temperature": None, "top_p": None}
+    return {"do_sample": True, "temperature": temperature, "top_p": top_p}
+
+
+class _CancelCriteria(StoppingCriteria):
+    """스트리밍 소비자가 중단하면(클라이언트 연결 종료 등) 다음 디코딩 단계에서 생성 중단"""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.event.is_set()
+
+
+def load_causal_lm(model_name: str, device: str, cpu_dtype: str = HF_CPU_DTYPE):
+    """생성 모델 로드 (CPU에서는 cpu_dtype에 따라 fp32 / bf16 / int8 동적 양자화)"""
+    if cpu_dtype not in CPU_DTYPES:
+        raise ValueError(f"지원하지 않는 CPU 정밀도: {cpu_dtype} ({', '.join(CPU_DTYPES)})")
+    
+    if device == "cuda":
+        torch_dtype = torch.float16
+    elif cpu_dtype == "bf16":
+        torch_dtype = torch.bfloat16
+    else:
+        torch_dtype = torch.float32
+    
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        trust_remote_code=True,
+        torch_dtype=torch_dtype,
+        device_map="auto" if device == "cuda" else None,
+        low_cpu_mem_usage=True
+    )
+    
+    if device == "cpu":
+        model = model.to(device)
+        if cpu_dtype == "int8":
+            # Linear 가중치는 int8로 저장하고 활성값은 실행 시 동적으로 양자화 (임베딩/정규화 층은 fp32 유지)
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    model.eval()
+    return model
+
+
 class HuggingFaceLLMService:
     """Hugging Face 모델을 사용한 LLM 서비스"""
     
     def __init__(self):
-        self.model_name = os.getenv(
-            "HF_MODEL_NAME", 
-            "00PJH/Llama-3.2-Korean-GGACHI-1B-Instruct-v1-koToEn"  # 기본값: Instruct 모델
-        )
+        self.model_name = os.getenv("HF_MODEL_NAME", DEFAULT_MODEL_NAME)
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.cpu_dtype = HF_CPU_DTYPE
         self.tokenizer = None
         self.model = None
         self.pipeline = None
+        self.scheduler: Optional[ContinuousBatchScheduler] = None
+        self._prefix_ids: Dict[str, List[int]] = {}
         self.is_instruct_model = "instruct" in self.model_name.lower() or "llama-3.2" in self.model_name.lower()
         self._load_model()
     
@@ -34,7 +114,7 @@ class HuggingFaceLLMService:
         """모델 로드 (처음 호출 시 한 번만)"""
         try:
             logger.info(f"🤖 Hugging Face 모델 로딩 시작: {self.model_name}")
-            logger.info(f"📱 Device: {self.device}")
+            logger.info(f"📱 Device: {self.device}" + (f" ({self.cpu_dtype})" if self.device == "cpu" else ""))
             
             # 토크나이저 로드
             self.tokenizer = AutoTokenizer.from_pretrained(
@@ -43,16 +123,7 @@ class HuggingFaceLLMService:
             )
             
             # 모델 로드
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_name,
-                trust_remote_code=True,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                device_map="auto" if self.device == "cuda" else None,
-                low_cpu_mem_usage=True
-            )
-            
-            if self.device == "cpu":
-                self.model = self.model.to(self.device)
+            self.model = load_causal_lm(self.model_name, self.device, self.cpu_dtype)
             
             # Pipeline 생성
             self.pipeline = pipeline(
@@ -67,6 +138,18 @@ class HuggingFaceLLMService:
                 repetition_penalty=1.1
             )
             
+            if LLM_BATCHING:
+                self.scheduler = ContinuousBatchScheduler(
+                    self.model,
+                    eos_token_ids=self._eos_token_ids(),
+                    max_batch_size=LLM_MAX_BATCH_SIZE,
+                    prefix_cache_size=LLM_PREFIX_CACHE_SIZE
+                )
+                logger.info(f"🧵 연속 배칭 스케줄러 시작 (최대 배치 {LLM_MAX_BATCH_SIZE})")
+                # 공통 앞부분 KV 캐시 미리 계산 (스케줄러 스레드에서 진행)
+                for text in self._shared_prefix_texts():
+                    self.scheduler.warm_prefix(self._prefix_token_ids(text))
+            
             # Instruct 모델용 특수 토큰 확인
             if self.is_instruct_model:
                 logger.info("📝 Instruct 모델 감지: 특수 프롬프트 템플릿 사용")
@@ -75,6 +158,7 @@ class HuggingFaceLLMService:
             
         except Exception as e:
             logger.error(f"❌ 모델 로딩 실패: {str(e)}")
+            self.close()
             raise
     
     def generate(
@@ -85,31 +169,39 @@ class HuggingFaceLLMService:
         top_p: float = 0.9,
         **kwargs
     ) -> str:
-        """텍스트 생성"""
+        """텍스트 생성 (temperature <= 0이면 greedy: 같은 프롬프트에 항상 같은 결과)"""
+        return self._generate(self._build_prompt(prompt), max_length, temperature, top_p, **kwargs)
+    
+    def _generate(
+        self,
+        full_prompt: str,
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        **kwargs
+    ) -> str:
+        """최종 형식으로 만들어진 프롬프트로 생성 (generate / chat 공통)"""
         try:
             if not self.pipeline:
                 raise RuntimeError("모델이 로드되지 않았습니다.")
             
-            # Instruct 모델용 프롬프트 템플릿
-            if self.is_instruct_model:
-                # Llama 3.2 Instruct 형식 사용
-                full_prompt = self._format_instruct_prompt(prompt)
+            if self.scheduler is not None:
+                # 다른 요청과 한 배치로 생성 (끝날 때까지 대기)
+                request = self._submit(full_prompt, max_length, temperature, top_p, stream=False, **kwargs)
+                generated_text = self.tokenizer.decode(request.result(), skip_special_tokens=True).strip()
             else:
-                full_prompt = prompt
-            
-            # 생성 실행
-            result = self.pipeline(
-                full_prompt,
-                max_length=max_length,
-                temperature=temperature,
-                top_p=top_p,
-                num_return_sequences=1,
-                return_full_text=False,
-                **kwargs
-            )
-            
-            # 결과 추출
-            generated_text = result[0]["generated_text"].strip()
+                # 생성 실행
+                result = self.pipeline(
+                    full_prompt,
+                    max_length=max_length,
+                    **_sampling_kwargs(temperature, top_p),
+                    num_return_sequences=1,
+                    return_full_text=False,
+                    **kwargs
+                )
+                
+                # 결과 추출
+                generated_text = result[0]["generated_text"].strip()
             
             # Instruct 모델 응답 정리 (시스템 프롬프트 제거)
             if self.is_instruct_model:
@@ -122,9 +214,210 @@ class HuggingFaceLLMService:
             logger.error(f"텍스트 생성 오류: {str(e)}")
             raise
     
+    def generate_stream(
+        self,
+        prompt: str,
+        max_length: int = 256,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        **kwargs
+    ) -> Iterator[str]:
+        """텍스트 생성 (토큰 스트리밍): 생성되는 대로 텍스트 조각을 반환
+
+        generate와 같은 프롬프트/샘플링 설정을 사용한다. 생성은 별도 스레드에서 진행되며,
+        이터레이터를 끝까지 소비하지 않고 닫으면 다음 디코딩 단계에서 생성을 멈춘다.
+        """
+        return self._generate_stream(self._build_prompt(prompt), max_length, temperature, top_p, **kwargs)
+    
+    def _generate_stream(
+        self,
+        full_prompt: str,
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        **kwargs
+    ) -> Iterator[str]:
+        """최종 형식으로 만들어진 프롬프트로 스트리밍 생성 (generate_stream / chat_stream 공통)"""
+        if not self.model or not self.tokenizer:
+            raise RuntimeError("모델이 로드되지 않았습니다.")
+        
+        if self.scheduler is not None:
+            return self._stream_request(
+                self._submit(full_prompt, max_length, temperature, top_p, stream=True, **kwargs)
+            )
+        return self._stream_generate(full_prompt, max_length, temperature, top_p, **kwargs)
+    
+    def _stream_generate(
+        self,
+        full_prompt: str,
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        **kwargs
+    ) -> Iterator[str]:
+        """요청 전용 스레드에서 model.generate + TextIteratorStreamer로 스트리밍 (배칭 비활성화 시)"""
+        # 채팅 템플릿이 이미 BOS 토큰을 포함하므로 Instruct 모델은 특수 토큰을 다시 붙이지 않음
+        inputs = self.tokenizer(
+            full_prompt,
+            return_tensors="pt",
+            add_special_tokens=not self.is_instruct_model
+        ).to(self.model.device)
+        
+        streamer = TextIteratorStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            timeout=STREAM_TOKEN_TIMEOUT
+        )
+        cancel = threading.Event()
+        generation_kwargs = dict(
+            **inputs,
+            streamer=streamer,
+            max_length=max_length,
+            **_sampling_kwargs(temperature, top_p),
+            repetition_penalty=1.1,
+            pad_token_id=self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id,
+            stopping_criteria=StoppingCriteriaList([_CancelCriteria(cancel)]),
+        )
+        generation_kwargs.update(kwargs)
+        
+        errors = []
+        
+        def run():
+            try:
+                with torch.inference_mode():
+                    self.model.generate(**generation_kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()  # 소비자가 timeout까지 기다리지 않도록 종료 신호
+        
+        thread = threading.Thread(target=run, name="llm-stream", daemon=True)
+        thread.start()
+        
+        length = 0
+        try:
+            started = False
+            for text in streamer:
+                if not started:
+                    # generate()의 strip()과 맞추기 위해 앞 공백 제거
+                    text = text.lstrip()
+                    started = bool(text)
+                if text:
+                    length += len(text)
+                    yield text
+        finally:
+            cancel.set()
+            thread.join()
+        
+        if errors:
+            logger.error(f"스트리밍 생성 오류: {str(errors[0])}")
+            raise errors[0]
+        logger.info(f"스트리밍 생성 완료 (길이: {length})")
+    
+    def _submit(
+        self,
+        full_prompt: str,
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        stream: bool,
+        **kwargs
+    ) -> GenerationRequest:
+        """연속 배칭 스케줄러에 생성 요청 제출"""
+        input_ids = self.tokenizer(full_prompt, add_special_tokens=not self.is_instruct_model)["input_ids"]
+        return self.scheduler.submit(
+            input_ids,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=kwargs.get("repetition_penalty", 1.1),
+            stream=stream,
+            prefix_len=self._prefix_len(full_prompt, input_ids)
+        )
+    
+    def _shared_prefix_texts(self) -> List[str]:
+        """SHARED_PROMPT_PREFIXES를 지금의 프롬프트 형식으로 렌더링한 앞부분
+
+        채팅 템플릿이 날짜 등을 넣을 수 있으므로 요청마다 렌더링한다 (바뀌면 새 KV 캐시 항목이 됨).
+        """
+        texts = []
+        for spec in SHARED_PROMPT_PREFIXES:
+            if "system" in spec:
+                rendered = self._format_messages([
+                    {"role": "system", "content": spec["system"]},
+                    {"role": "user", "content": _PREFIX_SENTINEL}
+                ])
+            else:
+                rendered = self._build_prompt(spec["prompt"] + _PREFIX_SENTINEL)
+            if _PREFIX_SENTINEL in rendered:
+                text = rendered[:rendered.index(_PREFIX_SENTINEL)]
+                if text:
+                    texts.append(text)
+        return texts
+    
+    def _prefix_token_ids(self, text: str) -> List[int]:
+        """앞부분 텍스트의 토큰 id (마지막 토큰은 뒷부분과 합쳐져 달라질 수 있어 제외)"""
+        ids = self._prefix_ids.get(text)
+        if ids is None:
+            ids = self.tokenizer(text, add_special_tokens=not self.is_instruct_model)["input_ids"][:-1]
+            if len(self._prefix_ids) >= 64:
+                self._prefix_ids.clear()
+            self._prefix_ids[text] = ids
+        return ids
+    
+    def _prefix_len(self, full_prompt: str, input_ids: List[int]) -> int:
+        """프롬프트가 공통 앞부분으로 시작하면 KV 캐시를 재사용할 토큰 수 (토큰 id가 정확히 같을 때만)"""
+        matches = [text for text in self._shared_prefix_texts() if full_prompt.startswith(text)]
+        if not matches:
+            return 0
+        ids = self._prefix_token_ids(max(matches, key=len))
+        return len(ids) if input_ids[:len(ids)] == ids else 0
+    
+    def _stream_request(self, request: GenerationRequest) -> Iterator[str]:
+        """스케줄러가 내보내는 토큰 id를 텍스트 조각으로 변환"""
+        ids: List[int] = []
+        emitted = ""
+        try:
+            while True:
+                try:
+                    token = request.tokens.get(timeout=STREAM_TOKEN_TIMEOUT)
+                except queue.Empty:
+                    raise TimeoutError("다음 토큰 대기 시간 초과")
+                if token is not None:
+                    ids.append(token)
+                # generate()의 strip()과 맞추기 위해 앞 공백 제거
+                text = self.tokenizer.decode(ids, skip_special_tokens=True).lstrip()
+                if token is not None and text.endswith("\ufffd"):
+                    continue  # 여러 토큰에 걸친 문자는 완성될 때까지 보류
+                delta = text[len(emitted):]
+                if delta:
+                    emitted = text
+                    yield delta
+                if token is None:
+                    break
+            request.result()  # 생성 중 오류가 있었으면 전달
+        finally:
+            request.cancel()
+        logger.info(f"스트리밍 생성 완료 (길이: {len(emitted)})")
+    
+    def _eos_token_ids(self) -> List[int]:
+        """생성을 끝내는 토큰 (Llama 3.2 Instruct는 <|eot_id|> 등 여러 개)"""
+        eos = getattr(self.model.generation_config, "eos_token_id", None)
+        ids = list(eos) if isinstance(eos, (list, tuple)) else [eos]
+        ids.append(self.tokenizer.eos_token_id)
+        return [i for i in ids if i is not None]
+    
+    def _build_prompt(self, prompt: str) -> str:
+        """생성에 넣을 최종 프롬프트"""
+        # Instruct 모델용 프롬프트 템플릿
+        if self.is_instruct_model:
+            # Llama 3.2 Instruct 형식 사용
+            return self._format_instruct_prompt(prompt)
+        return prompt
+    
     def _format_instruct_prompt(self, prompt: str) -> str:
         """Instruct 모델용 프롬프트 형식 변환 (토크나이저의 채팅 템플릿 사용)"""
-        system_message = "너는 친절하고 유용한 AI 어시스턴트입니다. 사용자의 질문에 정확하고 도움이 되는 답변을 제공합니다."
+        system_message = DEFAULT_SYSTEM_MESSAGE
         
         # 프롬프트에서 시스템/사용자 메시지 분리
         if "[시스템]" in prompt:
@@ -177,24 +470,32 @@ class HuggingFaceLLMService:
         messages: List[Dict[str, str]],
         max_length: int = 256,
         temperature: float = 0.7,
+        top_p: float = 0.9,
         **kwargs
     ) -> str:
         """채팅 형식으로 응답 생성"""
         try:
-            # 메시지를 프롬프트로 변환
+            # 메시지를 프롬프트로 변환 (이미 채팅 템플릿이 적용되었으므로 generate의 기본 시스템 메시지로 다시 감싸지 않음)
             prompt = self._format_messages(messages)
             
-            return self.generate(
-                prompt=prompt,
-                max_length=max_length,
-                temperature=temperature,
-                **kwargs
-            )
+            return self._generate(prompt, max_length, temperature, top_p, **kwargs)
             
         except Exception as e:
             logger.error(f"채팅 오류: {str(e)}")
             raise
     
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_length: int = 256,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        **kwargs
+    ) -> Iterator[str]:
+        """채팅 형식 응답 생성 (토큰 스트리밍)"""
+        prompt = self._format_messages(messages)
+        return self._generate_stream(prompt, max_length, temperature, top_p, **kwargs)
+    
     def _format_messages(self, messages: List[Dict[str, str]]) -> str:
         """메시지 리스트를 프롬프트로 변환"""
         if self.is_instruct_model:
@@ -261,15 +562,91 @@ class HuggingFaceLLMService:
     def is_loaded(self) -> bool:
         """모델이 로드되었는지 확인"""
         return self.model is not None and self.tokenizer is not None
+    
+    def close(self) -> None:
+        """스케줄러 스레드 종료 + 모델 참조 해제 (로드/워밍업 실패 후 재시도 때 이전 모델이 남지 않도록)"""
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self.scheduler = None
+        self.pipeline = None
+        self.model = None
+        self._prefix_ids = {}
+        gc.collect()
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+    def warmup(self, max_new_tokens: int = 4) -> None:
+        """짧은 더미 생성으로 첫 요청이 치를 초기화 비용(연산 커널 준비, 메모리 할당)을 미리 치름"""
+        prompt = "안녕하세요"
+        length = len(self.tokenizer(self._build_prompt(prompt))["input_ids"])
+        self.generate(prompt=prompt, max_length=length + max_new_tokens)
 
 
 # 전역 인스턴스 (싱글톤 패턴)
 _llm_service: Optional[HuggingFaceLLMService] = None
+_llm_lock = threading.Lock()
+# 로딩 상태: not_loaded → loading → ready / failed (failed면 다음 get_llm_service 호출 때 다시 시도)
+_llm_state: Dict[str, object] = {"status": "not_loaded", "error": None, "load_seconds": None}
 
 def get_llm_service() -> HuggingFaceLLMService:
-    """LLM 서비스 인스턴스 가져오기 (싱글톤)"""
+    """LLM 서비스 인스턴스 가져오기 (싱글톤, 동시 호출 시에도 한 번만 로드 + 워밍업)
+
+    다른 스레드가 로딩 중이면 끝날 때까지 기다린다.
+    """
     global _llm_service
-    if _llm_service is None:
-        _llm_service = HuggingFaceLLMService()
+    if _llm_service is not None:
+        return _llm_service
+    with _llm_lock:
+        if _llm_service is None:
+            _llm_state.update(status="loading", error=None)
+            start = time.perf_counter()
+            service = None
+            try:
+                service = HuggingFaceLLMService()
+                service.warmup()
+            except Exception as e:
+                # 실패한 인스턴스의 스케줄러 스레드와 모델을 정리해야 재시도마다 쌓이지 않는다
+                if service is not None:
+                    service.close()
+                    service = None
+                _llm_state.update(status="failed", error=str(e))
+                raise
+            _llm_state.update(status="ready", load_seconds=round(time.perf_counter() - start, 2))
+            logger.info(f"✅ LLM 준비 완료 ({_llm_state['load_seconds']}s, 워밍업 포함)")
+            _llm_service = service
     return _llm_service
 
+def start_llm_warmup() -> None:
+    """백그라운드 스레드에서 LLM 로드 + 워밍업 시작 (앱 시작 시 호출, 이미 시작/완료됐으면 무시)"""
+    if _llm_service is not None or _llm_state["status"] == "loading":
+        return
+    
+    def run():
+        try:
+            get_llm_service()
+        except Exception as e:
+            logger.error(f"❌ LLM 워밍업 실패: {str(e)}")
+    
+    threading.Thread(target=run, name="llm-warmup", daemon=True).start()
+
+def get_llm_status() -> dict:
+    """LLM 로딩 상태 (모델을 로드하지 않고 조회)
+
+    ready: 트래픽을 받아도 되는지 (readiness). 워밍업을 켜면 로드가 끝나야 True이고,
+    끄면(LLM_WARMUP=0) 첫 요청 때 로드하므로 로드에 실패한 경우만 False.
+    """
+    status = {
+        **_llm_state,
+        "ready": _llm_state["status"] == "ready" if LLM_WARMUP else _llm_state["status"] != "failed",
+        "warmup": LLM_WARMUP,
+        "model_name": os.getenv("HF_MODEL_NAME", DEFAULT_MODEL_NAME),
+        "is_loaded": _llm_service is not None,
+    }
+    if _llm_service is not None:
+        status.update(
+            model_name=_llm_service.model_name,
+            device=_llm_service.device,
+            cpu_dtype=_llm_service.cpu_dtype,
+            scheduler=_llm_service.scheduler.stats() if _llm_service.scheduler else None
+        )
+    return status
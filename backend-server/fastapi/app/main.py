@@ -1,14 +1,35 @@
 # main.py
 
-from fastapi import FastAPI
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from app.api import router as api_router   # api.py의 router를 api_router라는 이름으로 임포트
 from app.cook_api import router as cook_router  # cook_api.py의 router 추가
+from app.metrics import record_request_latency, render_metrics
+
+# 로그 레벨 (LOG_LEVEL=DEBUG 이면 /recommend 단계별 상세 로그 출력)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 워커 프로세스마다 시작 시 LLM 로드 + 워밍업을 백그라운드로 시작 (스레드는 fork 후에 만들어야 함)
+    from app.llm_service import LLM_WARMUP, start_llm_warmup
+
+    if LLM_WARMUP:
+        start_llm_warmup()
+    yield
 
 # 1) 앱 생성
 app = FastAPI(
     title="레시피 추천 API",
     description="사용자 재료 기반 레시피 추천 서비스",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 2) 라우터 포함 — 반드시 app 선언 이후에!
@@ -16,7 +37,16 @@ app = FastAPI(
 app.include_router(api_router, prefix="/api/fastapi")
 app.include_router(cook_router, prefix="/api/fastapi")
 
+# 라우트별 응답 시간 기록
+app.middleware("http")(record_request_latency)
+
 # 3) 헬스체크용 루트 엔드포인트
 @app.get("/")
 async def read_root():
-    return {"message": "레시피 추천 API 서버가 실행 중입니다."}
\ No newline at end of file
+    return {"message": "레시피 추천 API 서버가 실행 중입니다."}
+
+# 4) Prometheus 메트릭 (단계별 / 라우트별 지연 시간 히스토그램)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
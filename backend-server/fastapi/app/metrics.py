@@ -0,0 +1,96 @@
+"""
+Prometheus 메트릭
+- recommend_stage_seconds{stage}: /recommend 처리 단계별 소요 시간 (encode, faiss_search, sparse_search, dedupe, scoring, db_fetch)
+- http_request_duration_seconds{method, route, status}: 라우트별 응답 시간
+- recommend_search_rounds: 적응형 top_k에서 요청당 FAISS 검색 횟수 (1이면 첫 k에서 확정)
+
+gunicorn 멀티 워커에서는 PROMETHEUS_MULTIPROC_DIR을 지정하면 워커별 값을 합산해서 노출한다.
+"""
+
+import contextlib
+import os
+import time
+from typing import Callable, List
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest
+from starlette.routing import Match
+
+# 단계별 시간은 수 ms ~ 수백 ms 범위
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "recommend_stage_seconds",
+    "Time spent in each /recommend stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+
+SEARCH_ROUNDS = Histogram(
+    "recommend_search_rounds",
+    "FAISS search rounds per /recommend request (adaptive top_k)",
+    buckets=(1, 2, 3, 4, 5, 6),
+)
+
+
+# 단계 시간을 추가로 받아볼 콜백 (벤치마크 등에서 원시 값 수집용)
+_stage_observers: List[Callable[[str, float], None]] = []
+
+
+def add_stage_observer(observer: Callable[[str, float], None]) -> None:
+    _stage_observers.append(observer)
+
+
+@contextlib.contextmanager
+def stage_timer(stage: str):
+    """with stage_timer("encode"): ... 형태로 단계 시간 기록"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        for observer in _stage_observers:
+            observer(stage, elapsed)
+
+
+def route_template(request) -> str:
+    """요청 경로 대신 라우트 템플릿 사용 (경로 파라미터별로 시계열이 늘어나지 않도록)"""
+    for route in request.app.routes:
+        path = getattr(route, "path", None)
+        if path is not None and route.matches(request.scope)[0] == Match.FULL:
+            return path
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+async def record_request_latency(request, call_next):
+    """라우트별 응답 시간 기록 (HTTP 미들웨어)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_SECONDS.labels(request.method, route_template(request), str(status)).observe(
+            time.perf_counter() - start
+        )
+
+
+def render_metrics() -> tuple:
+    """Prometheus 텍스트 형식 (본문, Content-Type)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,29 @@
+"""
+LLM 프롬프트 공통 문구
+
+여러 라우트가 같은 문구로 시작하는 프롬프트를 만들기 때문에 한곳에 모아 둔다.
+LLM 서비스는 SHARED_PROMPT_PREFIXES로 만든 프롬프트 앞부분의 KV 캐시를 미리 계산해 두고,
+요청 프롬프트가 그 앞부분으로 시작하면 나머지 부분만 prefill한다.
+"""
+
+# Instruct 모델 기본 시스템 메시지 (시스템 메시지 없이 generate를 호출할 때)
+DEFAULT_SYSTEM_MESSAGE = "너는 친절하고 유용한 AI 어시스턴트입니다. 사용자의 질문에 정확하고 도움이 되는 답변을 제공합니다."
+
+# /llama/chat 단일 메시지 요청의 시스템 메시지
+COOK_CHAT_SYSTEM_MESSAGE = "너는 친절한 한국 요리 도우미 셰프야. 사용자의 요리 관련 질문에 도움을 줘."
+
+# /cook/next, /cook/current 조리 단계 수정 프롬프트의 고정 앞부분
+STEP_PROMPT_PREAMBLE = "너는 한국 요리 도우미 셰프야. 사용자의 즉석 요구를 반영해 현재 단계만 안전하게 수정하되, 재료/비율/불 세기/타이밍을 구체적으로 제시해.\n\n레시피 제목: "
+
+# /llama/recipe-guide 프롬프트의 고정 앞부분
+RECIPE_GUIDE_PREAMBLE = "다음 레시피에 대한 요리 가이드를 시작합니다.\n\n레시피 이름: "
+
+# KV 캐시를 재사용할 프롬프트 앞부분
+#   {"prompt": 앞부분}: generate(prompt=앞부분 + ...)
+#   {"system": 시스템 메시지}: chat([system, user ...])
+SHARED_PROMPT_PREFIXES = [
+    {"prompt": ""},  # 기본 시스템 메시지까지
+    {"prompt": STEP_PROMPT_PREAMBLE},
+    {"prompt": RECIPE_GUIDE_PREAMBLE},
+    {"system": COOK_CHAT_SYSTEM_MESSAGE},
+]
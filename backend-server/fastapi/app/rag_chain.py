@@ -4,56 +4,60 @@ LangChain을 사용한 레시피 추천 시스템
 """
 
 import os
+import sys
 import logging
 from typing import List, Dict, Any
-import pickle
+
+import numpy as np
+
+from .cache import LRUCache
+from .recipe_store import metadata_exists
+from .resources import get_index_version, get_ingredient_postings, get_metadata, resolve_metadata_path
 
 logger = logging.getLogger(__name__)
 
 class RAGChain:
     def __init__(self):
-        self.metadata_path = "/app/faiss_store/metadata.pkl"
+        self.metadata_path = None
         self.all_recipes = []
+        self.postings = None  # 재료 조각 -> 레시피 행 역색인 (검색용)
+        self.version = None  # 로딩된 인덱스/메타데이터 버전 (레지스트리에서 한 번 계산)
+        # RAG 검색 결과 캐시 ((인덱스/메타데이터 버전, 정규화된 재료 집합) -> 추천 목록), 프로세스 안에서만 유지
+        self.result_cache = LRUCache(
+            max_entries=int(os.getenv("RESULT_CACHE_SIZE", "2000")),
+            max_bytes=int(float(os.getenv("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+            ttl=float(os.getenv("RESULT_CACHE_TTL", "600")),
+            sizeof=_recommendations_nbytes,
+        )
         self._load_recipes()
     
     def _load_recipes(self):
-        """metadata.pkl에서 레시피 데이터 로드"""
+        """전역 레지스트리의 레시피 메타데이터 사용 (faiss_search 등과 같은 객체 공유)"""
         try:
+            self.metadata_path = resolve_metadata_path()
             logger.info(f"레시피 데이터 로드 시도: {self.metadata_path}")
             
             # 파일 존재 확인
-            if not os.path.exists(self.metadata_path):
-                logger.error(f"파일이 존재하지 않음: {self.metadata_path}")
-                
-                # 대체 경로 시도
-                alternative_paths = [
-                    "./faiss_store/metadata.pkl",
-                    "/backend-server/fastapi/faiss_store/metadata.pkl",
-                    "./backend-server/fastapi/faiss_store/metadata.pkl"
-                ]
-                
-                for alt_path in alternative_paths:
-                    if os.path.exists(alt_path):
-                        logger.info(f"대체 경로 발견: {alt_path}")
-                        self.metadata_path = alt_path
-                        break
-                else:
-                    logger.error("모든 경로에서 파일을 찾을 수 없음")
-                    return
-            
-            # 파일 권한 확인
-            if not os.access(self.metadata_path, os.R_OK):
-                logger.error(f"파일 읽기 권한 없음: {self.metadata_path}")
+            if not metadata_exists(self.metadata_path):
+                logger.error("모든 경로에서 파일을 찾을 수 없음")
                 return
             
-            # 파일 크기 확인
-            file_size = os.path.getsize(self.metadata_path)
-            logger.info(f"파일 크기: {file_size / (1024*1024):.2f} MB")
+            if os.path.exists(self.metadata_path):
+                # 파일 권한 확인
+                if not os.access(self.metadata_path, os.R_OK):
+                    logger.error(f"파일 읽기 권한 없음: {self.metadata_path}")
+                    return
+                
+                # 파일 크기 확인
+                file_size = os.path.getsize(self.metadata_path)
+                logger.info(f"파일 크기: {file_size / (1024*1024):.2f} MB")
             
-            # pickle 로드 (allow_pickle 명시적 설정)
-            with open(self.metadata_path, "rb") as f:
-                self.all_recipes = pickle.load(f)
+            # 컬럼형 저장소(faiss_store/recipes)가 있으면 mmap, 없으면 pickle (레지스트리에서 한 번만 로드)
+            self.all_recipes = get_metadata()
+            # 재료 역색인도 레지스트리에서 한 번만 생성 (preload 시 워커 간 공유)
+            self.postings = get_ingredient_postings()
             
+            self.version = get_index_version()
             logger.info(f"✅ 총 {len(self.all_recipes)}개 레시피 로드 완료")
             
             # 첫 번째 레시피 샘플 출력
@@ -75,51 +79,46 @@ class RAGChain:
         
         logger.info(f"검색 시작 - 재료: {ingredients}, 총 {len(self.all_recipes)}개 레시피")
         
-        # 재료 매칭 점수 계산
-        scored_recipes = []
+        # posting list 병합으로 레시피별 매칭 재료 수 계산 (레시피 전체를 순회하지 않음)
+        user_terms = [i.lower() for i in ingredients]
+        rows, counts, per_term = self.postings.match_counts(user_terms)
+        
+        logger.info(f"매칭된 레시피 수: {len(rows)}")
+        
+        # 점수 내림차순, 동점은 레시피 순서 (기존 안정 정렬과 같은 순서)
+        # 전체 정렬 대신 상위 top_k개만 부분 선택 후 정렬
+        keys = -counts.astype(np.int64) * (len(self.all_recipes) + 1) + rows
+        if len(keys) > top_k:
+            keys = keys[np.argpartition(keys, top_k - 1)[:top_k]] if top_k > 0 else keys[:0]
+        order = np.sort(keys)
         
-        for recipe in self.all_recipes:
-            recipe_ingredients = recipe.get("ingredients", "").lower()
+        # 응답 dict는 선택된 레시피만 구성
+        top_recipes = []
+        for key in order.tolist():
+            row = key % (len(self.all_recipes) + 1)
+            recipe = self.all_recipes[row]
+            matched_ingredients = [
+                user_ingredient
+                for user_ingredient, term_rows in zip(ingredients, per_term)
+                if _contains(term_rows, row)
+            ]
+            match_count = len(matched_ingredients)
             recipe_title = recipe.get("title", "")
             recipe_content = recipe.get("content", "")
+            recipe_ingredients = (recipe.get("ingredients") or "").lower()
             
-            # 매칭 점수 계산
-            match_count = 0
-            matched_ingredients = []
+            # 재료 리스트 파싱
+            ingredients_list = [ing.strip() for ing in recipe_ingredients.split(',')]
             
-            for user_ingredient in ingredients:
-                user_ingredient_lower = user_ingredient.lower()
-                if user_ingredient_lower in recipe_ingredients:
-                    match_count += 1
-                    matched_ingredients.append(user_ingredient)
-            
-            # 최소 1개 이상 매칭되면 추가 (더 많은 결과를 위해)
-            if match_count > 0:
-                # 재료 리스트 파싱
-                ingredients_list = [ing.strip() for ing in recipe_ingredients.split(',')]
-                
-                scored_recipes.append({
-                    "recipe": recipe,
-                    "score": match_count,
-                    "matched_ingredients": matched_ingredients,
-                    "title": recipe_title,
-                    "description": f"{recipe_title} - {recipe_content[:100]}..." if len(recipe_content) > 100 else recipe_content,
-                    "ingredients": ingredients_list,
-                    "instructions": recipe_content.split('\n')[:8] if recipe_content else ["조리법을 확인해주세요"],
-                    "tips": f"사용자 재료 {match_count}개가 포함된 레시피입니다: {', '.join(matched_ingredients)}"
-                })
-        
-        logger.info(f"매칭된 레시피 수: {len(scored_recipes)}")
-        
-        # 점수 기준 정렬 (내림차순)
-        scored_recipes.sort(key=lambda x: x["score"], reverse=True)
-        
-        # 상위 top_k개 반환
-        top_recipes = scored_recipes[:top_k]
-        
-        # recipe 키 제거 (응답에 포함 불필요)
-        for recipe in top_recipes:
-            recipe.pop("recipe", None)
+            top_recipes.append({
+                "score": match_count,
+                "matched_ingredients": matched_ingredients,
+                "title": recipe_title,
+                "description": f"{recipe_title} - {recipe_content[:100]}..." if len(recipe_content) > 100 else recipe_content,
+                "ingredients": ingredients_list,
+                "instructions": recipe_content.split('\n')[:8] if recipe_content else ["조리법을 확인해주세요"],
+                "tips": f"사용자 재료 {match_count}개가 포함된 레시피입니다: {', '.join(matched_ingredients)}"
+            })
         
         return top_recipes
     
@@ -139,32 +138,14 @@ class RAGChain:
                     "method": "No_Ingredients"
                 }
             
-            # 레시피 검색 (더 많은 결과를 위해 top_k 증가)
-            recommendations = self._search_recipes(ingredients, top_k=50)
-            
-            if recommendations:
-                logger.info(f"✅ {len(recommendations)}개 레시피 찾음")
-                return {
-                    "result": f"'{', '.join(ingredients)}' 재료로 만들 수 있는 요리를 {len(recommendations)}개 찾았습니다!",
-                    "recommendations": recommendations,
-                    "total_count": len(recommendations),
-                    "source_documents": [
-                        {
-                            "page_content": f"재료: {', '.join(ingredients)}",
-                            "metadata": {"source": "metadata.pkl", "type": "ingredient_search"}
-                        }
-                    ],
-                    "method": "RAG_metadata.pkl"
-                }
-            else:
-                logger.info("❌ 매칭되는 레시피 없음")
-                return {
-                    "result": f"'{', '.join(ingredients)}' 재료로 만들 수 있는 요리를 찾을 수 없습니다.",
-                    "recommendations": [],
-                    "total_count": 0,
-                    "source_documents": [],
-                    "method": "No_Results"
-                }
+            # 입력 순서/대소문자/중복과 무관하게 같은 재료 집합이면 같은 검색 결과 (응답 문구만 입력 순서 사용)
+            terms = canonical_terms(ingredients)
+            cache_key = (self.version, terms)
+            recommendations = self.result_cache.get(cache_key)
+            if recommendations is None:
+                recommendations = self._search_recipes(list(terms), top_k=50)
+                self.result_cache.put(cache_key, recommendations)
+            return self._response(ingredients, recommendations)
             
         except Exception as e:
             logger.error(f"❌ RAG 체인 실행 오류: {str(e)}")
@@ -177,6 +158,55 @@ class RAGChain:
                 "source_documents": [],
                 "method": "Error"
             }
+    
+    def _response(self, ingredients: List[str], recommendations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """검색 결과로 응답 구성 (문구의 재료는 사용자가 입력한 순서)"""
+        recommendations = list(recommendations)
+        
+        if recommendations:
+            logger.info(f"✅ {len(recommendations)}개 레시피 찾음")
+            return {
+                "result": f"'{', '.join(ingredients)}' 재료로 만들 수 있는 요리를 {len(recommendations)}개 찾았습니다!",
+                "recommendations": recommendations,
+                "total_count": len(recommendations),
+                "source_documents": [
+                    {
+                        "page_content": f"재료: {', '.join(ingredients)}",
+                        "metadata": {"source": "metadata.pkl", "type": "ingredient_search"}
+                    }
+                ],
+                "method": "RAG_metadata.pkl"
+            }
+        else:
+            logger.info("❌ 매칭되는 레시피 없음")
+            return {
+                "result": f"'{', '.join(ingredients)}' 재료로 만들 수 있는 요리를 찾을 수 없습니다.",
+                "recommendations": [],
+                "total_count": 0,
+                "source_documents": [],
+                "method": "No_Results"
+            }
+
+def canonical_terms(ingredients: List[str]) -> tuple:
+    """RAG 검색용 재료 정규형: 앞뒤 공백 제거, 소문자화 후 중복 제거 및 정렬 (빈 문자열 제외)"""
+    return tuple(sorted({i.strip().lower() for i in ingredients if i and i.strip()}))
+
+
+def _recommendations_nbytes(recommendations: list) -> int:
+    """RAG 추천 목록의 대략적인 메모리 크기"""
+    return sys.getsizeof(recommendations) + sum(
+        sys.getsizeof(r["title"]) + sys.getsizeof(r["description"])
+        + sum(sys.getsizeof(v) for v in r["ingredients"]) + sum(sys.getsizeof(v) for v in r["instructions"])
+        + sys.getsizeof(r["tips"])
+        for r in recommendations
+    )
+
+
+def _contains(sorted_rows: np.ndarray, row: int) -> bool:
+    """오름차순 행 배열에 row가 있는지 (이분 탐색)"""
+    i = int(np.searchsorted(sorted_rows, row))
+    return i < len(sorted_rows) and int(sorted_rows[i]) == row
+
 
 # 전역 RAG 체인 인스턴스
 chain = RAGChain()
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+컬럼형 레시피 메타데이터 저장소 (metadata.pkl 대체)
+
+faiss_store/recipes/
+    meta.json                  레코드 수, 컬럼, content 압축 방식, 원본 metadata.pkl 크기/수정 시각
+    ids.npy                    레시피 id (int64, 0 = id 없음)
+    <column>.offsets.npy       레코드별 시작/끝 오프셋 (int64, 길이 N+1)
+    <column>.bin               UTF-8 바이트 blob (content는 레코드별 zlib 압축 선택)
+    steps.*, ingredient_list.* 구축 시 미리 분리한 조리 단계/재료 목록 (항목 구분자 \x1f)
+
+서빙 시에는 모든 파일을 mmap으로 열고 필요한 필드만 그때그때 디코딩한다.
+파일이 페이지 캐시에 올라가므로 여러 워커 프로세스가 같은 메모리를 공유한다.
+
+기존 metadata.pkl 변환:
+    python -m app.recipe_store faiss_store/metadata.pkl
+"""
+
+import json
+import logging
+import mmap
+import os
+import pickle
+import shutil
+import sys
+import zlib
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_DIRNAME = "recipes"
+TEXT_COLUMNS = ("title", "ingredients", "content")
+# 구축 시 content/ingredients에서 미리 분리해 두는 목록 컬럼 (/cook/select용)
+LIST_COLUMNS = ("steps", "ingredient_list")
+LIST_SEP = "\x1f"
+# 본문 크기의 컬럼은 레코드별 zlib 압축 (RECIPE_STORE_COMPRESS=0이면 비압축)
+COMPRESSED_COLUMNS = ("content", "steps")
+
+
+def split_steps(content: str) -> List[str]:
+    """조리법 본문을 번호 붙은 단계 목록으로 분리 (빈 줄, '#' 주석 줄 제외)"""
+    lines = [line.strip() for line in (content or "").split("\n")]
+    steps = [line for line in lines if line and not line.startswith("#")]
+    return [f"{num}. {line}" for num, line in enumerate(steps, 1)]
+
+
+def split_ingredients(ingredients: str) -> List[str]:
+    """쉼표로 구분된 재료 문자열을 재료 목록으로 분리"""
+    return [ing.strip() for ing in (ingredients or "").split(",") if ing.strip()]
+
+
+def _list_column_values(recipe: dict) -> dict:
+    return {
+        "steps": split_steps(str(recipe.get("content") or "")),
+        "ingredient_list": split_ingredients(str(recipe.get("ingredients") or "")),
+    }
+
+
+def store_path_for(metadata_path: str) -> str:
+    """metadata.pkl 옆의 컬럼형 저장소 경로"""
+    return os.path.join(os.path.dirname(metadata_path), STORE_DIRNAME)
+
+
+def _file_stat(path: str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_recipe_store(
+    path: str, recipes: Iterable[dict], compress_content: bool = True, source_path: Optional[str] = None
+) -> None:
+    """레시피 목록(metadata.pkl과 같은 형태)을 컬럼형 저장소로 기록
+
+    source_path: 같은 레시피를 담은 metadata.pkl. 크기/수정 시각을 기록해 두고
+    로딩 시 pkl이 그 뒤에 바뀌었으면(재구축 중단 등) 저장소 대신 pkl을 사용한다.
+    """
+    recipes = list(recipes)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    ids = np.array([int(r.get("id") or 0) for r in recipes], dtype=np.int64)
+    np.save(os.path.join(tmp_path, "ids.npy"), ids)
+
+    list_values = [_list_column_values(r) for r in recipes]
+
+    for column in TEXT_COLUMNS + LIST_COLUMNS:
+        compress = compress_content and column in COMPRESSED_COLUMNS
+        offsets = np.zeros(len(recipes) + 1, dtype=np.int64)
+        with open(os.path.join(tmp_path, f"{column}.bin"), "wb") as f:
+            for i, recipe in enumerate(recipes):
+                if column in LIST_COLUMNS:
+                    value = LIST_SEP.join(list_values[i][column])
+                else:
+                    value = recipe.get(column) or ""
+                data = str(value).encode("utf-8")
+                if compress:
+                    data = zlib.compress(data, 6)
+                f.write(data)
+                offsets[i + 1] = offsets[i] + len(data)
+        np.save(os.path.join(tmp_path, f"{column}.offsets.npy"), offsets)
+
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "count": len(recipes),
+            "columns": list(TEXT_COLUMNS + LIST_COLUMNS),
+            "content_compression": "zlib" if compress_content else None,
+            "compressed_columns": list(COMPRESSED_COLUMNS) if compress_content else [],
+            "source": _file_stat(source_path) if source_path and os.path.exists(source_path) else None,
+        }, f, ensure_ascii=False, indent=2)
+
+    # 완성된 디렉터리로 교체 (읽는 중인 프로세스는 기존 mmap을 계속 사용)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+class RecipeRecord(Mapping):
+    """레시피 한 건 (필드 접근 시점에 디코딩, dict처럼 .get 사용 가능)"""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "RecipeStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, key: str):
+        if key == "id":
+            return self._store.recipe_id(self._row)
+        if key in TEXT_COLUMNS:
+            return self._store.field(self._row, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("id",) + TEXT_COLUMNS)
+
+    def __len__(self) -> int:
+        return 1 + len(TEXT_COLUMNS)
+
+    def __repr__(self) -> str:
+        return f"RecipeRecord(row={self._row}, id={self.get('id')})"
+
+
+class RecipeStore:
+    """mmap 기반 컬럼형 레시피 저장소 (metadata 리스트와 같은 방식으로 인덱싱)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self._offsets = {}
+        self._blobs = {}
+        for column in self.meta["columns"]:
+            self._offsets[column] = np.load(os.path.join(path, f"{column}.offsets.npy"), mmap_mode="r")
+            blob_path = os.path.join(path, f"{column}.bin")
+            if os.path.getsize(blob_path) == 0:
+                self._blobs[column] = b""
+            else:
+                with open(blob_path, "rb") as f:
+                    self._blobs[column] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._compressed = set(self.meta.get(
+            "compressed_columns", ["content"] if self.meta.get("content_compression") == "zlib" else []
+        ))
+
+    @property
+    def files(self) -> List[str]:
+        """저장소를 구성하는 파일 목록 (버전 식별용)"""
+        return [os.path.join(self.path, name) for name in sorted(os.listdir(self.path))]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, row: int) -> RecipeRecord:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return RecipeRecord(self, int(row))
+
+    def __iter__(self) -> Iterator[RecipeRecord]:
+        for row in range(len(self)):
+            yield RecipeRecord(self, row)
+
+    def recipe_id(self, row: int) -> Optional[int]:
+        rid = int(self.ids[row])
+        return rid or None
+
+    def field(self, row: int, column: str) -> str:
+        offsets = self._offsets[column]
+        data = self._blobs[column][int(offsets[row]):int(offsets[row + 1])]
+        if column in self._compressed and data:
+            data = zlib.decompress(data)
+        return bytes(data).decode("utf-8")
+
+    def has_column(self, column: str) -> bool:
+        return column in self._offsets
+
+    def field_list(self, row: int, column: str) -> List[str]:
+        """목록 컬럼(steps, ingredient_list) 한 건"""
+        value = self.field(row, column)
+        return value.split(LIST_SEP) if value else []
+
+    def column(self, column: str) -> List[str]:
+        """컬럼 전체 디코딩 (인덱스 구축용)"""
+        return [self.field(row, column) for row in range(len(self))]
+
+    def nbytes(self) -> int:
+        """디스크(=공유 페이지 캐시) 상의 크기"""
+        return sum(os.path.getsize(p) for p in self.files)
+
+
+class RecipeIdIndex:
+    """레시피 id -> 행 번호 (로딩 시 한 번 구축)
+
+    id가 촘촘하면(DB auto increment) id를 그대로 주소로 쓰는 배열로 O(1) 조회하고,
+    듬성듬성하면 정렬된 id 배열에서 이분 탐색한다. 같은 id가 여러 번 있으면 앞 행이 우선.
+    """
+
+    # id 최댓값이 레코드 수의 이 배수 이하이면 직접 주소 배열 사용
+    DENSE_FACTOR = 4
+
+    def __init__(self, ids: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.flatnonzero(ids > 0)  # 0 = id 없음
+        valid = ids[rows]
+        self.count = len(ids)
+        self.dense = bool(len(valid)) and int(valid.max()) <= self.DENSE_FACTOR * max(len(ids), 1)
+        if self.dense:
+            self.row_by_id = np.full(int(valid.max()) + 1, -1, dtype=np.int64)
+            # 뒤에서부터 채워 중복 id는 앞 행이 남도록
+            self.row_by_id[valid[::-1]] = rows[::-1]
+        else:
+            order = np.argsort(valid, kind="stable")
+            self.sorted_ids = valid[order]
+            self.sorted_rows = rows[order]
+
+    @classmethod
+    def from_metadata(cls, metadata) -> "RecipeIdIndex":
+        if isinstance(metadata, RecipeStore):
+            return cls(metadata.ids)
+        return cls(np.fromiter((int(r.get("id") or 0) for r in metadata), dtype=np.int64, count=len(metadata)))
+
+    def row(self, recipe_id: int) -> Optional[int]:
+        if recipe_id is None or recipe_id <= 0:
+            return None
+        if self.dense:
+            if recipe_id >= len(self.row_by_id):
+                return None
+            row = int(self.row_by_id[recipe_id])
+            return row if row >= 0 else None
+        i = int(np.searchsorted(self.sorted_ids, recipe_id))
+        if i < len(self.sorted_ids) and int(self.sorted_ids[i]) == recipe_id:
+            return int(self.sorted_rows[i])
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        if self.dense:
+            return self.row_by_id.nbytes
+        return self.sorted_ids.nbytes + self.sorted_rows.nbytes
+
+
+def recipe_lists(metadata, row: int) -> dict:
+    """레시피 한 건의 조리 단계/재료 목록 (저장소에 미리 분리된 컬럼이 있으면 그대로 사용)"""
+    if isinstance(metadata, RecipeStore) and all(metadata.has_column(c) for c in LIST_COLUMNS):
+        return {column: metadata.field_list(row, column) for column in LIST_COLUMNS}
+    return _list_column_values(metadata[row])
+
+
+def metadata_exists(metadata_path: str) -> bool:
+    return os.path.isdir(store_path_for(metadata_path)) or os.path.exists(metadata_path)
+
+
+def _store_mismatch(store: "RecipeStore", metadata_path: str, expected_count: Optional[int]) -> Optional[str]:
+    """저장소를 그대로 쓰면 안 되는 이유 (FAISS 행 번호와 레코드가 어긋나는 경우), 문제없으면 None"""
+    if expected_count is not None and len(store) != expected_count:
+        return f"레코드 수 {len(store)} != 인덱스 벡터 수 {expected_count}"
+    if os.path.exists(metadata_path):
+        source = store.meta.get("source")
+        if source:
+            if source != _file_stat(metadata_path):
+                return "저장소 구축 이후 metadata.pkl이 변경됨"
+        elif os.path.getmtime(os.path.join(store.path, "meta.json")) < os.path.getmtime(metadata_path):
+            return "metadata.pkl보다 오래된 저장소"
+    return None
+
+
+def load_metadata(metadata_path: str, expected_count: Optional[int] = None):
+    """컬럼형 저장소가 있으면 mmap으로 열고, 없거나 metadata.pkl / 인덱스와 맞지 않으면 metadata.pkl을 읽음
+
+    expected_count: FAISS 인덱스의 벡터 수 (행 번호가 레코드 번호이므로 같아야 함)
+    """
+    store_path = store_path_for(metadata_path)
+    if os.path.exists(os.path.join(store_path, "meta.json")):
+        store = RecipeStore(store_path)
+        mismatch = _store_mismatch(store, metadata_path, expected_count)
+        if mismatch is None:
+            logger.info(f"📚 컬럼형 메타데이터 사용: {store_path} ({len(store)}개)")
+            return store
+        if not os.path.exists(metadata_path):
+            logger.error(f"❌ 컬럼형 메타데이터가 인덱스와 맞지 않습니다 ({mismatch}): {store_path}")
+            return store
+        logger.warning(f"⚠️ 컬럼형 메타데이터 무시 ({mismatch}), metadata.pkl 사용: {store_path}")
+    logger.info(f"📚 metadata.pkl 사용: {metadata_path}")
+    with open(metadata_path, "rb") as f:
+        metadata = pickle.load(f)
+    if expected_count is not None and len(metadata) != expected_count:
+        logger.error(f"❌ metadata.pkl 레코드 수 {len(metadata)} != 인덱스 벡터 수 {expected_count}")
+    return metadata
+
+
+def metadata_files(metadata_path: str, metadata) -> List[str]:
+    """로딩된 메타데이터의 원본 파일 목록"""
+    if isinstance(metadata, RecipeStore):
+        return metadata.files
+    return [metadata_path]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    source = sys.argv[1] if len(sys.argv) > 1 else "faiss_store/metadata.pkl"
+    with open(source, "rb") as f:
+        recipes = pickle.load(f)
+    target = store_path_for(source)
+    write_recipe_store(
+        target, recipes, compress_content=os.getenv("RECIPE_STORE_COMPRESS", "1") == "1", source_path=source
+    )
+    logger.info(f"✅ {len(recipes)}개 레시피 → {target}")
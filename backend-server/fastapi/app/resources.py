@@ -0,0 +1,257 @@
+"""
+프로세스 전역 리소스 레지스트리
+임베딩 모델, FAISS 인덱스, 레시피 메타데이터 등 무거운 리소스를 프로세스당 한 번만 로드하고
+모든 라우터(faiss_search, search_faiss, rag_chain, cook_api)가 같은 객체를 공유한다.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "snunlp/KR-SBERT-V40K-klueNLI-augSTS")
+# 임베딩 모델 장치 (미지정 시 자동 선택, pre-fork 멀티 워커에서는 cpu 사용)
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+# 인덱스/메타데이터 디렉터리 (FAISS_STORE_DIR 환경 변수로 변경 가능)
+FAISS_STORE_DIR = os.getenv("FAISS_STORE_DIR", "faiss_store")
+INDEX_SAVE_PATH = os.path.join(FAISS_STORE_DIR, "index.faiss")
+META_SAVE_PATH = os.path.join(FAISS_STORE_DIR, "metadata.pkl")
+
+# 메타데이터 경로 후보 (컨테이너/로컬 실행 위치에 따라 다름)
+META_CANDIDATE_PATHS = [
+    META_SAVE_PATH,
+    "/app/faiss_store/metadata.pkl",
+    "/backend-server/fastapi/faiss_store/metadata.pkl",
+    "./backend-server/fastapi/faiss_store/metadata.pkl",
+]
+
+
+class ResourceRegistry:
+    """이름별 로더를 등록해 두고, 처음 요청될 때 한 번만 로드하는 레지스트리"""
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._sizers: Dict[str, Callable[[Any], int]] = {}
+        self._resources: Dict[str, Any] = {}
+        self._info: Dict[str, dict] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader: Callable[[], Any], sizeof: Optional[Callable[[Any], int]] = None) -> None:
+        """리소스 로더 등록 (같은 이름이면 교체, 로드 전에 호출해야 적용됨)"""
+        self._loaders[name] = loader
+        if sizeof is not None:
+            self._sizers[name] = sizeof
+        else:
+            self._sizers.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """리소스 조회 (없으면 로드, 동시 호출 시에도 한 번만 로드)"""
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            if name in self._resources:
+                return self._resources[name]
+            logger.info(f"📦 리소스 로딩: {name}")
+            start = time.perf_counter()
+            resource = self._loaders[name]()
+            elapsed = time.perf_counter() - start
+            sizer = self._sizers.get(name)
+            nbytes = None
+            if sizer is not None:
+                try:
+                    nbytes = int(sizer(resource))
+                except Exception as e:
+                    logger.warning(f"{name} 메모리 계산 실패: {str(e)}")
+            self._info[name] = {
+                "type": type(resource).__name__,
+                "load_seconds": round(elapsed, 3),
+                "bytes": nbytes,
+                "loaded_at": time.time(),
+            }
+            self._resources[name] = resource
+            logger.info(f"✅ 리소스 로딩 완료: {name} ({elapsed:.2f}s)")
+            return resource
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._resources
+
+    def preload(self, *names: str) -> None:
+        """지정한(또는 등록된 전체) 리소스를 미리 로드"""
+        for name in names or tuple(self._loaders):
+            self.get(name)
+
+    def report(self) -> dict:
+        """보유 리소스와 리소스별 메모리 사용량"""
+        resources = {}
+        for name in self._loaders:
+            info = self._info.get(name)
+            if info is None:
+                resources[name] = {"loaded": False}
+                continue
+            entry = {"loaded": True, **info}
+            if info["bytes"] is not None:
+                entry["mb"] = round(info["bytes"] / (1024 * 1024), 2)
+            resources[name] = entry
+        total = sum(r.get("bytes") or 0 for r in resources.values())
+        return {"resources": resources, "total_mb": round(total / (1024 * 1024), 2)}
+
+
+# ---- 리소스별 로더 / 메모리 계산 ----
+
+def resolve_metadata_path() -> str:
+    from .recipe_store import metadata_exists
+
+    for path in META_CANDIDATE_PATHS:
+        if metadata_exists(path):
+            return path
+    return META_SAVE_PATH
+
+
+def _load_model():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL_NAME, device=EMBEDDING_DEVICE)
+
+
+def _model_nbytes(model) -> int:
+    params = sum(p.numel() * p.element_size() for p in model.parameters())
+    buffers = sum(b.numel() * b.element_size() for b in model.buffers())
+    return params + buffers
+
+
+def _load_index():
+    from .faiss_index import load_index
+
+    return load_index(INDEX_SAVE_PATH)
+
+
+def _index_nbytes(index) -> int:
+    try:
+        return int(index.sa_code_size()) * int(index.ntotal)
+    except Exception:
+        from .faiss_index import index_memory_bytes
+
+        return index_memory_bytes(index)
+
+
+def _load_metadata():
+    from .recipe_store import load_metadata
+
+    # FAISS 행 번호 → 레코드 매핑이므로 인덱스 벡터 수와 맞는 메타데이터를 고름
+    expected_count = int(get_index().ntotal) if os.path.exists(INDEX_SAVE_PATH) else None
+    return load_metadata(resolve_metadata_path(), expected_count)
+
+
+def _metadata_nbytes(metadata) -> int:
+    from .recipe_store import RecipeStore
+
+    if isinstance(metadata, RecipeStore):
+        return metadata.nbytes()  # mmap (워커 간 공유되는 페이지 캐시)
+    return sys.getsizeof(metadata) + sum(
+        sys.getsizeof(doc) + sum(sys.getsizeof(v) for v in doc.values()) for doc in metadata
+    )
+
+
+def _load_ingredient_index():
+    from .ingredient_index import IngredientIndex, extract_name
+
+    return IngredientIndex(get_metadata(), extract_name)
+
+
+def _ingredient_index_nbytes(ingredient_index) -> int:
+    arrays = (ingredient_index.terms, ingredient_index.indptr, ingredient_index.indices, ingredient_index.recipe_ids)
+    return sum(a.nbytes for a in arrays) + sys.getsizeof(ingredient_index.vocab)
+
+
+def _load_ingredient_postings():
+    from .ingredient_index import IngredientPostings
+
+    return IngredientPostings(get_metadata())
+
+
+def _ingredient_postings_nbytes(postings) -> int:
+    return postings.nbytes
+
+
+def _load_sparse_index():
+    from .sparse_index import load_sparse_index
+
+    return load_sparse_index(INDEX_SAVE_PATH, get_ingredient_index())
+
+
+def _sparse_index_nbytes(sparse_index) -> int:
+    return sparse_index.nbytes
+
+
+def _load_recipe_id_index():
+    from .recipe_store import RecipeIdIndex
+
+    return RecipeIdIndex.from_metadata(get_metadata())
+
+
+def _recipe_id_index_nbytes(id_index) -> int:
+    return id_index.nbytes
+
+
+def _load_index_version() -> str:
+    """로딩된 인덱스/메타데이터 쌍의 버전 (파일 크기·수정 시각 + 벡터 수)
+
+    리소스는 프로세스 수명 동안 다시 로드하지 않으므로 버전도 프로세스당 한 번만 계산한다.
+    이 값을 키에 넣는 결과 캐시는 프로세스 안에서만 유효하며, 인덱스를 다시 만든 뒤에는 재시작해야 반영된다.
+    """
+    from .cache import file_version
+    from .faiss_index import index_params_path
+    from .recipe_store import metadata_files
+
+    return file_version(
+        [INDEX_SAVE_PATH, index_params_path(INDEX_SAVE_PATH)] + metadata_files(resolve_metadata_path(), get_metadata()),
+        int(get_index().ntotal),
+    )
+
+
+registry = ResourceRegistry()
+registry.register("embedding_model", _load_model, _model_nbytes)
+registry.register("faiss_index", _load_index, _index_nbytes)
+registry.register("metadata", _load_metadata, _metadata_nbytes)
+registry.register("ingredient_index", _load_ingredient_index, _ingredient_index_nbytes)
+registry.register("ingredient_postings", _load_ingredient_postings, _ingredient_postings_nbytes)
+registry.register("sparse_index", _load_sparse_index, _sparse_index_nbytes)
+registry.register("recipe_id_index", _load_recipe_id_index, _recipe_id_index_nbytes)
+registry.register("index_version", _load_index_version)
+
+
+def get_model():
+    return registry.get("embedding_model")
+
+
+def get_index():
+    return registry.get("faiss_index")
+
+
+def get_metadata():
+    return registry.get("metadata")
+
+
+def get_ingredient_index():
+    return registry.get("ingredient_index")
+
+
+def get_ingredient_postings():
+    return registry.get("ingredient_postings")
+
+
+def get_sparse_index():
+    return registry.get("sparse_index")
+
+
+def get_recipe_id_index():
+    return registry.get("recipe_id_index")
+
+
+def get_index_version() -> str:
+    return registry.get("index_version")
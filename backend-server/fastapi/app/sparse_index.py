@@ -0,0 +1,170 @@
+"""
+재료 BM25 희소 인덱스 (index.faiss 옆 ingredients.bm25.npz)
+
+밀집 임베딩("이 요리의 재료는 …입니다.")은 정확한 재료 일치를 자주 놓치므로,
+정제된 재료 어휘(IngredientIndex와 같은 어휘) 기준 BM25 점수로 후보를 따로 뽑아
+밀집 검색 결과와 RRF(Reciprocal Rank Fusion)로 합친다.
+
+    term_indptr / rows / weights   재료 어휘 id별 posting list (CSC)
+    weights                        BM25 가중치 (레시피 안에서 재료는 한 번만 세므로 tf=1)
+
+빌더가 인덱스와 함께 저장하고, 서빙 시 파일이 없거나 메타데이터와 맞지 않으면
+IngredientIndex에서 바로 다시 만든다 (NumPy 연산이라 수 초 이내).
+"""
+
+import logging
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SPARSE_INDEX_FILENAME = "ingredients.bm25.npz"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+
+def sparse_index_path(index_path: str) -> str:
+    """인덱스 파일 옆에 저장되는 BM25 인덱스 경로"""
+    return os.path.join(os.path.dirname(index_path), SPARSE_INDEX_FILENAME)
+
+
+class BM25Index:
+    """재료 어휘 id -> (레시피 행, BM25 가중치) posting list"""
+
+    def __init__(self, terms: np.ndarray, term_indptr: np.ndarray, rows: np.ndarray, weights: np.ndarray,
+                 num_rows: int):
+        self.terms = terms
+        self.term_indptr = term_indptr
+        self.rows = rows
+        self.weights = weights
+        self.num_rows = num_rows
+
+    @classmethod
+    def from_ingredient_index(cls, ingredient_index, k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        """IngredientIndex의 레시피별 재료 id(CSR)를 전치해 BM25 가중치 계산"""
+        num_rows = len(ingredient_index)
+        num_terms = len(ingredient_index.terms)
+        doc_len = np.diff(ingredient_index.indptr)
+        avgdl = float(doc_len.mean()) if num_rows and doc_len.any() else 1.0
+        df = np.bincount(ingredient_index.indices, minlength=num_terms)
+        idf = np.log1p((num_rows - df + 0.5) / (df + 0.5))
+
+        doc_rows = np.repeat(np.arange(num_rows, dtype=np.int32), doc_len)
+        norm = (k1 + 1.0) / (1.0 + k1 * (1.0 - b + b * doc_len / avgdl))
+        weights = idf[ingredient_index.indices] * norm[doc_rows]
+
+        order = np.argsort(ingredient_index.indices, kind="stable")
+        return cls(
+            terms=ingredient_index.terms,
+            term_indptr=np.concatenate(([0], np.cumsum(df))).astype(np.int64),
+            rows=doc_rows[order],
+            weights=weights[order].astype(np.float32),
+            num_rows=num_rows,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                terms=data["terms"],
+                term_indptr=data["term_indptr"],
+                rows=data["rows"],
+                weights=data["weights"],
+                num_rows=int(data["num_rows"]),
+            )
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=self.terms,
+            term_indptr=self.term_indptr,
+            rows=self.rows,
+            weights=self.weights,
+            num_rows=np.int64(self.num_rows),
+        )
+        os.replace(tmp_path, path)
+
+    def matches(self, ingredient_index) -> bool:
+        """같은 메타데이터/어휘로 만든 인덱스인지"""
+        return self.num_rows == len(ingredient_index) and np.array_equal(self.terms, ingredient_index.terms)
+
+    @property
+    def nbytes(self) -> int:
+        return self.terms.nbytes + self.term_indptr.nbytes + self.rows.nbytes + self.weights.nbytes
+
+    def search(self, term_masks: Sequence[np.ndarray], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """사용자 재료별 어휘 매칭 mask → BM25 상위 k개 (행, 점수), 점수 내림차순
+
+        사용자 재료 하나가 여러 어휘(예: "파" → 대파/쪽파)와 매칭되면 그중 가장 큰 가중치만 더한다.
+        점수는 레시피 수 길이의 배열에 누적한다 (정렬 기반 병합보다 빠름).
+        """
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.zeros(self.num_rows, dtype=np.float32)
+        for mask in term_masks:
+            tids = np.flatnonzero(mask)
+            if len(tids) == 1:
+                # posting list 안의 행은 중복이 없으므로 바로 더함
+                start, end = self.term_indptr[tids[0]], self.term_indptr[tids[0] + 1]
+                scores[self.rows[start:end]] += self.weights[start:end]
+            elif len(tids) > 1:
+                best = np.zeros(self.num_rows, dtype=np.float32)
+                for tid in tids:
+                    start, end = self.term_indptr[tid], self.term_indptr[tid + 1]
+                    rows = self.rows[start:end]
+                    best[rows] = np.maximum(best[rows], self.weights[start:end])
+                scores += best
+
+        rows = np.flatnonzero(scores)
+        if len(rows) > k:
+            rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        # 점수 내림차순, 동점은 행 순서
+        order = np.lexsort((rows, -scores[rows]))
+        rows = rows[order]
+        return rows.astype(np.int64), scores[rows]
+
+
+def rrf_fuse(dense_rows: np.ndarray, sparse_rows: np.ndarray, top_k: int, rrf_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """두 순위 목록(앞이 상위)을 RRF 점수 1 / (rrf_k + 순위)의 합으로 결합 → 상위 top_k개 (행, 점수)
+
+    점수 내림차순, 동점은 행 번호 오름차순. 음수 행(FAISS 빈 자리)은 무시한다.
+    """
+    dense_rows = dense_rows[dense_rows >= 0]
+    rows = np.concatenate([dense_rows, sparse_rows])
+    contrib = np.concatenate([
+        1.0 / (rrf_k + 1 + np.arange(len(dense_rows))),
+        1.0 / (rrf_k + 1 + np.arange(len(sparse_rows))),
+    ])
+    rows, inverse = np.unique(rows, return_inverse=True)
+    scores = np.bincount(inverse, weights=contrib, minlength=len(rows))
+    order = np.lexsort((rows, -scores))[:top_k]
+    return rows[order], scores[order]
+
+
+def write_sparse_index(index_path: str, recipes: Sequence[dict]) -> str:
+    """빌더용: 레시피 목록(metadata와 같은 순서)으로 BM25 인덱스를 만들어 index.faiss 옆에 저장"""
+    from .ingredient_index import IngredientIndex, extract_name
+
+    path = sparse_index_path(index_path)
+    BM25Index.from_ingredient_index(IngredientIndex(recipes, extract_name)).save(path)
+    return path
+
+
+def load_sparse_index(index_path: str, ingredient_index) -> Optional[BM25Index]:
+    """저장된 BM25 인덱스를 읽고, 없거나 메타데이터와 맞지 않으면 다시 구축"""
+    path = sparse_index_path(index_path)
+    if os.path.exists(path):
+        try:
+            sparse = BM25Index.load(path)
+            if sparse.matches(ingredient_index):
+                return sparse
+            logger.warning(f"⚠️ BM25 인덱스가 메타데이터와 맞지 않음 → 다시 구축: {path}")
+        except Exception as e:
+            logger.warning(f"⚠️ BM25 인덱스 로드 실패 → 다시 구축: {e}")
+    else:
+        logger.info(f"BM25 인덱스 파일 없음 → 메타데이터에서 구축: {path}")
+    return BM25Index.from_ingredient_index(ingredient_index)
@@ -0,0 +1,62 @@
+"""
+Server-Sent Events 응답 헬퍼 (LLM 토큰 스트리밍)
+
+    event: token   data: {"text": "..."}          생성된 텍스트 조각
+    event: done    data: {"text": "<전체 응답>", ...}  생성 완료 (추가 필드는 라우트별)
+    event: error   data: {"detail": "..."}        생성 중 오류
+
+동기 제너레이터를 StreamingResponse에 넘기면 스레드 풀에서 한 조각씩 꺼내므로
+생성 스레드를 기다리는 동안 이벤트 루프를 막지 않는다.
+"""
+
+import logging
+from typing import Callable, Iterable, Iterator, Optional
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx 프록시 버퍼링 해제 (토큰이 모였다가 한꺼번에 나가지 않도록)
+}
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def token_events(
+    tokens: Iterable[str],
+    done: Optional[Callable[[str], dict]] = None,
+    on_error: Optional[Callable[[Exception, str], Optional[dict]]] = None,
+) -> Iterator[bytes]:
+    """토큰 이터레이터 → SSE 이벤트 바이트
+
+    done(전체 텍스트)은 done 이벤트의 데이터, on_error(예외, 지금까지 텍스트)가 dict를 돌려주면
+    error 대신 그 데이터로 done 이벤트를 보낸다 (폴백 응답용).
+    """
+    parts = []
+    try:
+        for text in tokens:
+            parts.append(text)
+            yield sse_event("token", {"text": text})
+    except Exception as e:
+        logger.error(f"토큰 스트리밍 오류: {str(e)}")
+        fallback = on_error(e, "".join(parts)) if on_error else None
+        if fallback is None:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("done", fallback)
+        return
+    finally:
+        close = getattr(tokens, "close", None)
+        if close is not None:
+            close()  # 클라이언트가 끊겨도 생성 스레드가 멈추도록
+    text = "".join(parts).strip()
+    yield sse_event("done", done(text) if done else {"text": text})
+
+
+def sse_response(events: Iterable[bytes]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
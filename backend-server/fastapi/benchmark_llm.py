@@ -0,0 +1,240 @@
+"""
+LLM CPU 정밀도 벤치마크 (fp32 / bf16 / int8)
+
+HF_MODEL_NAME 모델을 서비스와 같은 로더(app.llm_service.load_causal_lm)로 정밀도별로 불러와
+고정 프롬프트 집합에 대해 다음을 비교한다.
+
+1) 로딩 시간, 모델 크기(state_dict 직렬화 크기), 모델 로딩으로 늘어난 RSS / 최대 RSS
+2) greedy 생성 토큰 처리량 (tokens/sec)과 프롬프트별 지연
+3) fp32 대비 출력 드리프트
+   - exact_match      greedy 출력이 fp32와 완전히 같은 프롬프트 비율
+   - prefix_agreement fp32 출력과 처음 달라지기 전까지 일치한 토큰 비율 (평균)
+   - top1_agreement   fp32 출력을 입력으로 넣었을 때(teacher forcing) 다음 토큰 1순위가 fp32와 같은 비율
+   - nll              fp32 출력 토큰의 평균 음의 로그우도 (fp32 행이 기준값)
+
+    python benchmark_llm.py
+    python benchmark_llm.py --dtypes fp32 int8 --max-new-tokens 32 --output llm_bench.json
+    HF_MODEL_NAME=... python benchmark_llm.py --threads 4
+
+정밀도마다 별도 프로세스에서 실행하므로 메모리 측정이 섞이지 않는다. fp32를 먼저 실행해
+그 출력을 기준으로 드리프트를 계산한다 (--dtypes에 fp32가 없으면 드리프트 생략).
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PROMPTS = [
+    "김치찌개를 처음 끓여 보는데, 돼지고기와 김치는 어떤 순서로 넣어야 하나요?",
+    "레시피 제목: 제육볶음\n현재 단계 번호: 2\n원문 단계: 팬에 기름을 두르고 돼지고기를 중불에서 볶아 주세요.\n\n"
+    "사용자 요구(누적): 맵기: 덜 맵게, 염도: 저염\n\n"
+    "주어진 요구를 반영하여, \"수정된 단계\"만 2~3문장으로 출력하고, 가능하면 대체재 1가지와 주의사항 1가지를 덧붙여줘.",
+    "다음 레시피에 대한 요리 가이드를 시작합니다.\n\n레시피 이름: 계란말이\n재료: 계란 3개, 대파, 소금, 식용유\n"
+    "조리법: 계란을 풀고 대파와 소금을 넣어 섞은 뒤 팬에 얇게 부어 말아 줍니다.\n\n"
+    "이 레시피에 대한 친절하고 단계별 요리 가이드를 제공해주세요.",
+    "냉장고에 두부, 애호박, 양파가 있어요. 20분 안에 만들 수 있는 반찬을 추천해 주세요.",
+    "된장국이 너무 짜게 됐어요. 어떻게 하면 간을 맞출 수 있을까요?",
+    "떡볶이 양념을 고추장 없이 만들 수 있나요?",
+    "닭가슴살을 퍽퍽하지 않게 굽는 방법을 알려 주세요.",
+    "밥솥 없이 냄비로 밥을 짓는 방법을 단계별로 설명해 주세요.",
+]
+
+
+def rss_mb() -> float:
+    """현재 프로세스 RSS (MB, Linux /proc 기준)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def model_size_mb(model) -> float:
+    """state_dict 직렬화 크기 (양자화된 Linear의 packed 가중치 포함)"""
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return round(buffer.tell() / 1024 / 1024, 1)
+
+
+def render_prompts(tokenizer) -> list:
+    """서비스와 같은 Instruct 채팅 형식으로 프롬프트를 토큰화"""
+    from app.prompts import DEFAULT_SYSTEM_MESSAGE
+
+    encoded = []
+    for prompt in PROMPTS:
+        if getattr(tokenizer, "chat_template", None):
+            text = tokenizer.apply_chat_template(
+                [{"role": "system", "content": DEFAULT_SYSTEM_MESSAGE}, {"role": "user", "content": prompt}],
+                tokenize=False,
+                add_generation_prompt=True,
+            )
+            encoded.append(tokenizer(text, add_special_tokens=False)["input_ids"])
+        else:
+            encoded.append(tokenizer(prompt)["input_ids"])
+    return encoded
+
+
+def teacher_forced(model, prompt_ids: list, output_ids: list):
+    """prompt + 기준 출력을 한 번에 넣고, 기준 출력 각 위치의 (1순위 일치 수, 음의 로그우도 합)"""
+    import torch
+
+    if not output_ids:
+        return 0, 0.0
+    ids = torch.tensor([prompt_ids + output_ids])
+    with torch.inference_mode():
+        logits = model(input_ids=ids).logits[0, len(prompt_ids) - 1:-1].float()
+    target = torch.tensor(output_ids)
+    logprobs = logits.log_softmax(dim=-1)
+    top1 = int((logits.argmax(dim=-1) == target).sum())
+    nll = float(-logprobs.gather(1, target[:, None]).sum())
+    return top1, nll
+
+
+def run_single(args) -> dict:
+    """한 정밀도에 대해 로딩 + 측정 (자식 프로세스에서 실행)"""
+    import torch
+    from transformers import AutoTokenizer
+
+    from app.llm_service import load_causal_lm
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+
+    base_rss = rss_mb()
+    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
+    start = time.perf_counter()
+    model = load_causal_lm(args.model, "cpu", args.single)
+    load_s = time.perf_counter() - start
+    loaded_rss = rss_mb()
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    prompts = render_prompts(tokenizer)
+    outputs, latencies, generated = [], [], 0
+    with torch.inference_mode():
+        # 첫 호출의 초기화 비용 제외
+        model.generate(torch.tensor([prompts[0]]), max_new_tokens=2, do_sample=False, pad_token_id=pad_id)
+        for ids in prompts:
+            start = time.perf_counter()
+            out = model.generate(
+                torch.tensor([ids]),
+                attention_mask=torch.ones(1, len(ids), dtype=torch.long),
+                max_new_tokens=args.max_new_tokens,
+                do_sample=False,
+                pad_token_id=pad_id,
+            )
+            latencies.append(time.perf_counter() - start)
+            output = out[0, len(ids):].tolist()
+            outputs.append(output)
+            generated += len(output)
+
+    report = {
+        "dtype": args.single,
+        "model": args.model,
+        "threads": torch.get_num_threads(),
+        "load_s": round(load_s, 2),
+        "model_size_mb": model_size_mb(model),
+        "rss_mb": loaded_rss,
+        "rss_model_mb": round(loaded_rss - base_rss, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "prompts": len(prompts),
+        "generated_tokens": generated,
+        "tokens_per_sec": round(generated / sum(latencies), 2) if latencies else 0.0,
+        "latency_p50_s": round(float(np.percentile(latencies, 50)), 3),
+        "latency_max_s": round(max(latencies), 3),
+        "outputs": outputs,
+    }
+
+    reference = None
+    if args.single == "fp32":
+        reference = outputs  # 기준 자신 (NLL 기준값)
+    elif args.reference and os.path.exists(args.reference):
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+    if reference is not None:
+        exact, prefix, top1, nll, total = 0, [], 0, 0.0, 0
+        for ids, ref, out in zip(prompts, reference, outputs):
+            exact += int(ref == out)
+            common = next((i for i, (a, b) in enumerate(zip(ref, out)) if a != b), min(len(ref), len(out)))
+            prefix.append(common / len(ref) if ref else 1.0)
+            t, n = teacher_forced(model, ids, ref)
+            top1, nll, total = top1 + t, nll + n, total + len(ref)
+        report["drift"] = {
+            "exact_match": round(exact / len(prompts), 3),
+            "prefix_agreement": round(float(np.mean(prefix)), 3),
+            "top1_agreement": round(top1 / total, 4) if total else 1.0,
+            "nll": round(nll / total, 4) if total else 0.0,
+        }
+    return report
+
+
+def print_report(reports: list) -> None:
+    print(f"\n=== {reports[0]['model']} (프롬프트 {reports[0]['prompts']}개, 스레드 {reports[0]['threads']}) ===")
+    print(f"{'정밀도':<8} {'로딩 s':>8} {'모델 MB':>9} {'모델 RSS':>9} {'최대 RSS':>9} {'tok/s':>8} {'p50 s':>7} "
+          f"{'일치':>6} {'접두 일치':>9} {'top1':>7} {'NLL':>7}")
+    for r in reports:
+        d = r.get("drift", {})
+        drift = (f"{d['exact_match']:>6.2f} {d['prefix_agreement']:>9.3f} {d['top1_agreement']:>7.4f} {d['nll']:>7.3f}"
+                 if d else f"{'-':>6} {'-':>9} {'-':>7} {'-':>7}")
+        print(f"{r['dtype']:<8} {r['load_s']:>8.2f} {r['model_size_mb']:>9.1f} {r['rss_model_mb']:>9.1f} {r['peak_rss_mb']:>9.1f} "
+              f"{r['tokens_per_sec']:>8.2f} {r['latency_p50_s']:>7.3f} {drift}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM CPU 정밀도 벤치마크")
+    parser.add_argument("--model", default=os.getenv("HF_MODEL_NAME", "00PJH/Llama-3.2-Korean-GGACHI-1B-Instruct-v1-koToEn"))
+    parser.add_argument("--dtypes", nargs="+", default=["fp32", "bf16", "int8"], help="비교할 정밀도 (fp32 / bf16 / int8)")
+    parser.add_argument("--max-new-tokens", type=int, default=64, help="프롬프트당 생성 토큰 수")
+    parser.add_argument("--threads", type=int, default=None, help="torch 스레드 수 (기본: torch 기본값)")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--reference", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--single", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_single(args), ensure_ascii=False))
+        return
+
+    # fp32를 먼저 실행해 드리프트 기준으로 사용
+    dtypes = sorted(dict.fromkeys(args.dtypes), key=lambda d: d != "fp32")
+    reference = os.path.join(tempfile.mkdtemp(prefix="llm-bench-"), "fp32_outputs.json")
+    reports = []
+    for dtype in dtypes:
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--single", dtype, "--model", args.model,
+            "--max-new-tokens", str(args.max_new_tokens), "--reference", reference,
+        ] + (["--threads", str(args.threads)] if args.threads else [])
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        report = json.loads(proc.stdout.decode("utf-8").strip().splitlines()[-1])
+        if dtype == "fp32":
+            with open(reference, "w", encoding="utf-8") as f:
+                json.dump(report["outputs"], f)
+        reports.append(report)
+
+    print_report(reports)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+추천 파이프라인 오프라인 벤치마크 (CPU 전용, 네트워크 불필요)
+
+1) metadata.pkl과 같은 형태의 합성 레시피 코퍼스 생성 (크기별, seed 고정)
+2) 빌더와 같은 방식(app.faiss_index / app.recipe_store)으로 인덱스와 컬럼형 메타데이터 구축
+3) recipe 테이블을 SQLite로 대체하고, 문자 bigram 해싱 인코더로 임베딩 모델을 대체
+4) recommend_recipes / RAGChain._search_recipes 실행 → 단계별 p50/p95/p99와 처리량 리포트
+   recommend_recipes_stream(/recommend/stream)은 첫 청크까지 시간과 전체 시간, /recommend 결과와의 일치 여부
+5) 밀집 검색만 / 하이브리드(밀집 + BM25) 검색의 재료 재현율 비교
+
+    python benchmark_recommend.py --sizes 10000 100000
+    python benchmark_recommend.py --sizes 1000000 --queries 100 --output bench.json
+    FAISS_INDEX_TYPE=ivf python benchmark_recommend.py --sizes 100000
+    python benchmark_recommend.py --sizes 100000 --limit 10   # 적응형 top_k (/recommend?limit=10)
+
+--fail-p95-ms를 주면 /recommend p95가 기준을 넘을 때 종료 코드 1 (릴리스 게이트용).
+크기마다 별도 프로세스에서 실행하므로 전역 리소스/캐시가 섞이지 않는다.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+BASE_INGREDIENTS = [
+    "돼지고기", "소고기", "닭고기", "닭가슴살", "오리고기", "베이컨", "햄", "소시지", "참치", "연어",
+    "고등어", "오징어", "새우", "조개", "멸치", "두부", "계란", "우유", "치즈", "버터",
+    "양파", "대파", "쪽파", "마늘", "생강", "감자", "고구마", "당근", "무", "배추",
+    "양배추", "애호박", "가지", "오이", "토마토", "파프리카", "피망", "청양고추", "홍고추", "버섯",
+    "표고버섯", "팽이버섯", "느타리버섯", "시금치", "콩나물", "숙주", "부추", "깻잎", "상추", "김치",
+    "밥", "쌀", "밀가루", "부침가루", "당면", "소면", "떡", "라면", "식빵", "파스타",
+    "간장", "진간장", "국간장", "고추장", "된장", "고춧가루", "설탕", "소금", "후추", "식초",
+    "참기름", "들기름", "식용유", "올리고당", "물엿", "맛술", "굴소스", "케첩", "마요네즈", "꿀",
+]
+INGREDIENT_PREFIXES = ["", "", "", "다진 ", "냉동 ", "국산 ", "손질한 "]
+UNITS = ["g", "개", "큰술", "작은술", "컵", "줌", "모", "쪽", "대"]
+DISH_TYPES = ["볶음", "조림", "찌개", "국", "전", "무침", "구이", "덮밥", "볶음밥", "탕", "찜", "샐러드"]
+STYLES = ["", "초간단 ", "매콤한 ", "달콤한 ", "엄마표 ", "자취생 ", "든든한 "]
+STEP_TEMPLATES = [
+    "{a}를 먹기 좋은 크기로 썰어 주세요.",
+    "팬에 기름을 두르고 {a}를 중불에서 볶아 주세요.",
+    "{a}와 {b}를 넣고 양념이 배도록 5분간 더 익혀 주세요.",
+    "냄비에 물을 붓고 {a}를 넣어 끓여 주세요.",
+    "{b}를 넣고 간을 맞춘 뒤 불을 꺼 주세요.",
+    "그릇에 담고 {a}를 올려 마무리합니다.",
+]
+
+STAGES = ("encode", "faiss_search", "sparse_search", "dedupe", "scoring", "db_fetch")
+
+
+# ---- 합성 코퍼스 ----
+
+def ingredient_vocab() -> list:
+    return [prefix + name for name in BASE_INGREDIENTS for prefix in INGREDIENT_PREFIXES[:4]]
+
+
+def generate_recipes(n: int, seed: int = 0) -> list:
+    """metadata.pkl과 같은 형태의 합성 레시피 ({id, title, ingredients, content})"""
+    rng = np.random.default_rng(seed)
+    vocab = ingredient_vocab()
+    # 재료 빈도는 Zipf 분포에 가깝게 (양파/마늘 같은 흔한 재료가 자주 등장)
+    weights = 1.0 / np.arange(1, len(vocab) + 1) ** 0.8
+    weights /= weights.sum()
+    order = rng.permutation(len(vocab))
+    recipes = []
+    for i in range(n):
+        k = int(rng.integers(3, 13))
+        picks = [vocab[j] for j in order[rng.choice(len(vocab), size=k, replace=False, p=weights)]]
+        ingredients = ",".join(
+            f"{name} {int(rng.integers(1, 500)) if rng.random() < 0.5 else int(rng.integers(1, 5))}{UNITS[int(rng.integers(len(UNITS)))]}"
+            for name in picks
+        )
+        main = picks[0].split()[-1]
+        title = f"{STYLES[int(rng.integers(len(STYLES)))]}{main}{DISH_TYPES[int(rng.integers(len(DISH_TYPES)))]}"
+        steps = [
+            STEP_TEMPLATES[int(t)].format(a=picks[int(rng.integers(k))], b=picks[int(rng.integers(k))])
+            for t in rng.integers(len(STEP_TEMPLATES), size=int(rng.integers(3, 9)))
+        ]
+        recipes.append({
+            "id": i + 1,
+            "title": title,
+            "ingredients": ingredients,
+            "content": "\n".join(steps),
+        })
+    return recipes
+
+
+def generate_queries(n: int, seed: int = 1) -> list:
+    """사용자 입력처럼 1~5개 재료 목록"""
+    rng = np.random.default_rng(seed)
+    return [
+        [BASE_INGREDIENTS[int(j)] for j in rng.choice(len(BASE_INGREDIENTS), size=int(rng.integers(1, 6)), replace=False)]
+        for _ in range(n)
+    ]
+
+
+# ---- 결정적 인코더 ----
+
+class HashingEncoder:
+    """한글/영문 문자 bigram을 해싱한 고정 차원 벡터 (SentenceTransformer.encode 대체)"""
+
+    _token = re.compile(r"[가-힣A-Za-z]+")
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+        self._buckets = {}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _bucket(self, gram: str) -> tuple:
+        cached = self._buckets.get(gram)
+        if cached is None:
+            h = zlib.crc32(gram.encode("utf-8"))
+            cached = self._buckets[gram] = (h % self.dimension, 1.0 if (h >> 16) & 1 else -1.0)
+        return cached
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            for token in self._token.findall(text):
+                for gram in (token[i:i + 2] for i in range(max(1, len(token) - 1))):
+                    col, sign = self._bucket(gram)
+                    out[row, col] += sign
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-6)
+
+
+# ---- 구축 ----
+
+def build_store(workdir: str, size: int, dimension: int, seed: int) -> dict:
+    """합성 코퍼스 → faiss_store/(index.faiss, metadata.pkl, recipes/) + SQLite recipe 테이블"""
+    import faiss
+    from app.faiss_index import build_config_from_env, create_index, save_index_params, train_index, train_sample_size
+    from app.recipe_store import store_path_for, write_recipe_store
+    from app.sparse_index import write_sparse_index
+
+    timings = {}
+    store_dir = os.path.join(workdir, "faiss_store")
+    os.makedirs(store_dir, exist_ok=True)
+    index_path = os.path.join(store_dir, "index.faiss")
+    meta_path = os.path.join(store_dir, "metadata.pkl")
+    db_path = os.path.join(workdir, "recipes.db")
+
+    start = time.perf_counter()
+    recipes = generate_recipes(size, seed)
+    timings["generate_s"] = time.perf_counter() - start
+
+    # 빌더와 같은 임베딩 텍스트 / 인덱스 설정 / 학습 샘플링
+    start = time.perf_counter()
+    encoder = HashingEncoder(dimension)
+    texts = [f"이 요리의 재료는 {r['ingredients']}입니다." for r in recipes]
+    config = build_config_from_env(len(texts))
+    index = create_index(dimension, config["factory"])
+    if not index.is_trained:
+        sample_ids = np.random.default_rng(0).choice(len(texts), size=train_sample_size(config, len(texts)), replace=False)
+        train_index(index, encoder.encode([texts[i] for i in sample_ids]))
+    for chunk_start in range(0, len(texts), 10000):
+        index.add(encoder.encode(texts[chunk_start:chunk_start + 10000]))
+    faiss.write_index(index, index_path)
+    save_index_params(index_path, config, index.ntotal)
+    timings["index_build_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(meta_path, "wb") as f:
+        pickle.dump(recipes, f)
+    write_recipe_store(store_path_for(meta_path), recipes, source_path=meta_path)
+    write_sparse_index(index_path, recipes)
+    timings["metadata_write_s"] = time.perf_counter() - start
+
+    # recipe 테이블 대체 (SQLite)
+    start = time.perf_counter()
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE recipe (id INTEGER PRIMARY KEY, title TEXT, ingredients TEXT, content TEXT)")
+        conn.executemany(
+            "INSERT INTO recipe (id, title, ingredients, content) VALUES (?, ?, ?, ?)",
+            ((r["id"], r["title"], r["ingredients"], r["content"]) for r in recipes),
+        )
+    timings["db_load_s"] = time.perf_counter() - start
+
+    return {"factory": config["factory"], "ntotal": int(index.ntotal), **{k: round(v, 3) for k, v in timings.items()}}
+
+
+# ---- 측정 ----
+
+def measure_recall(faiss_search, queries: list, at: int, modes: list) -> list:
+    """재료 재현율@at: 상위 at개 중 사용자 재료를 모두 포함한 레시피 수 / min(at, 코퍼스 전체의 해당 레시피 수)
+
+    modes: (이름, 하이브리드 여부, top_k) 목록
+    """
+    from app.ingredient_index import canonicalize_ingredients
+
+    index = faiss_search.ingredient_index
+    all_rows = np.arange(len(index))
+    has_id = index.recipe_ids != 0
+    relevant = []
+    for ingredients in queries:
+        canonical = canonicalize_ingredients(ingredients)
+        full = index.match_matrix(all_rows, list(canonical)).all(axis=1) & has_id if canonical else has_id & False
+        relevant.append(min(at, int(full.sum())))
+
+    sparse_index = faiss_search.sparse_index
+    reports = []
+    for name, hybrid, top_k in modes:
+        faiss_search.sparse_index = sparse_index if hybrid else None
+        hits, latency = [], []
+        for ingredients, rel in zip(queries, relevant):
+            faiss_search.embedding_cache.clear()
+            faiss_search.result_cache.clear()
+            t0 = time.perf_counter()
+            results = faiss_search.recommend_recipes(ingredients, top_k=top_k, limit=at)
+            latency.append(time.perf_counter() - t0)
+            canonical = canonicalize_ingredients(ingredients)
+            full = sum(1 for r in results if len(r["matched_ingredients"]) == len(canonical))
+            if rel:
+                hits.append(min(full, rel) / rel)
+        reports.append({
+            "mode": name,
+            "top_k": top_k,
+            "recall": round(float(np.mean(hits)), 4) if hits else 0.0,
+            "latency": percentiles(latency),
+        })
+    faiss_search.sparse_index = sparse_index
+    faiss_search.result_cache.clear()
+    return reports
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"n": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    arr = np.asarray(samples) * 1000.0
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+def run_single(args) -> dict:
+    """한 코퍼스 크기에 대해 구축 + 측정 (자식 프로세스에서 실행)"""
+    workdir = os.path.join(args.workdir, f"size_{args.single}")
+    build = build_store(workdir, args.single, args.dimension, args.seed)
+
+    # 서빙 코드가 벤치마크용 저장소 / SQLite / 해싱 인코더를 사용하도록 설정 (app 모듈 import 전에)
+    os.environ["FAISS_STORE_DIR"] = os.path.join(workdir, "faiss_store")
+    os.environ["DB_URL"] = f"sqlite:///{os.path.join(workdir, 'recipes.db')}"
+    from app.metrics import add_stage_observer
+    from app.resources import registry
+
+    encoder = HashingEncoder(args.dimension)
+    registry.register("embedding_model", lambda: encoder)
+
+    stage_samples = {stage: [] for stage in STAGES}
+    add_stage_observer(lambda stage, elapsed: stage_samples.setdefault(stage, []).append(elapsed))
+
+    start = time.perf_counter()
+    import app.faiss_search as faiss_search
+    from app.rag_chain import chain
+    load_s = time.perf_counter() - start
+
+    queries = generate_queries(args.queries, args.seed + 1)
+
+    def clear_caches():
+        if not args.warm_cache:
+            faiss_search.embedding_cache.clear()
+            faiss_search.result_cache.clear()
+
+    # 워밍업 (첫 호출의 지연 초기화 제외)
+    for ingredients in queries[:min(5, len(queries))]:
+        faiss_search.recommend_recipes(ingredients, top_k=args.top_k, limit=args.limit)
+    for samples in stage_samples.values():
+        samples.clear()
+
+    # /recommend 순차 실행
+    recommend_latency = []
+    result_counts = []
+    start = time.perf_counter()
+    for ingredients in queries:
+        clear_caches()
+        t0 = time.perf_counter()
+        results = faiss_search.recommend_recipes(ingredients, top_k=args.top_k, limit=args.limit)
+        recommend_latency.append(time.perf_counter() - t0)
+        result_counts.append(len(results))
+    recommend_wall = time.perf_counter() - start
+
+    # /recommend 동시 실행 (마이크로 배칭 + 전용 실행기 경로)
+    async def concurrent_run():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def one(ingredients):
+            async with semaphore:
+                t0 = time.perf_counter()
+                await faiss_search.recommend_recipes_async(ingredients, top_k=args.top_k, limit=args.limit)
+                latencies.append(time.perf_counter() - t0)
+
+        clear_caches()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(ingredients) for ingredients in queries))
+        return latencies, time.perf_counter() - t0
+
+    faiss_search.inference_executor.max_pending = max(faiss_search.inference_executor.max_pending, len(queries))
+    faiss_search.search_batcher.queue_timeout = 0.0
+    concurrent_latency, concurrent_wall = asyncio.run(concurrent_run())
+
+    # /recommend/stream (NDJSON 경로): 동시 스트림을 청크마다 조금씩 늦게 읽는 클라이언트로 소비
+    expected = [faiss_search.recommend_recipes(ingredients, top_k=args.top_k) for ingredients in queries]
+
+    async def stream_run():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        first_chunk, total, mismatches = [], [], []
+
+        async def one(ingredients, want):
+            async with semaphore:
+                t0 = time.perf_counter()
+                results = []
+                async for chunk in faiss_search.recommend_recipes_stream(ingredients, top_k=args.top_k):
+                    if not results:
+                        first_chunk.append(time.perf_counter() - t0)
+                    results.extend(chunk)
+                    await asyncio.sleep(args.stream_read_delay_ms / 1000.0)
+                total.append(time.perf_counter() - t0)
+                mismatches.append(results != want)
+
+        faiss_search.embedding_cache.clear()
+        faiss_search.result_cache.clear()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(ingredients, want) for ingredients, want in zip(queries, expected)))
+        return first_chunk, total, sum(mismatches), time.perf_counter() - t0
+
+    stream_first, stream_total, stream_mismatches, stream_wall = asyncio.run(stream_run())
+
+    # /recommend/rag 검색 (RAGChain._search_recipes)
+    rag_latency = []
+    start = time.perf_counter()
+    for ingredients in queries:
+        t0 = time.perf_counter()
+        chain._search_recipes(ingredients, top_k=50)
+        rag_latency.append(time.perf_counter() - t0)
+    rag_wall = time.perf_counter() - start
+
+    # 밀집 검색만(top_k, 작은 k) vs 하이브리드(작은 k) 재료 재현율
+    small_k = faiss_search.HYBRID_DENSE_K
+    recall = measure_recall(faiss_search, queries[:args.recall_queries], args.recall_at, [
+        ("dense", False, args.top_k),
+        ("dense", False, small_k),
+        ("hybrid", True, args.top_k),
+    ]) if args.recall_queries and faiss_search.sparse_index is not None else []
+
+    return {
+        "size": args.single,
+        "queries": len(queries),
+        "top_k": args.top_k,
+        "limit": args.limit,
+        "build": build,
+        "load_s": round(load_s, 3),
+        "resources": registry.report(),
+        "recommend": {
+            "latency": percentiles(recommend_latency),
+            "qps": round(len(queries) / recommend_wall, 2),
+            "avg_results": round(float(np.mean(result_counts)), 1) if result_counts else 0.0,
+            "stages": {stage: percentiles(samples) for stage, samples in stage_samples.items()},
+        },
+        "recommend_concurrent": {
+            "concurrency": args.concurrency,
+            "latency": percentiles(concurrent_latency),
+            "qps": round(len(queries) / concurrent_wall, 2),
+            "avg_batch_size": faiss_search.search_batcher.stats()["avg_batch_size"],
+        },
+        "recommend_stream": {
+            "concurrency": args.concurrency,
+            "read_delay_ms": args.stream_read_delay_ms,
+            "first_chunk": percentiles(stream_first),
+            "total": percentiles(stream_total),
+            "qps": round(len(queries) / stream_wall, 2),
+            "mismatches": stream_mismatches,
+        },
+        "rag_search": {
+            "latency": percentiles(rag_latency),
+            "qps": round(len(queries) / rag_wall, 2),
+        },
+        "recall_at": args.recall_at,
+        "recall": recall,
+    }
+
+
+def print_report(report: dict) -> None:
+    rec = report["recommend"]
+    print(f"\n=== {report['size']:,}개 레시피 ({report['build']['factory']}, 쿼리 {report['queries']}개, top_k={report['top_k']}"
+          f"{'' if report.get('limit') is None else ', limit=' + str(report['limit'])}) ===")
+    print(f"구축: 생성 {report['build']['generate_s']}s / 인덱스 {report['build']['index_build_s']}s / "
+          f"메타데이터 {report['build']['metadata_write_s']}s / DB {report['build']['db_load_s']}s, 서빙 로딩 {report['load_s']}s")
+    print(f"{'구간':<26} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'QPS':>10}")
+
+    def row(name, stats, qps=""):
+        print(f"{name:<26} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['p99_ms']:>10.3f} {qps:>10}")
+
+    row("recommend (순차)", rec["latency"], str(rec["qps"]))
+    for stage in STAGES:
+        row(f"  {stage}", rec["stages"].get(stage, percentiles([])))
+    conc = report["recommend_concurrent"]
+    row(f"recommend (동시 {conc['concurrency']})", conc["latency"], str(conc["qps"]))
+    stream = report["recommend_stream"]
+    row(f"stream 첫 청크 (동시 {stream['concurrency']})", stream["first_chunk"])
+    row(f"stream 전체 (동시 {stream['concurrency']})", stream["total"], str(stream["qps"]))
+    row("rag _search_recipes", report["rag_search"]["latency"], str(report["rag_search"]["qps"]))
+    print(f"평균 결과 수 {rec['avg_results']}, 동시 실행 평균 배치 크기 {conc['avg_batch_size']}, "
+          f"stream 결과 불일치 {stream['mismatches']}건 (청크당 읽기 지연 {stream['read_delay_ms']}ms)")
+    if report.get("recall"):
+        print(f"\n{'검색 방식':<26} {'재현율@' + str(report['recall_at']):>10} {'p50 ms':>10} {'p95 ms':>10}")
+        for r in report["recall"]:
+            name = f"{r['mode']} (k={r['top_k']})"
+            print(f"{name:<26} {r['recall']:>10.4f} {r['latency']['p50_ms']:>10.3f} {r['latency']['p95_ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추천 파이프라인 오프라인 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="코퍼스 크기 목록")
+    parser.add_argument("--queries", type=int, default=200, help="측정 쿼리 수")
+    parser.add_argument("--top-k", type=int, default=500, help="FAISS 검색 개수")
+    parser.add_argument("--limit", type=int, default=None, help="결과 수 제한 (적응형 top_k 측정)")
+    parser.add_argument("--recall-queries", type=int, default=50, help="재현율 비교에 쓸 쿼리 수 (0이면 생략)")
+    parser.add_argument("--recall-at", type=int, default=20, help="재현율을 볼 상위 결과 수")
+    parser.add_argument("--dimension", type=int, default=64, help="해싱 인코더 차원")
+    parser.add_argument("--concurrency", type=int, default=16, help="동시 실행 측정의 동시 요청 수")
+    parser.add_argument("--stream-read-delay-ms", type=float, default=1.0, help="스트리밍 측정에서 청크마다 기다릴 시간 (느린 클라이언트)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm-cache", action="store_true", help="쿼리마다 캐시를 비우지 않음")
+    parser.add_argument("--workdir", default=None, help="코퍼스/인덱스 저장 위치 (기본: 임시 디렉터리)")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--fail-p95-ms", type=float, default=None, help="/recommend p95가 이 값을 넘으면 종료 코드 1")
+    parser.add_argument("--single", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_single(args), ensure_ascii=False))
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="recipe-bench-")
+    reports = []
+    for size in args.sizes:
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--single", str(size),
+            "--queries", str(args.queries), "--top-k", str(args.top_k), "--dimension", str(args.dimension),
+            "--concurrency", str(args.concurrency), "--seed", str(args.seed), "--workdir", workdir,
+            "--stream-read-delay-ms", str(args.stream_read_delay_ms),
+            "--recall-queries", str(args.recall_queries), "--recall-at", str(args.recall_at),
+        ] + (["--warm-cache"] if args.warm_cache else []) + (["--limit", str(args.limit)] if args.limit else [])
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        report = json.loads(proc.stdout.decode("utf-8").strip().splitlines()[-1])
+        print_report(report)
+        reports.append(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+    if args.fail_p95_ms is not None:
+        slow = [r for r in reports if r["recommend"]["latency"]["p95_ms"] > args.fail_p95_ms]
+        if slow:
+            print(f"\n❌ /recommend p95 기준 초과 ({args.fail_p95_ms} ms): " + ", ".join(str(r["size"]) for r in slow))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,25 @@ import os, pickle
 from tqdm import tqdm
 import torch
 import gc
+from app.faiss_index import (
+    build_config_from_env,
+    create_index,
+    embeddings_path,
+    save_index_params,
+    train_index,
+    train_sample_size,
+)
+from app.recipe_store import store_path_for, write_recipe_store
+from app.sparse_index import write_sparse_index
 
 # 설정
 CHUNK_SIZE = 1000
 INDEX_SAVE_PATH = "faiss_store/index.faiss"
 META_SAVE_PATH = "faiss_store/metadata.pkl"
 LAST_PROCESSED_PATH = "faiss_store/last_processed.txt"
+# 압축 인덱스 평가(evaluate_index.py)용 원본 벡터 저장 여부
+SAVE_EMBEDDINGS = os.getenv("FAISS_SAVE_EMBEDDINGS", "0") == "1"
+EMBEDDINGS_SAVE_PATH = embeddings_path(INDEX_SAVE_PATH)
 JSON_FILE_PATH = "recipes_fixed.json"
 
 # 로깅 설정
@@ -55,9 +68,22 @@ try:
     else:
         last_processed = 0
 
-    # 인덱스 초기화
-    logger.info("📁 새로운 FAISS 인덱스 생성")
-    index = faiss.IndexFlatL2(dimension)
+    if SAVE_EMBEDDINGS and last_processed == 0 and os.path.exists(EMBEDDINGS_SAVE_PATH):
+        os.remove(EMBEDDINGS_SAVE_PATH)
+
+    # 인덱스 초기화 (FAISS_INDEX_TYPE: flat / ivf / hnsw, 또는 FAISS_INDEX_FACTORY)
+    config = build_config_from_env(len(texts))
+    logger.info(f"📁 새로운 FAISS 인덱스 생성: {config['factory']}")
+    index = create_index(dimension, config["factory"])
+
+    # IVF 등 학습이 필요한 인덱스는 샘플 임베딩으로 먼저 학습
+    if not index.is_trained:
+        sample_size = train_sample_size(config, len(texts))
+        sample_ids = np.random.default_rng(0).choice(len(texts), size=sample_size, replace=False)
+        sample = model.encode([texts[i] for i in sample_ids], show_progress_bar=True)
+        train_index(index, sample)
+        del sample
+        gc.collect()
 
     # 벡터화 및 저장 루프
     for start in range(last_processed, len(texts), CHUNK_SIZE):
@@ -93,9 +119,15 @@ try:
             index.add(np.array(emb_chunk))
             metadata.extend(filtered_ids)
 
+            if SAVE_EMBEDDINGS:
+                os.makedirs(os.path.dirname(EMBEDDINGS_SAVE_PATH), exist_ok=True)
+                with open(EMBEDDINGS_SAVE_PATH, "ab") as f:
+                    f.write(np.ascontiguousarray(emb_chunk, dtype="float32").tobytes())
+
             # 저장
             os.makedirs(os.path.dirname(INDEX_SAVE_PATH), exist_ok=True)
             faiss.write_index(index, INDEX_SAVE_PATH)
+            save_index_params(INDEX_SAVE_PATH, config, index.ntotal)
             with open(META_SAVE_PATH, "wb") as f:
                 pickle.dump(metadata, f)
             with open(LAST_PROCESSED_PATH, "w") as f:
@@ -109,7 +141,21 @@ try:
             logger.exception(f"❗ 오류 발생: {start}-{end} 구간 → {str(e)}")
             break
 
+    # 서빙용 컬럼형 메타데이터 (mmap으로 열어 워커 간 공유, content는 zlib 압축)
+    write_recipe_store(
+        store_path_for(META_SAVE_PATH),
+        metadata,
+        compress_content=os.getenv("RECIPE_STORE_COMPRESS", "1") == "1",
+        source_path=META_SAVE_PATH,
+    )
+    logger.info(f"📚 컬럼형 메타데이터 저장: {store_path_for(META_SAVE_PATH)}")
+    # 하이브리드 검색용 재료 BM25 인덱스 (index.faiss 옆)
+    logger.info(f"🔤 재료 BM25 인덱스 저장: {write_sparse_index(INDEX_SAVE_PATH, metadata)}")
+
     logger.info("✅ 전체 임베딩 및 저장 완료!")
+    if os.path.exists(INDEX_SAVE_PATH) and index.ntotal:
+        index_bytes = os.path.getsize(INDEX_SAVE_PATH)
+        logger.info(f"💾 인덱스 크기: {index_bytes / (1024*1024):.1f} MB (벡터당 {index_bytes / index.ntotal:.0f} bytes, {config['factory']})")
 
 except Exception as e:
     logger.exception(f"❗ 치명적 오류 발생: {str(e)}")
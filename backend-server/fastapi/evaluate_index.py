@@ -0,0 +1,110 @@
+"""
+압축 인덱스 평가 리포트
+빌드 시 저장한 원본 임베딩(FAISS_SAVE_EMBEDDINGS=1 → faiss_store/embeddings.f32)으로
+전수 검색(Flat) 기준 대비 각 인덱스의 메모리 사용량과 recall@k를 비교한다.
+
+사용 예:
+    python evaluate_index.py
+    python evaluate_index.py --factories SQfp16 SQ8 PQ64 "PQ64,RFlat" "IVF1024,PQ64" --k 10 50
+    python evaluate_index.py --index faiss_store/index.faiss   # 현재 서빙 중인 인덱스 평가
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import faiss
+import numpy as np
+
+from app.faiss_index import (
+    apply_search_params,
+    create_index,
+    embeddings_path,
+    index_memory_bytes,
+    load_index,
+    recall_at_k,
+    train_index,
+)
+
+INDEX_SAVE_PATH = "faiss_store/index.faiss"
+DEFAULT_FACTORIES = ["SQfp16", "SQ8", "PQ64", "PQ64,RFlat", "PQ64,Refine(SQfp16)"]
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_embeddings(path: str, dimension: int) -> np.ndarray:
+    """embeddings.f32 (float32 원시 배열)을 mmap으로 읽기"""
+    vectors = np.memmap(path, dtype="float32", mode="r")
+    return vectors.reshape(-1, dimension)
+
+
+def evaluate(name: str, index: faiss.Index, queries: np.ndarray, exact_ids: np.ndarray, ks: list, n_vectors: int) -> dict:
+    """인덱스 하나의 메모리/지연/recall@k 측정"""
+    start = time.perf_counter()
+    _, ids = index.search(queries, max(ks))
+    elapsed = time.perf_counter() - start
+    memory = index_memory_bytes(index)
+    return {
+        "name": name,
+        "memory_mb": memory / (1024 * 1024),
+        "bytes_per_vector": memory / max(n_vectors, 1),
+        "ms_per_query": elapsed * 1000 / len(queries),
+        "recall": {k: recall_at_k(ids, exact_ids, k) for k in ks},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS 압축 인덱스 메모리/recall@k 리포트")
+    parser.add_argument("--embeddings", default=embeddings_path(INDEX_SAVE_PATH))
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--factories", nargs="+", default=DEFAULT_FACTORIES, help="비교할 factory 문자열 목록")
+    parser.add_argument("--index", help="이미 빌드된 인덱스 파일도 함께 평가")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--train-size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.embeddings):
+        raise SystemExit(f"임베딩 파일이 없습니다: {args.embeddings} (FAISS_SAVE_EMBEDDINGS=1 로 빌드하세요)")
+
+    vectors = load_embeddings(args.embeddings, args.dimension)
+    n_vectors = len(vectors)
+    rng = np.random.default_rng(args.seed)
+    queries = np.ascontiguousarray(vectors[rng.choice(n_vectors, size=min(args.queries, n_vectors), replace=False)])
+    logger.info(f"📊 벡터 {n_vectors}개, 쿼리 {len(queries)}개, k={args.k}")
+
+    # 기준: 전수 검색
+    baseline = faiss.IndexFlatL2(args.dimension)
+    baseline.add(np.ascontiguousarray(vectors))
+    _, exact_ids = baseline.search(queries, max(args.k))
+    reports = [evaluate("Flat (baseline)", baseline, queries, exact_ids, args.k, n_vectors)]
+    del baseline
+
+    train = np.ascontiguousarray(vectors[rng.choice(n_vectors, size=min(args.train_size, n_vectors), replace=False)])
+
+    for factory in args.factories:
+        logger.info(f"🔧 빌드: {factory}")
+        index = create_index(args.dimension, factory)
+        train_index(index, train)
+        for start in range(0, n_vectors, 100000):
+            index.add(np.ascontiguousarray(vectors[start:start + 100000]))
+        apply_search_params(index, {"nprobe": 32, "efSearch": 128, "k_factor": 4})
+        reports.append(evaluate(factory, index, queries, exact_ids, args.k, n_vectors))
+        del index
+
+    if args.index:
+        reports.append(evaluate(f"{args.index} (serving)", load_index(args.index), queries, exact_ids, args.k, n_vectors))
+
+    header = f"{'index':<32} {'memory MB':>10} {'B/vector':>9} {'ms/query':>9} " + " ".join(f"{f'recall@{k}':>10}" for k in args.k)
+    print(header)
+    print("-" * len(header))
+    for r in reports:
+        recalls = " ".join(f"{r['recall'][k]:>10.4f}" for k in args.k)
+        print(f"{r['name']:<32} {r['memory_mb']:>10.1f} {r['bytes_per_vector']:>9.0f} {r['ms_per_query']:>9.3f} {recalls}")
+
+
+if __name__ == "__main__":
+    main()
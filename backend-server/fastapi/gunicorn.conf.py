@@ -0,0 +1,74 @@
+"""
+gunicorn 멀티 워커 실행 설정 (pre-fork + copy-on-write 공유)
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+워커가 2개 이상이면 마스터 프로세스가 app.main을 먼저 import(preload)하므로 임베딩 모델,
+FAISS 인덱스, 레시피 메타데이터가 fork 이전에 한 번만 로드되고, 워커들은 같은 메모리 페이지를
+copy-on-write로 공유한다. 워커별 메모리는 measure_worker_memory.py로 확인한다.
+
+워커가 1개이면 preload하지 않는다. 마스터가 GPU 인코더를 올려 CUDA를 초기화한 뒤 fork하면
+워커에서 CUDA를 쓸 수 없기 때문이다 ("Cannot re-initialize CUDA in forked subprocess").
+"""
+
+import gc
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# 공유할 워커가 없으면 preload 이점이 없고, 워커에서 GPU를 쓸 수 있도록 마스터에서 아무것도 로드하지 않는다
+# (GUNICORN_PRELOAD=0/1로 강제, 예: preload 유무별 메모리 비교)
+preload_app = os.getenv("GUNICORN_PRELOAD", "1" if workers > 1 else "0") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# 워커당 연산 스레드 수 (코어 수 / 워커 수, 과도한 스레드 경합 방지)
+threads_per_worker = int(os.getenv("WORKER_NUM_THREADS", "0")) or max(1, (os.cpu_count() or 1) // max(workers, 1))
+
+if workers > 1:
+    # CUDA 컨텍스트는 fork 후 자식에서 사용할 수 없으므로 공유 인코더는 CPU에 올린다
+    os.environ.setdefault("EMBEDDING_DEVICE", "cpu")
+    # 인덱스 파일을 mmap으로 열어 페이지 캐시를 워커 간 공유
+    os.environ.setdefault("FAISS_MMAP", "1")
+
+
+def when_ready(server):
+    if not preload_app:
+        server.log.info(f"워커 {workers}개 시작 (preload 없음, 워커당 스레드 {threads_per_worker})")
+        return
+
+    # 마스터에서 CUDA가 초기화되었으면 fork된 워커는 GPU를 쓸 수 없다 (LLM 로드 / GPU 인코딩 실패)
+    import torch
+
+    if torch.cuda.is_initialized():
+        raise RuntimeError(
+            "preload 중 마스터 프로세스에서 CUDA가 초기화되었습니다. "
+            "멀티 워커에서는 EMBEDDING_DEVICE=cpu로 실행하거나 WEB_CONCURRENCY=1로 실행하세요."
+        )
+
+    # preload로 만들어진 객체를 GC 추적 대상에서 제외 → fork 후 GC가 객체 헤더를 건드려 페이지가 복사되는 것 방지
+    gc.freeze()
+    server.log.info(f"리소스 preload 완료, 워커 {workers}개 시작 (워커당 스레드 {threads_per_worker})")
+
+
+def post_fork(server, worker):
+    import faiss
+    import torch
+
+    torch.set_num_threads(threads_per_worker)
+    faiss.omp_set_num_threads(threads_per_worker)
+
+    # 부모에서 만들어진 DB 커넥션 풀을 워커에서 공유하지 않도록 새로 시작
+    from app.db import engine
+
+    engine.dispose()
+
+
+def child_exit(server, worker):
+    # 멀티 프로세스 Prometheus 메트릭: 종료된 워커의 gauge 파일 정리
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,86 @@
+"""
+gunicorn 마스터/워커 프로세스별 메모리 측정 (Linux /proc/<pid>/smaps_rollup)
+
+    python measure_worker_memory.py              # gunicorn 마스터 자동 탐색
+    python measure_worker_memory.py --pid 1234   # 마스터 pid 지정
+
+RSS는 공유 페이지를 프로세스마다 중복해서 세므로 워커 수만큼 더하면 실제보다 커진다.
+PSS(공유 페이지를 공유 프로세스 수로 나눈 값)의 합이 실제 총 메모리 사용량이다.
+"""
+
+import argparse
+import os
+import sys
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_rollup(pid: int) -> dict:
+    """smaps_rollup 항목(kB)을 읽음"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in FIELDS:
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+
+
+def cmdline(pid: int) -> str:
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+
+
+def children(pid: int) -> list:
+    path = f"/proc/{pid}/task/{pid}/children"
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [int(p) for p in f.read().split()]
+
+
+def find_master() -> int:
+    """부모가 gunicorn이 아닌 gunicorn 프로세스"""
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            if "gunicorn" not in cmdline(pid):
+                continue
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            if "gunicorn" not in cmdline(ppid):
+                return pid
+        except (OSError, IndexError, ValueError):
+            continue
+    raise SystemExit("gunicorn 마스터 프로세스를 찾을 수 없습니다 (--pid 지정)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gunicorn 워커별 RSS/PSS 측정")
+    parser.add_argument("--pid", type=int, help="gunicorn 마스터 pid")
+    args = parser.parse_args()
+
+    master = args.pid or find_master()
+    pids = [master] + children(master)
+
+    print(f"{'pid':>8} {'role':>7} " + " ".join(f"{name:>14}" for name in FIELDS))
+    totals = dict.fromkeys(FIELDS, 0)
+    for pid in pids:
+        try:
+            values = read_rollup(pid)
+        except OSError as e:
+            print(f"{pid:>8} 측정 실패: {e}", file=sys.stderr)
+            continue
+        role = "master" if pid == master else "worker"
+        print(f"{pid:>8} {role:>7} " + " ".join(f"{values.get(name, 0) / 1024:>11.1f} MB" for name in FIELDS))
+        for name in FIELDS:
+            totals[name] += values.get(name, 0)
+
+    print(f"{'':>8} {'total':>7} " + " ".join(f"{totals[name] / 1024:>11.1f} MB" for name in FIELDS))
+    print(f"\n워커 {len(pids) - 1}개, 실제 총 사용량(PSS 합) {totals['Pss'] / 1024:.1f} MB / RSS 합 {totals['Rss'] / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+MicroBatcher 테스트
+
+동시 요청이 배치 크기/대기 시간 기준으로 묶이는지, 배치 처리 오류가
+기다리던 요청 각각에 전달되는지 확인한다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.batcher import MicroBatcher
+from app.inference import OverloadedError
+
+
+class RecordingBatch:
+    """받은 배치를 기록하고 항목별 결과(항목 * 10)를 돌려주는 처리 함수"""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        time.sleep(self.delay)
+        return [item * 10 for item in items]
+
+
+def test_batches_by_max_batch_size():
+    process = RecordingBatch()
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert asyncio.run(main()) == [i * 10 for i in range(10)]
+    # 한꺼번에 들어온 10개는 대기 없이 4, 4, 2로 나뉜다 (제출 순서 유지)
+    assert process.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert batcher.stats()["max_seen_batch"] == 4
+
+
+def test_batches_by_max_wait():
+    process = RecordingBatch()
+    batcher = MicroBatcher(process, max_batch_size=32, max_wait_ms=50)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.01)  # 대기 창 안에 도착 → 같은 배치
+        second = asyncio.ensure_future(batcher.submit(2))
+        results = await asyncio.gather(first, second)
+        late = await batcher.submit(3)  # 창이 닫힌 뒤 → 새 배치
+        return results + [late]
+
+    assert asyncio.run(main()) == [10, 20, 30]
+    assert process.batches == [[1, 2], [3]]
+
+
+def test_error_propagates_to_every_waiting_future():
+    calls = []
+
+    def failing(items):
+        calls.append(list(items))
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(failing, max_batch_size=8, max_wait_ms=10)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert calls == [[0, 1, 2]]
+    assert all(isinstance(r, ValueError) and str(r) == "boom" for r in results)
+
+
+def test_worker_keeps_serving_after_a_failed_batch():
+    calls = []
+
+    def flaky(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            raise RuntimeError("first batch fails")
+        return [item + 1 for item in items]
+
+    batcher = MicroBatcher(flaky, max_batch_size=8, max_wait_ms=0)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await batcher.submit(1)
+        return await batcher.submit(1)
+
+    assert asyncio.run(main()) == 2
+
+
+def test_queue_timeout_fails_expired_requests_without_running_them():
+    process = RecordingBatch(delay=0.05)
+    batcher = MicroBatcher(process, max_batch_size=1, max_wait_ms=0, queue_timeout_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    # 첫 배치가 50ms 걸리는 동안 뒤의 요청은 20ms 대기 상한을 넘긴다
+    assert results[0] == 0
+    assert all(isinstance(r, OverloadedError) for r in results[1:])
+    assert process.batches == [[0]]
+    assert batcher.stats()["timed_out"] == 2
@@ -0,0 +1,99 @@
+"""
+LRU 캐시와 정규화된 재료 키 테스트
+
+항목 수/바이트 상한 제거, TTL 만료, 그리고 재료 집합 정규화(중복 제거)가
+매칭 점수 분모를 바꾸는 동작을 확인한다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import numpy as np
+
+from app import cache
+from app.cache import LRUCache
+from app.ingredient_index import IngredientIndex, canonicalize_ingredients, extract_name
+
+
+def test_evicts_least_recently_used_entry_over_max_entries():
+    lru = LRUCache(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # a가 가장 최근 사용이 됨
+    lru.put("c", 3)
+
+    assert "b" not in lru
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.stats()["evictions"] == 1
+
+
+def test_evicts_until_under_max_bytes():
+    lru = LRUCache(max_entries=100, max_bytes=100, sizeof=len)
+    lru.put("a", "x" * 40)
+    lru.put("b", "x" * 40)
+    lru.put("c", "x" * 40)  # 120바이트 → 가장 오래된 a 제거
+
+    assert "a" not in lru
+    assert len(lru) == 2 and lru.stats()["bytes"] == 80
+
+    lru.put("b", "x" * 10)  # 같은 키 갱신은 이전 크기를 빼고 다시 계산
+    assert lru.stats()["bytes"] == 50
+
+
+def test_skips_value_larger_than_max_bytes():
+    lru = LRUCache(max_bytes=100, sizeof=len)
+    lru.put("small", "x" * 10)
+    lru.put("huge", "x" * 200)
+
+    assert "huge" not in lru
+    assert lru.get("small") == "x" * 10  # 큰 값 때문에 기존 항목이 밀려나지 않음
+
+
+def test_numpy_values_are_sized_by_nbytes():
+    lru = LRUCache(max_bytes=1000)
+    lru.put("emb", np.zeros(100, dtype=np.float32))
+    assert lru.stats()["bytes"] == 400
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = LRUCache(ttl=10)
+    lru.put("a", 1)
+    lru.put("b", 2, ttl=100)  # 항목별 TTL이 기본값보다 우선
+
+    now[0] += 9
+    assert lru.get("a") == 1
+    now[0] += 1
+    assert lru.get("a") is None
+    assert lru.get("b") == 2
+
+    stats = lru.stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_canonical_key_ignores_order_synonyms_and_duplicates():
+    key = canonicalize_ingredients(["양파", "계란", "양파"])
+    assert key == canonicalize_ingredients(["달걀", "양파"])
+    assert key == canonicalize_ingredients(["적양파", "달걀"])
+    assert key == ("달걀", "양파")
+
+    lru = LRUCache()
+    lru.put(key, "embedding")
+    assert lru.get(canonicalize_ingredients(["양파", "달걀"])) == "embedding"
+
+
+def test_canonical_key_changes_match_score_for_duplicate_inputs():
+    """중복 재료는 한 번만 세므로 기존 방식(입력 그대로)과 매칭 점수 분모가 달라진다"""
+    index = IngredientIndex([{"id": 1, "ingredients": "양파, 소금"}], extract_name)
+    user_ingredients = ["양파", "양파", "감자"]
+
+    canonical = list(canonicalize_ingredients(user_ingredients))
+    n_matched = index.match_matrix(np.array([0]), canonical).sum(axis=1)
+    assert canonical == ["감자", "양파"]
+    assert (n_matched / len(canonical))[0] == 0.5
+
+    # 기존 루프: 정제만 하고 중복은 그대로 두어 양파가 두 번 매칭됨 (2/3)
+    raw = [extract_name(i) for i in user_ingredients]
+    legacy = index.match_matrix(np.array([0]), raw).sum(axis=1) / len(raw)
+    assert legacy[0] == 2 / 3
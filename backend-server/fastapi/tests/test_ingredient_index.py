@@ -0,0 +1,175 @@
+"""
+재료 인덱스 매칭 테스트
+
+IngredientIndex.match_matrix가 기존 파이썬 루프(`u and r and (u in r or r in u)`)와,
+RAG 역색인(IngredientPostings.match_counts + argpartition 상위 선택)이 기존 부분 문자열 전체 스캔과
+같은 결과를 내는지 무작위 입력과 경계 입력으로 확인한다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from app.ingredient_index import IngredientIndex, IngredientPostings, extract_name
+from app.rag_chain import RAGChain
+
+# 부분 문자열이 자주 겹치도록 짧은 음절 조합으로 재료 이름을 만든다
+SYLLABLES = ["가", "나", "다", "라", "a", "b"]
+
+
+def _random_name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+
+
+def _random_recipes(rng, n):
+    recipes = []
+    for i in range(n):
+        names = [_random_name(rng) for _ in range(rng.randint(0, 6))]
+        if names and rng.random() < 0.3:
+            names.append(names[0])  # 레시피 안의 중복 재료
+        recipes.append({"id": i + 1, "ingredients": ", ".join(names)})
+    return recipes
+
+
+def _reference_matrix(recipes, rows, user_clean):
+    """기존 추천 루프와 같은 방식의 매칭"""
+    expected = np.zeros((len(rows), len(user_clean)), dtype=bool)
+    for i, row in enumerate(rows):
+        raw = (recipes[row].get("ingredients") or "").replace(" ", "")
+        recipe_clean = [extract_name(t) for t in filter(None, raw.split(","))]
+        for j, u in enumerate(user_clean):
+            expected[i, j] = any(u and r and (u in r or r in u) for r in recipe_clean)
+    return expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_match_matrix_matches_reference_loop_on_random_inputs(seed):
+    rng = random.Random(seed)
+    recipes = _random_recipes(rng, 200)
+    index = IngredientIndex(recipes, extract_name)
+
+    for _ in range(20):
+        rows = np.array(rng.sample(range(len(recipes)), rng.randint(1, 50)))
+        user_clean = [extract_name(_random_name(rng)) for _ in range(rng.randint(1, 5))]
+        np.testing.assert_array_equal(
+            index.match_matrix(rows, user_clean),
+            _reference_matrix(recipes, rows, user_clean),
+        )
+
+
+def test_match_matrix_edge_inputs():
+    recipes = [
+        {"id": 1, "ingredients": ""},  # 재료 없음
+        {"id": 2, "ingredients": "가나다, 가나다, 나"},  # 중복 재료
+        {"id": 3, "ingredients": "가나, 나다"},  # 서로 겹치는 부분 문자열
+        {"id": 4},  # ingredients 키 없음
+        {"id": 5, "ingredients": ",,다,"},  # 빈 조각
+    ]
+    index = IngredientIndex(recipes, extract_name)
+    rows = np.arange(len(recipes))
+    cases = [
+        ["가나다"],
+        ["가나", "나다", "나"],
+        ["나", "나"],  # 중복 사용자 재료
+        [""],  # 빈 문자열은 어떤 재료와도 매칭되지 않음
+        ["", "다"],
+        ["가나다라마"],  # 레시피 재료가 사용자 재료의 부분 문자열 (r in u)
+        ["없는재료"],
+    ]
+    for user_clean in cases:
+        np.testing.assert_array_equal(
+            index.match_matrix(rows, user_clean),
+            _reference_matrix(recipes, rows, user_clean),
+        )
+
+
+def test_match_matrix_empty_rows_and_terms():
+    index = IngredientIndex([{"id": 1, "ingredients": "가"}], extract_name)
+    assert index.match_matrix(np.array([], dtype=np.int64), ["가"]).shape == (0, 1)
+    assert index.match_matrix(np.array([0]), []).shape == (1, 0)
+
+
+# RAG 역색인 (IngredientPostings)
+
+def _random_rag_recipes(rng, n):
+    """정제하지 않은 재료 문자열 (앞 공백, 대문자, 분량 포함)"""
+    recipes = []
+    for i in range(n):
+        pieces = [
+            rng.choice(["", " "]) + _random_name(rng) + rng.choice(["", "A", " 1큰술"])
+            for _ in range(rng.randint(0, 5))
+        ]
+        recipes.append({"id": i + 1, "title": f"레시피{i}", "ingredients": ",".join(pieces), "content": ""})
+    return recipes
+
+
+def _scan_counts(recipes, user_terms):
+    """기존 RAG 검색 루프: 레시피 재료 문자열 전체에 대한 부분 문자열 검사"""
+    counts = np.zeros(len(recipes), dtype=np.int64)
+    for row, recipe in enumerate(recipes):
+        text = recipe["ingredients"].lower()
+        counts[row] = sum(u in text for u in user_terms)
+    return counts
+
+
+def _scan_top(recipes, user_terms, top_k):
+    """기존 RAG 검색 순서: 매칭 수 내림차순 안정 정렬 후 상위 top_k개 행"""
+    counts = _scan_counts(recipes, user_terms)
+    rows = [row for row in range(len(recipes)) if counts[row] > 0]
+    rows.sort(key=lambda row: counts[row], reverse=True)
+    return rows[:top_k]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_postings_match_counts_matches_substring_scan(seed):
+    rng = random.Random(seed)
+    recipes = _random_rag_recipes(rng, 300)
+    postings = IngredientPostings(recipes)
+
+    for _ in range(20):
+        user_terms = [_random_name(rng).lower() for _ in range(rng.randint(1, 4))]
+        rows, counts, per_term = postings.match_counts(user_terms)
+
+        expected = _scan_counts(recipes, user_terms)
+        np.testing.assert_array_equal(rows, np.flatnonzero(expected))
+        np.testing.assert_array_equal(counts, expected[expected > 0])
+        for u, term_rows in zip(user_terms, per_term):
+            expected_rows = [r for r, doc in enumerate(recipes) if u in doc["ingredients"].lower()]
+            np.testing.assert_array_equal(term_rows, expected_rows)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rag_top_k_selection_matches_substring_scan(seed):
+    rng = random.Random(seed)
+    recipes = _random_rag_recipes(rng, 300)
+    chain = RAGChain.__new__(RAGChain)
+    chain.all_recipes = recipes
+    chain.postings = IngredientPostings(recipes)
+
+    for _ in range(20):
+        ingredients = [_random_name(rng).upper() for _ in range(rng.randint(1, 4))]
+        top_k = rng.choice([0, 1, 5, 50, 1000])
+        expected = _scan_top(recipes, [i.lower() for i in ingredients], top_k)
+
+        results = chain._search_recipes(ingredients, top_k=top_k)
+        assert [r["title"] for r in results] == [recipes[row]["title"] for row in expected]
+        for result, row in zip(results, expected):
+            text = recipes[row]["ingredients"].lower()
+            assert result["matched_ingredients"] == [i for i in ingredients if i.lower() in text]
+            assert result["score"] == len(result["matched_ingredients"])
+
+
+def test_postings_edge_terms():
+    recipes = [
+        {"ingredients": "간장,진간장"},
+        {"ingredients": "간장, 설탕"},
+        {"ingredients": ""},
+        {"ingredients": None},
+    ]
+    postings = IngredientPostings(recipes)
+    for user_term in ["간장", "장,진", ", 설", "", "설탕", "없음", "간장간장"]:
+        text_rows = [r for r, doc in enumerate(recipes) if user_term in (doc["ingredients"] or "").lower()]
+        np.testing.assert_array_equal(postings.rows_for(user_term), text_rows)
@@ -0,0 +1,107 @@
+"""
+LLM 공통 프롬프트 앞부분(KV 캐시) 매칭 테스트
+
+모델 없이 문자 단위 토크나이저로 HuggingFaceLLMService의 프롬프트 구성만 확인한다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import pytest
+
+pytest.importorskip("transformers")
+
+from app.llm_service import _PREFIX_SENTINEL, HuggingFaceLLMService
+from app.prompts import COOK_CHAT_SYSTEM_MESSAGE, DEFAULT_SYSTEM_MESSAGE
+
+
+class CharTokenizer:
+    """문자 하나를 토큰 하나로 보는 Llama 3 형식 채팅 템플릿 토크나이저"""
+
+    chat_template = "llama3"
+    pad_token_id = 0
+    eos_token_id = 0
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        text = "<|begin_of_text|>"
+        for message in messages:
+            text += f"<|start_header_id|>{message['role']}<|end_header_id|>\n\n{message['content']}<|eot_id|>"
+        if add_generation_prompt:
+            text += "<|start_header_id|>assistant<|end_header_id|>\n\n"
+        return text
+
+    def __call__(self, text, add_special_tokens=True, **kwargs):
+        return {"input_ids": [ord(c) for c in text]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(i) for i in ids)
+
+
+class FinishedRequest:
+    def result(self):
+        return [ord(c) for c in "네"]
+
+
+class RecordingScheduler:
+    """제출된 요청의 (입력 토큰, 재사용 앞부분 길이)를 기록"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, input_ids, prefix_len=0, **kwargs):
+        self.submitted.append((input_ids, prefix_len))
+        return FinishedRequest()
+
+
+@pytest.fixture
+def service():
+    llm = HuggingFaceLLMService.__new__(HuggingFaceLLMService)
+    llm.tokenizer = CharTokenizer()
+    llm.model = object()
+    llm.pipeline = object()
+    llm.scheduler = RecordingScheduler()
+    llm.is_instruct_model = True
+    llm._prefix_ids = {}
+    return llm
+
+
+def _prefix_ids(llm, system_message):
+    """시스템 메시지까지의 채팅 템플릿 앞부분 토큰 (스케줄러가 KV 캐시를 재사용하는 범위)"""
+    text = llm._format_messages([
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": _PREFIX_SENTINEL},
+    ])
+    return llm._prefix_token_ids(text[:text.index(_PREFIX_SENTINEL)])
+
+
+def test_chat_reuses_cook_chat_prefix(service):
+    messages = [
+        {"role": "system", "content": COOK_CHAT_SYSTEM_MESSAGE},
+        {"role": "user", "content": "김치찌개 끓이는 법 알려줘"},
+    ]
+    assert service.chat(messages, max_length=64) == "네"
+
+    input_ids, prefix_len = service.scheduler.submitted[-1]
+    expected = _prefix_ids(service, COOK_CHAT_SYSTEM_MESSAGE)
+    # 기본 시스템 메시지로 다시 감싸지 않으므로 채팅 템플릿 그대로 제출되고, 요리 채팅 앞부분 전체가 재사용된다
+    assert "".join(chr(i) for i in input_ids) == service._format_messages(messages)
+    assert prefix_len == len(expected)
+    assert input_ids[:prefix_len] == expected
+
+
+def test_chat_stream_reuses_cook_chat_prefix(service):
+    messages = [
+        {"role": "system", "content": COOK_CHAT_SYSTEM_MESSAGE},
+        {"role": "user", "content": "간장 대신 뭘 넣을까?"},
+    ]
+    service._stream_request = lambda request: iter(())
+    list(service.chat_stream(messages, max_length=64))
+
+    _, prefix_len = service.scheduler.submitted[-1]
+    assert prefix_len == len(_prefix_ids(service, COOK_CHAT_SYSTEM_MESSAGE))
+
+
+def test_generate_reuses_default_prefix(service):
+    service.generate("된장국이 짜요", max_length=64)
+
+    _, prefix_len = service.scheduler.submitted[-1]
+    assert prefix_len == len(_prefix_ids(service, DEFAULT_SYSTEM_MESSAGE))
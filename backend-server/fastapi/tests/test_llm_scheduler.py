@@ -0,0 +1,126 @@
+"""
+연속 배칭 스케줄러 테스트
+
+무작위 가중치의 작은 Llama 모델로, 스케줄러의 greedy 결과가 요청마다 따로 돌린
+model.generate(do_sample=False)와 같은지 확인한다. 길이가 다른 프롬프트, 공통 앞부분
+KV 캐시를 쓰는 요청과 쓰지 않는 요청, 실행 중인 배치에 나중에 합류하는 요청을 섞는다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import random
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app.llm_scheduler import ContinuousBatchScheduler
+
+EOS = 0
+MAX_LENGTH = 40
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=96,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=128,
+        bos_token_id=1,
+        eos_token_id=EOS,
+        pad_token_id=EOS,
+    )
+    # float64: 패딩/배치 구성이 달라도 argmax가 뒤집히지 않도록
+    return transformers.LlamaForCausalLM(config).to(torch.float64).eval()
+
+
+@pytest.fixture
+def scheduler(model):
+    scheduler = ContinuousBatchScheduler(model, eos_token_ids=[EOS], max_batch_size=3, prefix_cache_size=4)
+    yield scheduler
+    scheduler.close()
+
+
+def _greedy(model, input_ids):
+    """요청 하나를 model.generate로 greedy 생성 (EOS 전까지의 새 토큰)"""
+    with torch.inference_mode():
+        output = model.generate(
+            torch.tensor([input_ids]),
+            attention_mask=torch.ones(1, len(input_ids), dtype=torch.long),
+            max_length=MAX_LENGTH,
+            do_sample=False,
+            eos_token_id=EOS,
+            pad_token_id=EOS,
+        )
+    generated = output[0, len(input_ids):].tolist()
+    return generated[:generated.index(EOS)] if EOS in generated else generated
+
+
+def _prompts(rng, prefix, n):
+    return [prefix + [rng.randrange(2, 96) for _ in range(rng.randint(1, 12))] for _ in range(n)]
+
+
+def _submit(scheduler, input_ids, prefix_len):
+    return scheduler.submit(input_ids, max_length=MAX_LENGTH, temperature=0.0, repetition_penalty=1.0,
+                            prefix_len=prefix_len)
+
+
+def test_batched_greedy_matches_generate(model, scheduler):
+    rng = random.Random(0)
+    prefix = [1] + [rng.randrange(2, 96) for _ in range(7)]
+    prompts = _prompts(rng, prefix, 6) + _prompts(rng, [1], 3)
+    # 같은 앞부분을 가진 요청도 절반은 앞부분 캐시 없이 제출
+    prefix_lens = [len(prefix) if i % 2 == 0 and i < 6 else 0 for i in range(len(prompts))]
+
+    requests = [_submit(scheduler, ids, p) for ids, p in zip(prompts, prefix_lens)]
+    results = [r.result(timeout=60) for r in requests]
+
+    for ids, result in zip(prompts, results):
+        assert result == _greedy(model, ids)
+    assert any(len(result) > 5 for result in results)
+    stats = scheduler.stats()
+    assert stats["prefix_cache"]["hits"] + stats["prefix_cache"]["misses"] > 0
+    assert stats["avg_batch_size"] > 1
+
+
+def test_requests_joining_a_running_batch_match_generate(model, scheduler):
+    rng = random.Random(1)
+    prefix = [1] + [rng.randrange(2, 96) for _ in range(5)]
+    first = _prompts(rng, prefix, 2)
+    later = _prompts(rng, prefix, 2) + _prompts(rng, [1], 1)
+
+    running = [_submit(scheduler, ids, len(prefix)) for ids in first]
+    # 첫 배치가 디코딩을 시작한 뒤 제출 → 실행 중인 배치에 합류 (KV/마스크 왼쪽 패딩)
+    while scheduler.stats()["decode_steps"] == 0 and not all(r.done for r in running):
+        time.sleep(0.001)
+    joined = [_submit(scheduler, ids, len(prefix) if i < 2 else 0) for i, ids in enumerate(later)]
+
+    for ids, request in zip(first + later, running + joined):
+        assert request.result(timeout=60) == _greedy(model, ids)
+
+
+def test_warm_prefix_then_prefixed_request_matches_generate(model, scheduler):
+    rng = random.Random(2)
+    prefix = [1] + [rng.randrange(2, 96) for _ in range(9)]
+    scheduler.warm_prefix(prefix).result(timeout=60)
+    assert scheduler.stats()["prefix_cache"]["entries"] == 1
+
+    ids = _prompts(rng, prefix, 1)[0]
+    assert _submit(scheduler, ids, len(prefix)).result(timeout=60) == _greedy(model, ids)
+    assert scheduler.stats()["prefix_cache"]["hits"] >= 1
+
+
+def test_close_fails_pending_requests(model):
+    scheduler = ContinuousBatchScheduler(model, eos_token_ids=[EOS], max_batch_size=1)
+    scheduler.close()
+    request = _submit(scheduler, [1, 5, 6], 0)
+    with pytest.raises(RuntimeError):
+        request.result(timeout=5)
+    assert scheduler.model is None
@@ -0,0 +1,61 @@
+"""
+LLM 로드/워밍업 실패 시 정리 테스트
+
+워밍업이 실패하면 스케줄러 스레드와 모델을 정리하고, 다음 호출에서 다시 시도하는지 확인한다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import pytest
+
+pytest.importorskip("transformers")
+
+from app import llm_service
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FailingWarmupService(llm_service.HuggingFaceLLMService):
+    """모델 로드 대신 가짜 스케줄러만 붙이고 워밍업에서 실패하는 서비스"""
+
+    created = []
+
+    def __init__(self):
+        self.device = "cpu"
+        self.model = object()
+        self.pipeline = object()
+        self.scheduler = RecordingScheduler()
+        self._prefix_ids = {}
+        FailingWarmupService.created.append(self)
+
+    def warmup(self, max_new_tokens=4):
+        raise RuntimeError("warmup failed")
+
+
+@pytest.fixture
+def failing_service(monkeypatch):
+    FailingWarmupService.created = []
+    monkeypatch.setattr(llm_service, "HuggingFaceLLMService", FailingWarmupService)
+    monkeypatch.setattr(llm_service, "_llm_service", None)
+    monkeypatch.setattr(llm_service, "_llm_state", {"status": "not_loaded", "error": None, "load_seconds": None})
+    return FailingWarmupService
+
+
+def test_warmup_failure_closes_scheduler_and_releases_model(failing_service):
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="warmup failed"):
+            llm_service.get_llm_service()
+
+    # 재시도마다 새 인스턴스를 만들지만, 실패한 인스턴스는 모두 정리된 상태여야 한다
+    assert len(failing_service.created) == 2
+    for service in failing_service.created:
+        assert service.scheduler is None
+        assert service.model is None and service.pipeline is None
+    assert llm_service._llm_service is None
+    assert llm_service._llm_state["status"] == "failed"
@@ -0,0 +1,132 @@
+"""
+컬럼형 레시피 저장소 테스트
+
+write_recipe_store → mmap 읽기 왕복(zlib 압축 포함), 오래된 저장소의 metadata.pkl 대체,
+RecipeIdIndex의 직접 주소(dense)/이분 탐색(sparse) 조회를 확인한다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from app.recipe_store import (
+    RecipeIdIndex,
+    RecipeStore,
+    load_metadata,
+    recipe_lists,
+    split_ingredients,
+    split_steps,
+    store_path_for,
+    write_recipe_store,
+)
+
+RECIPES = [
+    {"id": 3, "title": "김치찌개", "ingredients": "김치, 돼지고기, 두부", "content": "# 준비\n김치를 썬다\n\n끓인다"},
+    {"id": None, "title": "이름만", "ingredients": "", "content": ""},  # id/재료/본문 없음
+    {"id": 7, "title": "Pasta 🍝", "ingredients": "면,토마토", "content": "물을 끓인다\n" * 200},
+]
+
+
+def _write_pickle(path, recipes):
+    with open(path, "wb") as f:
+        pickle.dump(recipes, f)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip_through_mmap(tmp_path, compress):
+    path = str(tmp_path / "recipes")
+    write_recipe_store(path, RECIPES, compress_content=compress)
+    store = RecipeStore(path)
+
+    assert len(store) == len(RECIPES)
+    for row, recipe in enumerate(RECIPES):
+        record = store[row]
+        assert record["id"] == recipe["id"]
+        for column in ("title", "ingredients", "content"):
+            assert record[column] == recipe[column]
+        assert recipe_lists(store, row) == {
+            "steps": split_steps(recipe["content"]),
+            "ingredient_list": split_ingredients(recipe["ingredients"]),
+        }
+    assert store[-1]["title"] == RECIPES[-1]["title"]
+    with pytest.raises(IndexError):
+        store[len(RECIPES)]
+
+
+def test_content_is_zlib_compressed_on_disk(tmp_path):
+    compressed, plain = str(tmp_path / "z"), str(tmp_path / "p")
+    write_recipe_store(compressed, RECIPES, compress_content=True)
+    write_recipe_store(plain, RECIPES, compress_content=False)
+
+    assert RecipeStore(compressed).meta["content_compression"] == "zlib"
+    assert os.path.getsize(os.path.join(compressed, "content.bin")) < os.path.getsize(os.path.join(plain, "content.bin"))
+    # 짧은 컬럼은 압축하지 않음
+    assert (tmp_path / "z" / "title.bin").read_bytes() == "".join(
+        r["title"] for r in RECIPES
+    ).encode("utf-8")
+
+
+def test_uses_store_when_in_sync_with_metadata_pkl(tmp_path):
+    pkl = str(tmp_path / "metadata.pkl")
+    _write_pickle(pkl, RECIPES)
+    write_recipe_store(store_path_for(pkl), RECIPES, source_path=pkl)
+
+    assert isinstance(load_metadata(pkl, expected_count=len(RECIPES)), RecipeStore)
+
+
+def test_stale_store_falls_back_to_metadata_pkl(tmp_path):
+    pkl = str(tmp_path / "metadata.pkl")
+    _write_pickle(pkl, RECIPES)
+    write_recipe_store(store_path_for(pkl), RECIPES, source_path=pkl)
+
+    # 저장소 구축 이후 metadata.pkl만 다시 생성됨 (재구축 중단 등)
+    updated = RECIPES + [{"id": 9, "title": "새 레시피", "ingredients": "밥", "content": ""}]
+    _write_pickle(pkl, updated)
+
+    metadata = load_metadata(pkl, expected_count=len(updated))
+    assert isinstance(metadata, list)
+    assert metadata[-1]["title"] == "새 레시피"
+
+
+def test_store_with_wrong_count_falls_back_to_metadata_pkl(tmp_path):
+    pkl = str(tmp_path / "metadata.pkl")
+    _write_pickle(pkl, RECIPES)
+    write_recipe_store(store_path_for(pkl), RECIPES[:2], source_path=pkl)
+
+    assert isinstance(load_metadata(pkl, expected_count=len(RECIPES)), list)
+
+
+def _check_lookups(index, ids):
+    for recipe_id in set(int(i) for i in ids if i > 0):
+        assert index.row(recipe_id) == int(np.flatnonzero(ids == recipe_id)[0])  # 중복 id는 앞 행
+    for missing in (None, 0, -1, int(ids.max()) + 1, 10 ** 12):
+        assert index.row(missing) is None
+
+
+def test_recipe_id_index_dense():
+    ids = np.array([1, 2, 0, 4, 2, 5], dtype=np.int64)
+    index = RecipeIdIndex(ids)
+    assert index.dense
+    _check_lookups(index, ids)
+    assert index.row(3) is None  # 빈 주소
+
+
+def test_recipe_id_index_sparse():
+    ids = np.array([1000, 7, 0, 500000, 7, 42], dtype=np.int64)
+    index = RecipeIdIndex(ids)
+    assert not index.dense
+    _check_lookups(index, ids)
+    assert index.row(8) is None
+
+
+def test_recipe_id_index_from_store_and_list_agree(tmp_path):
+    path = str(tmp_path / "recipes")
+    write_recipe_store(path, RECIPES)
+    from_store = RecipeIdIndex.from_metadata(RecipeStore(path))
+    from_list = RecipeIdIndex.from_metadata(RECIPES)
+    for recipe_id in (3, 7, 1, 0, None):
+        assert from_store.row(recipe_id) == from_list.row(recipe_id)
@@ -0,0 +1,127 @@
+"""
+재료 BM25 인덱스와 RRF 결합 테스트
+
+BM25 가중치가 공식(idf * (k1 + 1) / (1 + k1 * (1 - b + b * dl / avgdl)), tf=1)과 같은지,
+검색 결과 순서와 RRF 결합 순서(점수 내림차순, 동점은 행 번호)를 확인한다.
+
+    cd backend-server/fastapi && python -m pytest -q tests
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.ingredient_index import IngredientIndex, extract_name
+from app.sparse_index import BM25Index, rrf_fuse
+
+RECIPES = [
+    {"id": 1, "ingredients": "김치, 돼지고기, 두부"},
+    {"id": 2, "ingredients": "김치, 밥"},
+    {"id": 3, "ingredients": "소고기, 돼지고기, 두부, 간장, 설탕"},
+    {"id": 4, "ingredients": "밥"},
+    {"id": 5, "ingredients": ""},
+]
+
+
+@pytest.fixture
+def ingredient_index():
+    return IngredientIndex(RECIPES, extract_name)
+
+
+def _bm25(ingredient_index, row, term, k1=1.2, b=0.75):
+    """레시피 한 건에 대한 재료 하나의 BM25 가중치 (직접 계산)"""
+    docs = [set(ingredient_index.recipe_terms(r)) for r in range(len(ingredient_index))]
+    if term not in docs[row]:
+        return 0.0
+    n = len(docs)
+    df = sum(term in d for d in docs)
+    avgdl = sum(len(d) for d in docs) / n
+    idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    return idf * (k1 + 1) / (1 + k1 * (1 - b + b * len(docs[row]) / avgdl))
+
+
+def test_weights_match_bm25_formula(ingredient_index):
+    sparse = BM25Index.from_ingredient_index(ingredient_index, k1=1.2, b=0.75)
+    for tid, term in enumerate(ingredient_index.terms):
+        start, end = sparse.term_indptr[tid], sparse.term_indptr[tid + 1]
+        for row, weight in zip(sparse.rows[start:end], sparse.weights[start:end]):
+            assert weight == pytest.approx(_bm25(ingredient_index, int(row), str(term)), rel=1e-5)
+
+
+def test_search_scores_and_order(ingredient_index):
+    sparse = BM25Index.from_ingredient_index(ingredient_index)
+    masks = [ingredient_index.term_mask(u) for u in ("김치", "두부")]
+    rows, scores = sparse.search(masks, k=10)
+
+    expected = {
+        row: _bm25(ingredient_index, row, "김치") + _bm25(ingredient_index, row, "두부")
+        for row in range(len(RECIPES))
+    }
+    expected = {row: score for row, score in expected.items() if score > 0}
+    assert sorted(rows.tolist()) == sorted(expected)
+    np.testing.assert_allclose(scores, [expected[r] for r in rows.tolist()], rtol=1e-5)
+    # 김치와 두부를 모두 가진 레시피가 가장 앞, 점수 내림차순
+    assert rows[0] == 0
+    assert np.all(np.diff(scores) <= 0)
+
+    top1_rows, _ = sparse.search(masks, k=1)
+    assert top1_rows.tolist() == rows[:1].tolist()
+    assert len(sparse.search(masks, k=0)[0]) == 0
+
+
+def test_search_takes_best_weight_when_term_matches_several_vocab_entries(ingredient_index):
+    """'고기'는 소고기/돼지고기 모두와 매칭되지만 레시피당 가장 큰 가중치 하나만 더한다"""
+    sparse = BM25Index.from_ingredient_index(ingredient_index)
+    mask = ingredient_index.term_mask("고기")
+    matched = [str(t) for t in ingredient_index.terms[mask]]
+    assert sorted(matched) == ["돼지고기", "소고기"]
+    rows, scores = sparse.search([mask], k=10)
+
+    assert sorted(rows.tolist()) == [0, 2]
+    for row, score in zip(rows.tolist(), scores):
+        assert score == pytest.approx(max(_bm25(ingredient_index, row, t) for t in matched), rel=1e-5)
+
+
+def test_save_load_round_trip(tmp_path, ingredient_index):
+    sparse = BM25Index.from_ingredient_index(ingredient_index)
+    path = str(tmp_path / "ingredients.bm25.npz")
+    sparse.save(path)
+    loaded = BM25Index.load(path)
+
+    assert loaded.matches(ingredient_index)
+    masks = [ingredient_index.term_mask("밥")]
+    for a, b in zip(sparse.search(masks, 10), loaded.search(masks, 10)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_rrf_fuse_order():
+    rrf_k = 60
+    dense = np.array([10, 20, 30, -1])  # FAISS 빈 자리(-1)는 무시
+    sparse = np.array([30, 40, 10])
+    rows, scores = rrf_fuse(dense, sparse, top_k=10, rrf_k=rrf_k)
+
+    def rank_score(rank):
+        return 1.0 / (rrf_k + rank)
+
+    expected = {
+        10: rank_score(1) + rank_score(3),
+        30: rank_score(3) + rank_score(1),
+        20: rank_score(2),
+        40: rank_score(2),
+    }
+    # 두 목록 모두에 있는 행이 앞, 동점(10/30, 20/40)은 행 번호 오름차순
+    assert rows.tolist() == [10, 30, 20, 40]
+    np.testing.assert_allclose(scores, [expected[r] for r in rows.tolist()])
+
+    top_rows, _ = rrf_fuse(dense, sparse, top_k=2, rrf_k=rrf_k)
+    assert top_rows.tolist() == [10, 30]
+
+
+def test_rrf_fuse_single_list_keeps_its_order():
+    dense = np.array([5, 3, 9])
+    rows, _ = rrf_fuse(dense, np.empty(0, dtype=np.int64), top_k=10, rrf_k=60)
+    assert rows.tolist() == [5, 3, 9]
+
+    rows, _ = rrf_fuse(np.empty(0, dtype=np.int64), dense, top_k=10, rrf_k=60)
+    assert rows.tolist() == [5, 3, 9]
@@ -22,7 +22,31 @@ class ApiService {
       throw Exception('Error getting recommendations: $e');
     }
   }
-  
+
+  // 재료 기반 레시피 추천 스트리밍 (NDJSON, 순위대로 한 건씩 전달 → 첫 카드부터 바로 표시)
+  static Stream<Map<String, dynamic>> streamRecipeRecommendations(List<String> ingredients) async* {
+    final request = http.Request('POST', Uri.parse('$baseUrl/recommend/stream'))
+      ..headers['Content-Type'] = 'application/json'
+      ..body = json.encode({'ingredients': ingredients});
+    final client = http.Client();
+    try {
+      final response = await client.send(request);
+      if (response.statusCode == 404) {
+        return; // 조건에 맞는 레시피 없음
+      }
+      if (response.statusCode != 200) {
+        throw Exception('Failed to load recommendations: ${response.statusCode}');
+      }
+      final lines = response.stream.transform(utf8.decoder).transform(const LineSplitter());
+      await for (final line in lines) {
+        if (line.trim().isEmpty) continue;
+        yield Map<String, dynamic>.from(json.decode(line));
+      }
+    } finally {
+      client.close();
+    }
+  }
+
   // 요리 세션 시작
   static Future<Map<String, dynamic>> startCookingSession(String userId, int recipeId) async {
     try {
@@ -88,6 +112,35 @@ class ApiService {
     }
   }
   
+  // 다음 조리 단계 스트리밍 (SSE: step → token... → done, 수정된 단계를 생성되는 대로 표시)
+  static Stream<Map<String, dynamic>> streamNextStep(String userId) async* {
+    final request = http.Request('POST', Uri.parse('$baseUrl/cook/next/stream'))
+      ..headers['Content-Type'] = 'application/json'
+      ..headers['Accept'] = 'text/event-stream'
+      ..body = json.encode({'user_id': userId});
+    final client = http.Client();
+    try {
+      final response = await client.send(request);
+      if (response.statusCode != 200) {
+        throw Exception('Failed to get next step: ${response.statusCode}');
+      }
+      String event = 'message';
+      final lines = response.stream.transform(utf8.decoder).transform(const LineSplitter());
+      await for (final line in lines) {
+        if (line.startsWith('event:')) {
+          event = line.substring(6).trim();
+        } else if (line.startsWith('data:')) {
+          final data = Map<String, dynamic>.from(json.decode(line.substring(5).trim()));
+          yield {'event': event, ...data};
+        } else if (line.isEmpty) {
+          event = 'message';
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
+
   // 현재 조리 단계
   static Future<Map<String, dynamic>> getCurrentStep(String userId) async {
     try {